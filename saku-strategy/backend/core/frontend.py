@@ -0,0 +1,143 @@
+"""
+In-memory cache of the frontend HTML pages
+
+Each page is read once, hashed for a strong ETag and compressed with gzip
+(and brotli, when the ``brotli`` package is installed) up front, so serving
+a page is a dictionary lookup plus picking the variant the browser
+accepts. A matching ``If-None-Match`` gets a 304 without a body.
+
+Pages are immutable for the life of the process in production, where a
+deploy restarts the workers. Under ``DEBUG`` the file's mtime is checked on
+every request and a changed page is reloaded, so editing the HTML needs no
+restart.
+"""
+import gzip
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+FRONTEND_DIR = os.path.join(settings.BASE_DIR, '..', 'frontend')
+
+# Browsers revalidate with If-None-Match after this long; page URLs are not
+# versioned, so a deploy is picked up within this window
+CACHE_SECONDS = 10 * 60
+
+CONTENT_TYPE = 'text/html; charset=utf-8'
+
+# Preferred first
+ENCODINGS = ['br', 'gzip']
+
+_pages = {}
+_lock = threading.Lock()
+
+
+class Page:
+    """One HTML file with its encoded variants and their ETags"""
+
+    def __init__(self, content, mtime):
+        self.mtime = mtime
+        self.last_modified = http_date(mtime)
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        self.variants = {'identity': (content, f'"{digest}"')}
+
+        encoded = {'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+        if BROTLI_AVAILABLE:
+            encoded['br'] = brotli.compress(content, mode=brotli.MODE_TEXT)
+        for encoding, body in encoded.items():
+            # Tiny pages can come out larger compressed
+            if len(body) < len(content):
+                self.variants[encoding] = (body, f'"{digest}-{encoding}"')
+
+    def negotiate(self, accept_encoding):
+        """``(encoding, body, etag)`` for an ``Accept-Encoding`` header"""
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self.variants and (encoding in accepted or '*' in accepted):
+                return (encoding, *self.variants[encoding])
+        return ('identity', *self.variants['identity'])
+
+
+def accepted_encodings(header):
+    """Codings named in ``Accept-Encoding`` without ``q=0``"""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        params = params.strip().lower()
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def load_page(filename):
+    """Read and encode one page, or ``None`` if it does not exist"""
+    path = os.path.join(FRONTEND_DIR, filename)
+    try:
+        with open(path, 'rb') as f:
+            mtime = os.fstat(f.fileno()).st_mtime
+            content = f.read()
+    except FileNotFoundError:
+        return None
+    return Page(content, mtime)
+
+
+def get_page(filename):
+    """Cached page, reloaded under ``DEBUG`` when the file has changed"""
+    page = _pages.get(filename)
+    if page is not None and not settings.DEBUG:
+        return page
+    if page is not None:
+        try:
+            if os.path.getmtime(os.path.join(FRONTEND_DIR, filename)) == page.mtime:
+                return page
+        except FileNotFoundError:
+            pass
+
+    with _lock:
+        page = load_page(filename)
+        if page is None:
+            _pages.pop(filename, None)
+        else:
+            _pages[filename] = page
+    return page
+
+
+def preload(filenames):
+    """Load pages at startup so the first visitor does not pay for it"""
+    for filename in filenames:
+        get_page(filename)
+
+
+def page_response(request, filename):
+    """Response for a frontend page, or ``None`` if there is no such file"""
+    page = get_page(filename)
+    if page is None:
+        return None
+
+    encoding, body, etag = page.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type=CONTENT_TYPE)
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+        response['Content-Length'] = str(len(body))
+    response['ETag'] = etag
+    response['Last-Modified'] = page.last_modified
+    response['Cache-Control'] = f'public, max-age={CACHE_SECONDS}'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
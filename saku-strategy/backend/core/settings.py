@@ -130,6 +130,32 @@ else:
         }
     }
 
+# Shared by every gunicorn worker, management command and background worker,
+# so versioned caches (catalogue, rules), upload locks and OTP throttles
+# agree across processes: Redis when REDIS_URL is set, otherwise a table in
+# the main database (created by migration elections 0016). Local SQLite
+# development keeps the per-process default.
+#
+# The database fallback is correct but not free: every cache read (version
+# counters, catalogue hits, throttle checks) becomes a query, which undoes
+# the "no database work" fast paths built on the cache. Production should
+# set REDIS_URL; check elections.W001 warns when it is missing outside DEBUG
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif DATABASE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -208,6 +234,10 @@ if CORS_AVAILABLE:
     else:
         CORS_ALLOWED_ORIGINS = ALLOWED_ORIGINS
     CORS_ALLOW_CREDENTIALS = True
+    # Chunked document uploads (see elections/uploads.py) send these cross-origin
+    from corsheaders.defaults import default_headers
+    CORS_ALLOW_HEADERS = (*default_headers, 'upload-offset', 'x-chunk-sha256')
+    CORS_EXPOSE_HEADERS = ['Upload-Offset']
 else:
     # Fallback: Allow all origins for development (not recommended for production)
     CORS_ALLOW_ALL_ORIGINS = True
@@ -219,8 +249,23 @@ else:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Documents are served through signed links (elections/media.py). Set to
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache/lighttpd) to let the
+# front server send the file; nginx needs an internal location at
+# MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT
+MEDIA_SENDFILE = os.getenv('MEDIA_SENDFILE', '').lower()
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
+# Live dashboard events (elections/events.py) need a single ASGI process;
+# enable only when serving core.asgi with uvicorn
+LIVE_EVENTS = os.getenv('LIVE_EVENTS', 'False') == 'True'
+
+# Partial chunked uploads (see elections/uploads.py); keep off the public media path
+UPLOAD_SESSION_ROOT = os.getenv('UPLOAD_SESSION_ROOT', os.path.join(BASE_DIR, 'upload_sessions'))
+
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+# Multipart files larger than this spill to a temporary file instead of worker memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(2.5 * 1024 * 1024)  # 2.5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 FILE_UPLOAD_PERMISSIONS = 0o644
 
@@ -234,6 +279,9 @@ TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID', '')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN', '')
 TWILIO_WHATSAPP_NUMBER = os.getenv('TWILIO_WHATSAPP_NUMBER', '+14155238886')
 
+# Seconds before a messaging provider request is abandoned (sent by the dispatch_notifications worker)
+WHATSAPP_REQUEST_TIMEOUT = float(os.getenv('WHATSAPP_REQUEST_TIMEOUT', '10'))
+
 # Admin Configuration
 ADMIN_PHONE_NUMBER = os.getenv('ADMIN_PHONE_NUMBER', '+254769582779')  # Your WhatsApp number
 ADMIN_DASHBOARD_URL = os.getenv('ADMIN_DASHBOARD_URL', 'http://localhost:5173/admin-dashboard-enhanced.html')
@@ -278,4 +326,8 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        # Public receipt checks, per client IP
+        'receipt_lookup': os.getenv('RECEIPT_LOOKUP_RATE', '30/minute'),
+    },
 }
@@ -21,6 +21,7 @@ from django.conf.urls.static import static
 from django.http import JsonResponse, HttpResponse
 from django.views.generic import TemplateView
 import os
+from . import frontend
 # from . import test_pages
 
 def health_check(request):
@@ -44,14 +45,23 @@ def health_check(request):
     })
 
 def serve_frontend_file(request, filename):
-    """Serve frontend HTML files"""
-    frontend_path = os.path.join(settings.BASE_DIR, '..', 'frontend', filename)
-    try:
-        with open(frontend_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return HttpResponse(content, content_type='text/html')
-    except FileNotFoundError:
+    """Serve frontend HTML files from the in-memory page cache"""
+    response = frontend.page_response(request, filename)
+    if response is None:
         return HttpResponse(f"File {filename} not found", status=404)
+    return response
+
+
+# Frontend pages: route, file, url name
+FRONTEND_PAGES = [
+    ('login/', 'login-fixed.html', 'login'),
+    ('admin-dashboard/', 'admin-dashboard-enhanced.html', 'admin_dashboard'),
+    ('register/', 'election-registration.html', 'register'),
+    ('portal/', 'personal-portal.html', 'portal'),
+    ('verify/', 'student-verification.html', 'verify'),
+    ('signup-complete/', 'signup-complete.html', 'signup_complete'),
+]
+frontend.preload(filename for _, filename, _ in FRONTEND_PAGES)
 
 urlpatterns = [
     path('', health_check, name='health_check'),
@@ -63,12 +73,7 @@ urlpatterns = [
     # path('test-auth/', test_pages.test_auth, name='test_auth'),
 
     # Frontend pages
-    path('login/', lambda r: serve_frontend_file(r, 'login-fixed.html'), name='login'),
-    path('admin-dashboard/', lambda r: serve_frontend_file(r, 'admin-dashboard-enhanced.html'), name='admin_dashboard'),
-    path('register/', lambda r: serve_frontend_file(r, 'election-registration.html'), name='register'),
-    path('portal/', lambda r: serve_frontend_file(r, 'personal-portal.html'), name='portal'),
-    path('verify/', lambda r: serve_frontend_file(r, 'student-verification.html'), name='verify'),
-    path('signup-complete/', lambda r: serve_frontend_file(r, 'signup-complete.html'), name='signup_complete'),
+    *[path(route, serve_frontend_file, {'filename': filename}, name=name) for route, filename, name in FRONTEND_PAGES],
 ]
 
 # Serve media files during development
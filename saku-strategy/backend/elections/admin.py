@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Faculty, Department, Course, Delegate, UserProfile, Rule, Snapshot
+from .models import (
+    Faculty, Department, Course, Delegate, DepartmentDelegateCounter, UserProfile, Rule, Snapshot, Notification, Vote,
+    TallyCounter, ImageJob, StoredDocument, UploadSession, VoteChain, VoteChainCheckpoint
+)
 
 
 @admin.register(Faculty)
@@ -80,3 +83,71 @@ class RuleAdmin(admin.ModelAdmin):
 class SnapshotAdmin(admin.ModelAdmin):
     list_display = ['taken_at']
     readonly_fields = ['taken_at']
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'phone_number', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['kind', 'status']
+    search_fields = ['phone_number', 'profile__student_id', 'profile__full_name']
+    readonly_fields = ['created_at', 'sent_at']
+
+
+@admin.register(Vote)
+class VoteAdmin(admin.ModelAdmin):
+    list_display = ['receipt', 'position', 'candidate', 'voted_at']
+    list_filter = ['position']
+    list_select_related = ['candidate']
+    search_fields = ['receipt']
+    readonly_fields = ['voter', 'candidate', 'position', 'ip_address', 'user_agent', 'voted_at', 'receipt', 'vote_hash']
+
+
+@admin.register(TallyCounter)
+class TallyCounterAdmin(admin.ModelAdmin):
+    list_display = ['position', 'candidate', 'votes', 'updated_at']
+    list_filter = ['position']
+    list_select_related = ['candidate']
+    readonly_fields = ['position', 'candidate', 'votes', 'updated_at']
+
+
+@admin.register(DepartmentDelegateCounter)
+class DepartmentDelegateCounterAdmin(admin.ModelAdmin):
+    list_display = ['department', 'candidates', 'delegates', 'male', 'female', 'updated_at']
+    list_select_related = ['department']
+    readonly_fields = ['department', 'candidates', 'delegates', 'male', 'female', 'updated_at']
+
+
+@admin.register(VoteChain)
+class VoteChainAdmin(admin.ModelAdmin):
+    list_display = ['length', 'head_hash', 'updated_at']
+    readonly_fields = ['head_hash', 'length', 'updated_at']
+
+
+@admin.register(VoteChainCheckpoint)
+class VoteChainCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['vote_id', 'length', 'vote_hash', 'verified_at']
+    readonly_fields = ['vote_id', 'vote_hash', 'length', 'verified_at']
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['document', 'profile', 'filename', 'received', 'size', 'status', 'updated_at']
+    list_filter = ['status', 'document']
+    search_fields = ['profile__student_id', 'filename']
+    readonly_fields = ['profile', 'document', 'filename', 'size', 'sha256', 'received', 'status', 'created_at', 'updated_at']
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ['document', 'profile', 'status', 'attempts', 'next_attempt_at', 'processed_at']
+    list_filter = ['status', 'document']
+    search_fields = ['profile__student_id', 'profile__full_name']
+    readonly_fields = ['created_at', 'processed_at']
+
+
+@admin.register(StoredDocument)
+class StoredDocumentAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'references', 'created_at']
+    search_fields = ['name']
+    # Counts are kept by the profile signals; repair them with reconcile_documents --fix
+    readonly_fields = ['name', 'size', 'references', 'created_at']
@@ -7,10 +7,11 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
-from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from .models import UserProfile
-from .serializers import UserProfileSerializer
+from .notifications import enqueue_admin_registration_alert
+from .otp import InvalidOTP, OTPExpired, OTPLocked, OTPThrottled, issue_otp, verify_otp
+from .serializers import UserProfileSerializer, ProfileTokenObtainPairSerializer
 import json
 
 
@@ -18,40 +19,7 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     """
     Custom JWT token view that returns user profile data along with tokens
     """
-    def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        
-        if response.status_code == 200:
-            # Get user from request
-            username = request.data.get('username')
-            password = request.data.get('password')
-            
-            if username and password:
-                user = authenticate(username=username, password=password)
-                if user:
-                    try:
-                        # Get user profile
-                        profile = UserProfile.objects.get(user=user)
-                        profile_data = UserProfileSerializer(profile).data
-                        
-                        # Add profile data to response
-                        response.data['profile'] = profile_data
-                        response.data['user_type'] = profile.user_type
-                        response.data['is_admin'] = user.is_staff
-                        
-                    except UserProfile.DoesNotExist:
-                        # If no profile exists, create basic user data
-                        response.data['profile'] = {
-                            'id': user.id,
-                            'username': user.username,
-                            'email': user.email,
-                            'first_name': user.first_name,
-                            'last_name': user.last_name,
-                        }
-                        response.data['user_type'] = 'STUDENT'
-                        response.data['is_admin'] = user.is_staff
-        
-        return response
+    serializer_class = ProfileTokenObtainPairSerializer
 
 
 @api_view(['POST'])
@@ -122,28 +90,13 @@ def register_user(request):
             # Get profile data for response
             profile_serializer = UserProfileSerializer(profile)
             
-            # Send WhatsApp notification to admin for new registrations (except basic STUDENT signups)
+            # Queue WhatsApp notification to admin for new registrations (except basic STUDENT signups)
             if profile.user_type != 'STUDENT':
-                try:
-                    from .whatsapp_service import WhatsAppService
-                    from django.conf import settings
-                    
-                    whatsapp_service = WhatsAppService()
-                    admin_phone = getattr(settings, 'ADMIN_PHONE_NUMBER', '+254769582779')
-                    
-                    # Send admin notification
-                    whatsapp_service.send_admin_registration_alert(
-                        admin_phone=admin_phone,
-                        student_name=profile.full_name,
-                        reg_number=profile.student_id,
-                        user_type=profile.user_type,
-                        position=profile.council_position
-                    )
-                    
-                    print(f"✅ WhatsApp notification sent for {profile.full_name} ({profile.student_id})")
-                    
-                except Exception as e:
-                    print(f"❌ WhatsApp notification failed: {e}")
+                enqueue_admin_registration_alert(
+                    reg_number=profile.student_id,
+                    user_type=profile.user_type,
+                    position=profile.council_position
+                )
             
             return Response({
                 'message': 'User registered successfully',
@@ -224,7 +177,7 @@ def get_user_profile(request):
     Get current user's profile
     """
     try:
-        profile = UserProfile.objects.get(user=request.user)
+        profile = UserProfile.objects.for_detail().get(user=request.user)
         serializer = UserProfileSerializer(profile)
         
         return Response({
@@ -251,8 +204,8 @@ def update_user_profile(request):
     Update current user's profile
     """
     try:
-        profile = UserProfile.objects.get(user=request.user)
-        serializer = UserProfileSerializer(profile, data=request.data, partial=True)
+        profile = UserProfile.objects.for_detail().get(user=request.user)
+        serializer = UserProfileSerializer(profile, data=request.data, partial=True, context={'request': request})
         
         if serializer.is_valid():
             serializer.save()
@@ -275,3 +228,75 @@ def update_user_profile(request):
             'error': 'Failed to update profile',
             'details': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def request_otp(request):
+    """
+    Send a voter verification code to the current user's WhatsApp number
+    """
+    try:
+        profile = UserProfile.objects.only('id', 'whatsapp_number').get(user=request.user)
+        expires_at = issue_otp(profile)
+    except UserProfile.DoesNotExist:
+        return Response({
+            'error': 'Profile not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except OTPThrottled as e:
+        return Response({
+            'error': str(e),
+            'retry_after': e.retry_after
+        }, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(e.retry_after)})
+    except OTPLocked as e:
+        return Response({
+            'error': str(e),
+            'locked_until': e.locked_until
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response({
+        'message': 'Verification code sent via WhatsApp',
+        'expires_at': expires_at
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def confirm_otp(request):
+    """
+    Check a voter verification code for the current user
+    """
+    code = str(request.data.get('code', '')).strip()
+    if not code:
+        return Response({
+            'error': 'code is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    profile_id = UserProfile.objects.filter(user=request.user).values_list('id', flat=True).first()
+    if profile_id is None:
+        return Response({
+            'error': 'Profile not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        verified_until = verify_otp(profile_id, code)
+    except InvalidOTP as e:
+        return Response({
+            'error': str(e),
+            'attempts_remaining': e.attempts_remaining
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except OTPLocked as e:
+        return Response({
+            'error': str(e),
+            'locked_until': e.locked_until
+        }, status=status.HTTP_403_FORBIDDEN)
+    except OTPExpired as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'verified': True,
+        'verified_until': verified_until
+    }, status=status.HTTP_200_OK)
@@ -0,0 +1,87 @@
+"""
+Ballot casting for SAKU council elections
+
+A ballot carries the voter's choice for every position at once and is
+written with a single ``bulk_create`` in one transaction. Double voting is
+prevented by the ``(voter, position)`` unique constraint rather than by
+reading existing votes first, so concurrent submissions cannot race.
+Each vote is appended to the vote hash chain in the same transaction.
+"""
+import secrets
+
+from django.db import IntegrityError, transaction
+
+from . import receipts, tally, vote_chain
+from .events import tally_event
+from .models import UserProfile, UserType, Vote
+
+
+class BallotError(Exception):
+    """The ballot is invalid and nothing was recorded"""
+
+
+class AlreadyVoted(BallotError):
+    """The voter already has a recorded vote for one of the positions"""
+
+
+def generate_receipt() -> str:
+    """Random, unguessable receipt number handed to the voter"""
+    return f"SAKU-{secrets.token_hex(8).upper()}"
+
+
+def votable_candidates():
+    """Aspirants who may receive votes: ``is_qualified`` is only written by administrators"""
+    return UserProfile.objects.filter(user_type=UserType.ASPIRANT, is_qualified=True)
+
+
+def cast_ballot(voter, choices, ip_address=None, user_agent=None):
+    """
+    Record a voter's choices for one or more positions.
+
+    Args:
+        voter: The voting UserProfile
+        choices: Mapping of council position to candidate profile id
+        ip_address: Client address recorded with each vote
+        user_agent: Client user agent recorded with each vote
+
+    Returns:
+        list: The created Vote rows (with receipts)
+
+    Raises:
+        BallotError: A candidate is not running for the chosen position
+        AlreadyVoted: The voter has already voted for one of the positions
+    """
+    if not choices:
+        raise BallotError('Ballot is empty')
+
+    running = dict(
+        votable_candidates()
+        .filter(id__in=choices.values())
+        .values_list('id', 'council_position')
+    )
+    for position, candidate_id in choices.items():
+        if running.get(candidate_id) != position:
+            raise BallotError(f'Candidate {candidate_id} is not running for {position}')
+
+    votes = []
+    for position, candidate_id in choices.items():
+        votes.append(Vote(
+            voter_id=voter.id,
+            candidate_id=candidate_id,
+            position=position,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            receipt=generate_receipt(),
+        ))
+
+    try:
+        with transaction.atomic():
+            vote_chain.append(votes)
+            votes = Vote.objects.bulk_create(votes)
+            tally.record_votes(choices)
+            tally_event(choices)
+            issued = [vote.receipt for vote in votes]
+            transaction.on_commit(lambda: receipts.receipt_filter.add(issued))
+            return votes
+    except IntegrityError:
+        raise AlreadyVoted('You have already voted for one or more of these positions')
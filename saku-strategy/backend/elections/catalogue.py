@@ -0,0 +1,83 @@
+"""
+Academic catalogue (faculties, departments, courses) versioning and bootstrap
+
+Every catalogue write bumps a shared version number; caches built from
+the catalogue compare against it and rebuild when it changes.
+"""
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+
+from .versions import bump_version, current_version
+
+CATALOGUE_VERSION_KEY = 'elections:catalogue:version'
+CATALOGUE_PAYLOAD_KEY = 'elections:catalogue:payload:{version}'
+CATALOGUE_PAYLOAD_TIMEOUT = 24 * 60 * 60
+
+
+def catalogue_version() -> int:
+    """Current catalogue version"""
+    return current_version(CATALOGUE_VERSION_KEY)
+
+
+def bump_catalogue_version() -> int:
+    """Invalidate everything built from the catalogue"""
+    return bump_version(CATALOGUE_VERSION_KEY)
+
+
+def build_catalogue(version):
+    """
+    Normalized catalogue: each faculty lists its department ids and each
+    department its course ids, so every object is serialized exactly once.
+    """
+    from .models import Faculty, Department, Course
+
+    faculties = {f['id']: dict(f, departments=[]) for f in Faculty.objects.order_by('name').values('id', 'code', 'name')}
+    departments = {
+        d['id']: {'id': d['id'], 'code': d['code'], 'name': d['name'], 'faculty': d['faculty_id'], 'courses': []}
+        for d in Department.objects.order_by('name').values('id', 'code', 'name', 'faculty_id')
+    }
+    courses = [
+        {'id': c['id'], 'name': c['name'], 'code': c['code'], 'department': c['department_id']}
+        for c in Course.objects.order_by('name').values('id', 'name', 'code', 'department_id')
+    ]
+
+    for course in courses:
+        departments[course['department']]['courses'].append(course['id'])
+    for department in departments.values():
+        if department['faculty'] in faculties:
+            faculties[department['faculty']]['departments'].append(department['id'])
+
+    return {
+        'version': version,
+        'faculties': list(faculties.values()),
+        'departments': list(departments.values()),
+        'courses': courses,
+    }
+
+
+def get_catalogue():
+    """
+    Serialized catalogue for the current version.
+
+    Built once per catalogue version and kept in the cache, so repeat
+    requests do no database work.
+
+    Returns:
+        dict: ``body`` (JSON bytes), ``etag`` and ``last_modified``
+        (epoch seconds)
+    """
+    version = catalogue_version()
+    key = CATALOGUE_PAYLOAD_KEY.format(version=version)
+    entry = cache.get(key)
+    if entry is None:
+        body = json.dumps(build_catalogue(version), separators=(',', ':')).encode()
+        entry = {
+            'body': body,
+            'etag': '"%s"' % hashlib.sha256(body).hexdigest(),
+            'last_modified': int(time.time()),
+        }
+        cache.set(key, entry, timeout=CATALOGUE_PAYLOAD_TIMEOUT)
+    return entry
@@ -0,0 +1,22 @@
+"""
+System checks for the elections app
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Backends that make every cache read a query on the main database
+DATABASE_CACHE = 'django.core.cache.backends.db.DatabaseCache'
+
+
+@register(Tags.caches)
+def shared_cache_check(app_configs, **kwargs):
+    """Production should share a Redis cache; the database fallback puts a query on every cache read"""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or backend != DATABASE_CACHE:
+        return []
+    return [Warning(
+        'The cache falls back to the database because REDIS_URL is not set.',
+        hint='Every catalogue, rules-version and throttle lookup becomes a database query. '
+             'Set REDIS_URL to a shared Redis instance.',
+        id='elections.W001',
+    )]
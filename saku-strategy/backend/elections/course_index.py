@@ -0,0 +1,128 @@
+"""
+In-process autocomplete index for course search
+
+The course catalogue changes rarely, so each process keeps a prefix index
+over course names and codes and answers registration-form autocomplete
+without touching the database. The index is rebuilt when the catalogue
+version changes (see ``catalogue.py``) or after ``MAX_AGE_SECONDS`` as a
+fallback for writes that bypass model signals.
+"""
+import re
+import threading
+import time
+
+from .catalogue import catalogue_version
+from .models import Course
+
+MAX_AGE_SECONDS = 5 * 60
+
+# Match ranks: whole name/code starts with the query, every query word
+# starts a word in the course, or the query appears anywhere
+RANK_STARTS_WITH = 0
+RANK_WORD_PREFIX = 1
+RANK_INFIX = 2
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    """Lowercase alphanumeric words of ``text``"""
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+class CourseIndex:
+    """Prefix index over one snapshot of the course catalogue"""
+
+    def __init__(self, entries, version):
+        """
+        Args:
+            entries: ``(course_id, name, code, payload)`` tuples; ``payload``
+                is the serialized course returned to clients
+            version: Catalogue version the snapshot was built from
+        """
+        self.version = version
+        self.built_at = time.monotonic()
+        self.payloads = {}
+        self.fields = {}
+        self.texts = []
+        self.prefixes = {}
+
+        for course_id, name, code, payload in entries:
+            self.payloads[course_id] = payload
+            self.fields[course_id] = (name.lower(), (code or '').lower())
+            text = f"{name} {code or ''}".lower()
+            self.texts.append((course_id, text))
+            for token in set(tokenize(text)):
+                for end in range(1, len(token) + 1):
+                    self.prefixes.setdefault(token[:end], set()).add(course_id)
+
+        # Stable alphabetical order within a rank
+        self.order = {course_id: i for i, course_id in
+                      enumerate(sorted(self.fields, key=lambda course_id: self.fields[course_id][0]))}
+
+    def search(self, query, limit=10):
+        """Serialized courses matching ``query``, best matches first"""
+        query = query.strip().lower()
+        words = tokenize(query)
+        if not words:
+            return []
+
+        # Word-prefix matches: intersect the prefix sets of every query word.
+        # A course whose name or code starts with the query is always among them.
+        matches = None
+        for word in words:
+            ids = self.prefixes.get(word, set())
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                break
+
+        ranks = {}
+        for course_id in matches or ():
+            name, code = self.fields[course_id]
+            if name.startswith(query) or (code and code.startswith(query)):
+                ranks[course_id] = RANK_STARTS_WITH
+            else:
+                ranks[course_id] = RANK_WORD_PREFIX
+
+        # Fall back to a substring scan only when prefixes cannot fill the page
+        if len(ranks) < limit:
+            for course_id, text in self.texts:
+                if course_id not in ranks and query in text:
+                    ranks[course_id] = RANK_INFIX
+
+        best = sorted(ranks, key=lambda course_id: (ranks[course_id], self.order[course_id]))
+        return [self.payloads[course_id] for course_id in best[:limit]]
+
+
+def build_index(version):
+    """Snapshot the catalogue in one query"""
+    from .serializers import CourseSerializer
+
+    courses = list(Course.objects.select_related('department', 'department__faculty').order_by('name'))
+    entries = [(course.id, course.name, course.code, payload)
+               for course, payload in zip(courses, CourseSerializer(courses, many=True).data)]
+    return CourseIndex(entries, version)
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def _is_stale(index, version):
+    return index is None or index.version != version or time.monotonic() - index.built_at > MAX_AGE_SECONDS
+
+
+def get_course_index():
+    """The current index, rebuilt if the catalogue changed or it is stale"""
+    global _index
+    version = catalogue_version()
+    if _is_stale(_index, version):
+        with _lock:
+            if _is_stale(_index, version):
+                _index = build_index(version)
+    return _index
+
+
+def search_courses(query, limit=10):
+    """Autocomplete results for ``query`` served from the in-process index"""
+    return get_course_index().search(query, limit)
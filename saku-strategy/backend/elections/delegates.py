@@ -0,0 +1,195 @@
+"""
+Delegate approval workflow for SAKU council elections
+
+Qualified delegate applicants are promoted to ``is_delegate`` in bulk with
+one ``UPDATE ... WHERE id IN``, and the per-department
+``DepartmentDelegateCounter`` rows are adjusted by one more ``UPDATE`` in
+the same transaction. Coverage metrics read those counters, so the
+dashboard costs O(departments) with no COUNT over profiles.
+
+Every profile save and delete adjusts the counters through model signals,
+from the counted fields as loaded to the fields as written, so edits of
+type, department or gender move the counts with them. A failing verdict
+or eligibility recompute withdraws delegate status through
+``revoke_delegates``. Writes that bypass both (raw ``UPDATE``s, fixtures)
+can still leave drift; ``reconcile`` recomputes the counters from the
+profiles.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.utils import timezone
+
+from .models import Department, DepartmentDelegateCounter, Gender, UserProfile, UserType
+
+COUNTER_FIELDS = ('candidates', 'delegates', 'male', 'female')
+
+# Profile fields the counters depend on, by model field name
+COUNTED_FIELDS = {'user_type': 'user_type', 'department': 'department_id', 'gender': 'gender',
+                  'is_delegate': 'is_delegate'}
+
+
+def adjust_counters(deltas):
+    """
+    Apply per-department counter changes in a single ``UPDATE``.
+
+    Args:
+        deltas: ``{department_id: {counter_field: change}}``
+    """
+    deltas = {department_id: delta for department_id, delta in deltas.items() if any(delta.values())}
+    if not deltas:
+        return
+
+    DepartmentDelegateCounter.objects.bulk_create(
+        [DepartmentDelegateCounter(department_id=department_id) for department_id in deltas],
+        ignore_conflicts=True
+    )
+    changes = {}
+    for field in COUNTER_FIELDS:
+        whens = [When(department_id=department_id, then=Value(delta[field]))
+                 for department_id, delta in deltas.items() if delta.get(field)]
+        if whens:
+            changes[field] = F(field) + Case(*whens, default=Value(0))
+    DepartmentDelegateCounter.objects.filter(department_id__in=deltas).update(**changes, updated_at=timezone.now())
+
+
+def delegate_deltas(rows, sign):
+    """Counter changes for approving (+1) or revoking (-1) ``(department_id, gender)`` rows"""
+    deltas = {}
+    for department_id, gender in rows:
+        if department_id is None:
+            continue
+        delta = deltas.setdefault(department_id, {'delegates': 0, 'male': 0, 'female': 0})
+        delta['delegates'] += sign
+        if gender == Gender.MALE:
+            delta['male'] += sign
+        elif gender == Gender.FEMALE:
+            delta['female'] += sign
+    return deltas
+
+
+def approve_delegates(profile_ids, approved_by):
+    """
+    Promote qualified delegate applicants.
+
+    Profiles that are not qualified delegate applicants, or are already
+    delegates, are left untouched.
+
+    Args:
+        profile_ids: Candidate profile ids
+        approved_by: User recorded as the approver
+
+    Returns:
+        list: Ids of the profiles that were promoted
+    """
+    with transaction.atomic():
+        rows = list(
+            UserProfile.objects.select_for_update()
+            .filter(id__in=profile_ids, user_type=UserType.DELEGATE, is_qualified=True, is_delegate=False)
+            .values_list('id', 'department_id', 'gender')
+        )
+        promoted = [profile_id for profile_id, _, _ in rows]
+        if promoted:
+            UserProfile.objects.filter(id__in=promoted).update(
+                is_delegate=True, delegate_approved_at=timezone.now(), delegate_approved_by=approved_by
+            )
+            adjust_counters(delegate_deltas([row[1:] for row in rows], +1))
+    return promoted
+
+
+def revoke_delegates(profile_ids):
+    """
+    Withdraw delegate status.
+
+    Returns:
+        list: Ids of the profiles that were delegates
+    """
+    with transaction.atomic():
+        rows = list(
+            UserProfile.objects.select_for_update()
+            .filter(id__in=profile_ids, is_delegate=True)
+            .values_list('id', 'department_id', 'gender')
+        )
+        revoked = [profile_id for profile_id, _, _ in rows]
+        if revoked:
+            UserProfile.objects.filter(id__in=revoked).update(
+                is_delegate=False, delegate_approved_at=None, delegate_approved_by=None
+            )
+            adjust_counters(delegate_deltas([row[1:] for row in rows], -1))
+    return revoked
+
+
+def counted_state(profile):
+    """The profile's counted fields, or ``None`` if any of them is deferred"""
+    if profile.get_deferred_fields() & set(COUNTED_FIELDS.values()):
+        return None
+    return {attname: getattr(profile, attname) for attname in COUNTED_FIELDS.values()}
+
+
+def saved_state(previous, current, update_fields=None):
+    """The counted state a save wrote: fields outside ``update_fields`` keep their old values"""
+    if update_fields is None or previous is None or current is None:
+        return current
+    return {attname: current[attname] if name in update_fields or attname in update_fields else previous[attname]
+            for name, attname in COUNTED_FIELDS.items()}
+
+
+def state_counts(state):
+    """Counter contributions of one profile state"""
+    if not state or state['user_type'] != UserType.DELEGATE or not state['department_id']:
+        return {}
+    department_id = state['department_id']
+    counts = delegate_deltas([(department_id, state['gender'])], +1) if state['is_delegate'] else {}
+    counts.setdefault(department_id, {})['candidates'] = 1
+    return counts
+
+
+def counter_deltas(previous, current):
+    """Counter changes between two ``counted_state`` snapshots (``None`` counts nothing)"""
+    deltas = {}
+    for state, sign in ((previous, -1), (current, +1)):
+        for department_id, counts in state_counts(state).items():
+            delta = deltas.setdefault(department_id, {})
+            for field, count in counts.items():
+                delta[field] = delta.get(field, 0) + sign * count
+    return deltas
+
+
+def reconcile(fix=False):
+    """
+    Recount delegates from profiles and compare with the counters.
+
+    Args:
+        fix: Overwrite drifted counters with the recounted values
+
+    Returns:
+        list: ``(department_id, field, counted, recorded)`` for every
+        counter value that disagrees with the profiles
+    """
+    approved = Q(users__user_type=UserType.DELEGATE, users__is_delegate=True)
+    # Annotated under other names: Department already has a ``delegates`` relation
+    rows = Department.objects.annotate(
+        n_candidates=Count('users', filter=Q(users__user_type=UserType.DELEGATE)),
+        n_delegates=Count('users', filter=approved),
+        n_male=Count('users', filter=approved & Q(users__gender=Gender.MALE)),
+        n_female=Count('users', filter=approved & Q(users__gender=Gender.FEMALE)),
+    ).values('id', *(f'n_{field}' for field in COUNTER_FIELDS))
+    counted = {row['id']: {field: row[f'n_{field}'] for field in COUNTER_FIELDS} for row in rows}
+    recorded = {row['department_id']: row for row in DepartmentDelegateCounter.objects.values('department_id', *COUNTER_FIELDS)}
+
+    drift = [
+        (department_id, field, row[field], recorded.get(department_id, {}).get(field, 0))
+        for department_id, row in sorted(counted.items())
+        for field in COUNTER_FIELDS
+        if row[field] != recorded.get(department_id, {}).get(field, 0)
+    ]
+
+    if fix and drift:
+        DepartmentDelegateCounter.objects.bulk_create(
+            [DepartmentDelegateCounter(department_id=department_id,
+                                       **{field: counted[department_id][field] for field in COUNTER_FIELDS})
+             for department_id in sorted({department_id for department_id, *_ in drift})],
+            update_conflicts=True,
+            unique_fields=['department'],
+            update_fields=[*COUNTER_FIELDS, 'updated_at'],
+        )
+    return drift
@@ -0,0 +1,203 @@
+"""
+Reference counting for content-addressed profile documents
+
+Each blob written by ``storage.ContentAddressedStorage`` has a
+``StoredDocument`` row counting the profile fields that point at it.
+Profile saves and deletes adjust the counts through model signals (one
+``UPDATE`` per save, like the delegate counters), and a blob whose count
+drops to zero is deleted after the transaction commits.
+
+A file that was just written, or just matched by an identical upload, may
+not be referenced yet, so blobs modified within ``SWEEP_GRACE_SECONDS``
+are never deleted; ``reconcile`` (run from the ``reconcile_documents``
+command) recounts references from the profiles, collects what the sweep
+skipped and reports the space saved by deduplication.
+"""
+import os
+import time
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+
+from .models import StoredDocument, UserProfile
+from .serializers import DOCUMENT_FIELDS
+from .storage import BLOB_PREFIX, document_storage, is_blob, thumbnail_name
+
+SWEEP_GRACE_SECONDS = 10 * 60
+
+# Profiles read per round trip when recounting references
+RECOUNT_CHUNK_SIZE = 2000
+
+
+def document_names(profile):
+    """
+    Stored names of the profile's loaded document fields.
+
+    Deferred fields are left out rather than loaded.
+    """
+    names = {}
+    for field in DOCUMENT_FIELDS:
+        if field in profile.__dict__:
+            value = profile.__dict__[field]
+            names[field] = getattr(value, 'name', value) or ''
+    return names
+
+
+def reference_deltas(previous, current, fields=DOCUMENT_FIELDS):
+    """Reference changes between two ``document_names`` snapshots"""
+    deltas = Counter()
+    for field in fields:
+        if field not in previous or field not in current:
+            continue
+        old, new = previous[field], current[field]
+        if old != new:
+            deltas[new] += 1
+            deltas[old] -= 1
+    return deltas
+
+
+def adjust_references(deltas):
+    """
+    Apply ``{blob_name: change}`` in a single ``UPDATE`` and schedule
+    blobs left without references for deletion.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta and is_blob(name)}
+    if not deltas:
+        return
+
+    storage = document_storage()
+    StoredDocument.objects.bulk_create(
+        [StoredDocument(name=name, size=storage.size(name) if storage.exists(name) else 0)
+         for name, delta in deltas.items() if delta > 0],
+        ignore_conflicts=True
+    )
+    StoredDocument.objects.filter(name__in=deltas).update(
+        references=F('references') + Case(*[When(name=name, then=Value(delta)) for name, delta in deltas.items()],
+                                          default=Value(0))
+    )
+    released = [name for name, delta in deltas.items() if delta < 0]
+    if released:
+        transaction.on_commit(lambda: sweep(released))
+
+
+def delete_blob(storage, name):
+    storage.delete(name)
+    thumbnail = thumbnail_name(name)
+    if default_storage.exists(thumbnail):
+        default_storage.delete(thumbnail)
+
+
+def sweep(names=None):
+    """
+    Delete unreferenced blobs older than the grace period.
+
+    Args:
+        names: Blobs to consider; all unreferenced ones by default
+
+    Returns:
+        int: Blobs deleted
+    """
+    storage = document_storage()
+    cutoff = time.time() - SWEEP_GRACE_SECONDS
+    deleted = 0
+    with transaction.atomic():
+        unreferenced = StoredDocument.objects.select_for_update().filter(references__lte=0)
+        if names is not None:
+            unreferenced = unreferenced.filter(name__in=names)
+        for document in unreferenced:
+            path = storage.path(document.name)
+            if os.path.exists(path) and os.path.getmtime(path) > cutoff:
+                continue
+            delete_blob(storage, document.name)
+            document.delete()
+            deleted += 1
+    return deleted
+
+
+def discard_unreferenced(name):
+    """Delete a blob that was written but never referenced, unless something else uses it"""
+    if is_blob(name) and not StoredDocument.objects.filter(name=name, references__gt=0).exists():
+        delete_blob(document_storage(), name)
+
+
+def count_references():
+    """``Counter`` of blob name -> profile fields pointing at it, streamed in chunks"""
+    counted = Counter()
+    rows = UserProfile.objects.order_by().values_list(*DOCUMENT_FIELDS).iterator(chunk_size=RECOUNT_CHUNK_SIZE)
+    for row in rows:
+        counted.update(name for name in row if is_blob(name))
+    return counted
+
+
+def stored_blobs():
+    """Blob names present on disk"""
+    storage = document_storage()
+    root = storage.path(BLOB_PREFIX)
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = [name for name in subdirectories if not name.startswith('.')]
+        for filename in files:
+            name = os.path.relpath(os.path.join(directory, filename), storage.location).replace(os.sep, '/')
+            if is_blob(name):
+                yield name
+
+
+def storage_report():
+    """
+    Bytes on disk versus bytes the profiles reference.
+
+    Returns:
+        dict: ``blobs``, ``references``, ``stored_bytes``,
+        ``referenced_bytes`` and ``saved_bytes``
+    """
+    totals = StoredDocument.objects.filter(references__gt=0).aggregate(
+        blobs=Count('id'),
+        # Not named "references": an aggregate may not shadow the field it sums
+        reference_count=Sum('references'),
+        stored_bytes=Sum('size'),
+        referenced_bytes=Sum(F('size') * F('references')),
+    )
+    totals = {key: value or 0 for key, value in totals.items()}
+    totals['references'] = totals.pop('reference_count')
+    totals['saved_bytes'] = totals['referenced_bytes'] - totals['stored_bytes']
+    return totals
+
+
+def reconcile(fix=False):
+    """
+    Recount references from the profiles and compare with the counters.
+
+    Args:
+        fix: Overwrite drifted counts, register unrecorded blobs and sweep
+            unreferenced ones
+
+    Returns:
+        dict: ``drift`` as ``(name, counted, recorded)`` tuples, plus
+        ``untracked`` (blobs on disk with no counter row) and ``deleted``
+    """
+    counted = count_references()
+    recorded = dict(StoredDocument.objects.values_list('name', 'references'))
+    drift = sorted(
+        (name, counted.get(name, 0), recorded.get(name, 0))
+        for name in set(counted) | set(recorded)
+        if counted.get(name, 0) != recorded.get(name, 0)
+    )
+    untracked = sorted(name for name in stored_blobs() if name not in recorded and name not in counted)
+    result = {'drift': drift, 'untracked': untracked, 'deleted': 0}
+
+    if fix:
+        storage = document_storage()
+        # Untracked blobs get a zero count so the sweep can collect them
+        corrected = {name: references for name, references, _ in drift}
+        corrected.update({name: 0 for name in untracked})
+        StoredDocument.objects.bulk_create(
+            [StoredDocument(name=name, references=references,
+                            size=storage.size(name) if storage.exists(name) else 0)
+             for name, references in sorted(corrected.items())],
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=['references'],
+        )
+        result['deleted'] = sweep()
+    return result
@@ -0,0 +1,128 @@
+"""
+Batch eligibility recomputation
+
+When the rules change, every delegate and aspirant is re-evaluated with
+``recompute``. Rows are read in primary-key order one chunk at a time
+(keyset pagination, so writes never shift the next page), and only rows
+whose ``eligibility`` or ``is_qualified`` actually changed are written
+back with ``bulk_update``. Approved delegates whose profile stops
+qualifying lose delegate status through ``delegates.revoke_delegates``.
+Large tables can be split into primary-key ranges and recomputed in
+parallel worker processes.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections
+from django.db.models import Max, Min
+
+from . import delegates
+from .models import Delegate, UserProfile, UserType
+from .rules import get_rule_set, qualifies
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_BATCH_SIZE = 500
+
+RESULT_FIELDS = ['eligibility', 'is_qualified']
+
+
+def delegate_rows():
+    return Delegate.objects.all()
+
+
+def candidate_profiles():
+    """Profiles the rules judge: aspirants and delegate applicants"""
+    return UserProfile.objects.filter(user_type__in=[UserType.ASPIRANT, UserType.DELEGATE])
+
+
+# Tables recomputed by ``recompute``, by name
+TARGETS = {
+    'delegates': delegate_rows,
+    'profiles': candidate_profiles,
+}
+
+
+def recompute_range(target, first=None, last=None, chunk_size=DEFAULT_CHUNK_SIZE, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Re-evaluate the rows of one target with ``first <= pk <= last``.
+
+    Returns:
+        tuple: ``(rows_examined, rows_changed)``
+    """
+    rule_set = get_rule_set()
+    queryset = TARGETS[target]()
+    model = queryset.model
+    if first is not None:
+        queryset = queryset.filter(pk__gte=first)
+    if last is not None:
+        queryset = queryset.filter(pk__lte=last)
+
+    examined = changed = 0
+    after = None
+    while True:
+        page = queryset.order_by('pk')
+        if after is not None:
+            page = page.filter(pk__gt=after)
+        rows = list(rule_set.evaluate_rows(page[:chunk_size], extra=('vetting_status', *RESULT_FIELDS)))
+        if not rows:
+            break
+        examined += len(rows)
+        after = rows[-1][0]['pk']
+
+        updates = []
+        for row, eligibility in rows:
+            is_qualified = qualifies(eligibility, row['vetting_status'])
+            if eligibility != row['eligibility'] or is_qualified != row['is_qualified']:
+                updates.append(model(pk=row['pk'], eligibility=eligibility, is_qualified=is_qualified))
+        if updates:
+            model.objects.bulk_update(updates, RESULT_FIELDS, batch_size=batch_size)
+            if model is UserProfile:
+                delegates.revoke_delegates([update.pk for update in updates if not update.is_qualified])
+            changed += len(updates)
+    return examined, changed
+
+
+def shard_ranges(target, shards):
+    """Split a target's primary keys into at most ``shards`` contiguous ``(first, last)`` ranges"""
+    bounds = TARGETS[target]().aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return []
+    first, last = bounds['first'], bounds['last']
+    width = max(1, -(-(last - first + 1) // shards))
+    return [(start, min(start + width - 1, last)) for start in range(first, last + 1, width)]
+
+
+def recompute(targets=tuple(TARGETS), workers=1, chunk_size=DEFAULT_CHUNK_SIZE, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Recompute eligibility for every row of the given targets.
+
+    Args:
+        targets: Names from ``TARGETS``
+        workers: Processes recomputing primary-key ranges in parallel
+            (1 recomputes inline)
+        chunk_size: Rows read per database round trip
+        batch_size: Rows written per ``UPDATE``
+
+    Returns:
+        dict: ``{target: {'examined', 'changed', 'seconds'}}``
+    """
+    results = {}
+    for target in targets:
+        started = time.perf_counter()
+        if workers > 1:
+            ranges = shard_ranges(target, workers)
+            # Forked workers must open their own connections rather than share the parent's socket
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+                futures = [pool.submit(recompute_range, target, first, last, chunk_size, batch_size)
+                           for first, last in ranges]
+                counts = [future.result() for future in futures]
+        else:
+            counts = [recompute_range(target, chunk_size=chunk_size, batch_size=batch_size)]
+        results[target] = {
+            'examined': sum(examined for examined, _ in counts),
+            'changed': sum(changed for _, changed in counts),
+            'seconds': time.perf_counter() - started,
+        }
+    return results
@@ -0,0 +1,151 @@
+"""
+Live dashboard events (server-sent events)
+
+Write paths publish small deltas (new registrations, verification verdicts,
+tally changes) to one in-process hub, which fans each event out to every
+connected dashboard. An event is encoded once no matter how many
+dashboards are listening, replacing the dashboards' full re-polls.
+
+The hub lives in the process that handles the write, so live events need
+the app served from a single ASGI process (``core.asgi``) with
+``LIVE_EVENTS`` enabled.
+
+``EventSource`` cannot send an Authorization header, so dashboards open the
+stream with a short-lived token that is good for nothing else, rather than
+putting their access token in a URL (and in every access log).
+"""
+import asyncio
+import itertools
+import json
+import threading
+
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = 15
+
+# Seconds before a stream is closed and the client reconnects. Django 4.2
+# does not notice disconnects mid-stream, so this bounds abandoned streams.
+STREAM_MAX_SECONDS = 300
+
+# Events buffered per subscriber; a stalled client loses its oldest events
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# A stream token only has to last until the stream is opened
+STREAM_TOKEN_SALT = 'elections.events'
+STREAM_TOKEN_SECONDS = 60
+
+
+class EventHub:
+    """Fan-out of published events to all subscribed event loops"""
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    @staticmethod
+    def encode(event_id, event, data):
+        """One SSE message"""
+        payload = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n".encode()
+
+    def publish(self, event, data):
+        """
+        Send an event to every subscriber. Safe to call from any thread.
+
+        Returns:
+            int: Number of subscribers the event was offered to
+        """
+        message = self.encode(next(self._ids), event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            loop, queue = subscriber
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, message)
+            except RuntimeError:
+                # The subscriber's event loop has closed
+                with self._lock:
+                    self._subscribers.discard(subscriber)
+        return len(subscribers)
+
+    def publish_on_commit(self, event, data):
+        """Publish once the current transaction commits (immediately outside one)"""
+        transaction.on_commit(lambda: self.publish(event, data))
+
+    @staticmethod
+    def _offer(queue, message):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    async def subscribe(self, heartbeat=HEARTBEAT_SECONDS, max_age=STREAM_MAX_SECONDS):
+        """Async iterator of encoded SSE messages for one client"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_age
+        subscriber = (loop, asyncio.Queue(self.queue_size))
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            yield b"retry: 5000\n\n"
+            queue = subscriber[1]
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=min(heartbeat, remaining))
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+
+# Global instance
+hub = EventHub()
+
+
+def issue_stream_token(user):
+    """Token that opens one event stream within ``STREAM_TOKEN_SECONDS``"""
+    return signing.dumps(user.pk, salt=STREAM_TOKEN_SALT)
+
+
+def read_stream_token(token):
+    """User id a stream token was issued to, or None if it is invalid or expired"""
+    try:
+        return signing.loads(token, salt=STREAM_TOKEN_SALT, max_age=STREAM_TOKEN_SECONDS)
+    except signing.BadSignature:
+        return None
+
+
+def registration_event(profile):
+    hub.publish_on_commit('registration', {
+        'id': profile.id,
+        'user_type': profile.user_type,
+        'council_position': profile.council_position,
+        'faculty': profile.faculty_id,
+        'department': profile.department_id,
+        'vetting_status': profile.vetting_status,
+    })
+
+
+def verification_event(profiles):
+    hub.publish_on_commit('verification', {
+        'profiles': [
+            {'id': profile.id, 'vetting_status': profile.vetting_status, 'is_qualified': profile.is_qualified}
+            for profile in profiles
+        ]
+    })
+
+
+def tally_event(choices):
+    hub.publish_on_commit('tally', {
+        'votes': [{'position': position, 'candidate': candidate_id} for position, candidate_id in choices.items()]
+    })
@@ -0,0 +1,257 @@
+"""
+Normalization and thumbnails for uploaded screenshots
+
+Phone photos arrive full-size with EXIF (GPS position, device details).
+Saving a profile with a new image queues an ``ImageJob`` in the same
+transaction; the ``process_images`` worker then, off the request path:
+
+- applies the EXIF orientation and re-encodes the original without its
+  metadata, bounded to ``MAX_DIMENSION`` pixels on the long side
+- writes a ``THUMBNAIL_DIMENSION`` JPEG next to it for reviewers
+
+Decoding and resizing run in a process pool; database writes stay in the
+worker's main process. Results are recorded in
+``UserProfile.document_thumbnails`` against the file they were made from,
+so a thumbnail is only served while it matches the current document.
+"""
+import io
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import django
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .documents import adjust_references
+from .models import ImageJob, ImageJobStatus, UserProfile
+from .storage import document_storage, thumbnail_name
+
+# Profile documents that are photos or screenshots
+IMAGE_FIELDS = ['school_fees_screenshot', 'course_registration_screenshot', 'school_id_image']
+
+# Longest side of the stored original, and of the reviewer thumbnail
+MAX_DIMENSION = 2000
+THUMBNAIL_DIMENSION = 480
+JPEG_QUALITY = 85
+THUMBNAIL_QUALITY = 75
+
+# Jobs leased by a worker become due again after this long
+CLAIM_LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+
+class ImageRejected(Exception):
+    """The file is not an image that can be processed; retrying will not help"""
+
+
+def stale_images(profile):
+    """Image fields whose current file has not been processed yet"""
+    processed = profile.document_thumbnails or {}
+    return [
+        field for field in IMAGE_FIELDS
+        if getattr(profile, field).name
+        and processed.get(field, {}).get('source') != getattr(profile, field).name
+    ]
+
+
+def enqueue_images(profile, fields):
+    """Queue processing of ``fields``; a document already queued is not queued twice"""
+    ImageJob.objects.bulk_create(
+        [ImageJob(profile=profile, document=field) for field in fields],
+        ignore_conflicts=True
+    )
+
+
+def encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def as_rgb(image):
+    """Flatten to RGB for JPEG, painting transparency white"""
+    if image.mode == 'RGB':
+        return image
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def process_image(name):
+    """
+    Store a normalized copy of one image and write its thumbnail.
+
+    Runs in a pool process, so it touches storage only.
+
+    Returns:
+        dict: ``source`` (name of the normalized original), ``thumbnail``,
+        ``width`` and ``height``
+
+    Raises:
+        ImageRejected: The file cannot be decoded as an image
+        OSError: The file could not be read (missing, or a storage
+            error); the job is retried
+    """
+    storage = document_storage()
+    # Read before decoding, so only decoder errors below can reject the file
+    with storage.open(name, 'rb') as stored:
+        content = stored.read()
+    try:
+        image = Image.open(io.BytesIO(content))
+        fmt = image.format
+        # Let JPEG decode at a reduced scale when the photo is far larger than needed
+        image.draft('RGB', (MAX_DIMENSION, MAX_DIMENSION))
+        image.load()
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+        # Decoding from memory: an OSError here is a truncated or corrupt image, not I/O
+        raise ImageRejected(str(exc) or 'Not an image')
+
+    image.thumbnail((MAX_DIMENSION, MAX_DIMENSION), Image.Resampling.LANCZOS)
+    if fmt == 'PNG':
+        original = encode(image, 'PNG', optimize=True)
+    else:
+        image = as_rgb(image)
+        original = encode(image, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+    thumbnail = as_rgb(image).copy()
+    thumbnail.thumbnail((THUMBNAIL_DIMENSION, THUMBNAIL_DIMENSION), Image.Resampling.LANCZOS)
+
+    # Re-encoded without EXIF as a new blob; the raw upload is released once the profile points here
+    source = storage.save(name, ContentFile(original))
+    thumbnail_path = thumbnail_name(source)
+    if not default_storage.exists(thumbnail_path):
+        # Named after the blob, so identical photos share a thumbnail
+        default_storage.save(
+            thumbnail_path, ContentFile(encode(thumbnail, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True))
+        )
+    return {'source': source, 'thumbnail': thumbnail_path, 'width': image.width, 'height': image.height}
+
+
+def claim_batch(batch_size):
+    """Claim up to ``batch_size`` due jobs, leased like the notification outbox"""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            ImageJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=ImageJobStatus.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        ImageJob.objects.filter(id__in=[job.id for job in batch]).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+        )
+    return batch
+
+
+def run_jobs(jobs, names, pool=None):
+    """``{job_id: result or exception}`` for each job's current file name"""
+    if pool is None:
+        outcomes = {}
+        for job in jobs:
+            try:
+                outcomes[job.id] = process_image(names[job.id])
+            except Exception as exc:
+                outcomes[job.id] = exc
+        return outcomes
+
+    futures = {job.id: pool.submit(process_image, names[job.id]) for job in jobs}
+    outcomes = {}
+    for job_id, future in futures.items():
+        try:
+            outcomes[job_id] = future.result()
+        except Exception as exc:
+            outcomes[job_id] = exc
+    return outcomes
+
+
+def process_pending(batch_size=20, pool=None):
+    """
+    Process one batch of queued images.
+
+    Args:
+        batch_size: Maximum number of jobs to claim
+        pool: Optional ``ProcessPoolExecutor`` to decode and resize in
+
+    Returns:
+        dict: Counts of ``processed``, ``retrying`` and ``failed`` jobs
+    """
+    batch = claim_batch(batch_size)
+    counts = {'processed': 0, 'retrying': 0, 'failed': 0}
+    if not batch:
+        return counts
+
+    profiles = UserProfile.objects.only('id', 'document_thumbnails', *IMAGE_FIELDS).in_bulk(
+        {job.profile_id for job in batch}
+    )
+    names = {job.id: getattr(profiles[job.profile_id], job.document).name for job in batch
+             if job.profile_id in profiles}
+    todo = [job for job in batch if names.get(job.id)]
+    todo_ids = {job.id for job in todo}
+    outcomes = run_jobs(todo, names, pool)
+
+    now = timezone.now()
+    results = {}
+    for job in batch:
+        job.attempts += 1
+        outcome = outcomes.get(job.id)
+        if job.id not in todo_ids:
+            # Profile or document removed since the job was queued
+            job.status, job.last_error = ImageJobStatus.DONE, 'No file to process'
+        elif isinstance(outcome, dict):
+            job.status, job.last_error, job.processed_at = ImageJobStatus.DONE, '', now
+            results.setdefault(job.profile_id, {})[job.document] = (names[job.id], outcome)
+            counts['processed'] += 1
+        elif isinstance(outcome, ImageRejected) or job.attempts >= MAX_ATTEMPTS:
+            job.status, job.last_error = ImageJobStatus.FAILED, str(outcome)
+            counts['failed'] += 1
+        else:
+            job.next_attempt_at, job.last_error = now + timedelta(minutes=job.attempts), str(outcome)
+            counts['retrying'] += 1
+
+    with transaction.atomic():
+        ImageJob.objects.bulk_update(batch, ['status', 'attempts', 'last_error', 'next_attempt_at', 'processed_at'])
+        record_results(results)
+    return counts
+
+
+def record_results(results):
+    """Merge processed images into each profile's ``document_thumbnails``"""
+    if not results:
+        return
+    profiles = list(
+        UserProfile.objects.select_for_update().only('id', 'document_thumbnails', *IMAGE_FIELDS)
+        .filter(id__in=results)
+    )
+    renamed = set()
+    references = Counter()
+    for profile in profiles:
+        thumbnails = dict(profile.document_thumbnails or {})
+        for field, (name, result) in results[profile.id].items():
+            current = getattr(profile, field)
+            if current.name != name:
+                # Replaced while processing: the new file was not queued behind the running job
+                enqueue_images(profile, [field])
+                continue
+            if result['source'] != name:
+                current.name = result['source']
+                renamed.add(field)
+                references[result['source']] += 1
+                references[name] -= 1
+            thumbnails[field] = result
+        profile.document_thumbnails = thumbnails
+    UserProfile.objects.bulk_update(profiles, ['document_thumbnails', *sorted(renamed)])
+    # bulk_update sends no signals, so move the document references here
+    adjust_references(references)
+
+
+def pool(workers):
+    """Process pool for image work, or None to process inline"""
+    return ProcessPoolExecutor(max_workers=workers, initializer=django.setup) if workers > 1 else None
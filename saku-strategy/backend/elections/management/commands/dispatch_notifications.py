@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from elections.notifications import dispatch_pending
+from elections.whatsapp_service import WhatsAppService
+
+
+class Command(BaseCommand):
+    help = 'Send queued WhatsApp notifications from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Notifications sent per batch')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit')
+
+    def handle(self, *args, **options):
+        # One service (and pooled HTTP session) for the lifetime of the worker
+        service = WhatsAppService()
+        self.stdout.write('Dispatching notifications...')
+
+        while True:
+            counts = dispatch_pending(batch_size=options['batch_size'], service=service)
+            if any(counts.values()):
+                self.stdout.write(
+                    f"Sent {counts['sent']}, retrying {counts['retrying']}, failed {counts['failed']}"
+                )
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Outbox drained'))
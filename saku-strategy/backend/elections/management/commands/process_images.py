@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from elections.images import pool, process_pending
+
+
+class Command(BaseCommand):
+    help = 'Strip EXIF from, resize and thumbnail queued screenshot uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Images claimed per batch')
+        parser.add_argument('--workers', type=int, default=1, help='Processes decoding and resizing images')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Processing images...')
+        executor = pool(options['workers'])
+        try:
+            while True:
+                counts = process_pending(batch_size=options['batch_size'], pool=executor)
+                if any(counts.values()):
+                    self.stdout.write(
+                        f"Processed {counts['processed']}, retrying {counts['retrying']}, failed {counts['failed']}"
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS('Image queue drained'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from elections.uploads import SESSION_TTL, purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete abandoned chunked uploads and finished upload records'
+
+    def handle(self, *args, **options):
+        removed = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} upload sessions idle for over {SESSION_TTL}"))
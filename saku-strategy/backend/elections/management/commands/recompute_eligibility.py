@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from elections.eligibility import DEFAULT_BATCH_SIZE, DEFAULT_CHUNK_SIZE, TARGETS, recompute
+
+
+class Command(BaseCommand):
+    help = 'Re-evaluate delegate and aspirant eligibility against the current rules'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=sorted(TARGETS),
+                            help='Recompute one table only (default: all)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes recomputing primary-key ranges in parallel')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Rows read per database round trip')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows written per UPDATE')
+
+    def handle(self, *args, **options):
+        targets = [options['only']] if options['only'] else list(TARGETS)
+        results = recompute(
+            targets,
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+        )
+
+        for target, result in results.items():
+            rate = result['examined'] / result['seconds'] if result['seconds'] else 0
+            self.stdout.write(
+                f"{target}: checked {result['examined']} rows in {result['seconds']:.2f}s "
+                f"({rate:,.0f} rows/s), {result['changed']} changed"
+            )
+        self.stdout.write(self.style.SUCCESS('Eligibility up to date'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from elections.delegates import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount delegates from profiles and report department counter drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Overwrite drifted counters with recounted values')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconciling department delegate counters against profiles...')
+        drift = reconcile(fix=options['fix'])
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Delegate counters match the profiles'))
+            return
+
+        for department_id, field, counted, recorded in drift:
+            self.stdout.write(
+                f'Department {department_id} {field}: counted {counted}, counter {recorded} '
+                f'(drift {recorded - counted:+d})'
+            )
+        if options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(drift)} counter values'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} counter values drifted; rerun with --fix to repair'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from elections.documents import reconcile, storage_report
+
+
+def megabytes(n):
+    return f'{n / (1024 * 1024):,.1f} MB'
+
+
+class Command(BaseCommand):
+    help = 'Recount document references, collect unreferenced blobs and report space saved by deduplication'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help='Repair drifted reference counts and delete unreferenced blobs')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconciling document references against profiles...')
+        result = reconcile(fix=options['fix'])
+
+        for name, counted, recorded in result['drift']:
+            self.stdout.write(f'{name}: referenced {counted}, counter {recorded} (drift {recorded - counted:+d})')
+        if result['untracked']:
+            self.stdout.write(f"{len(result['untracked'])} stored blobs have no reference counter")
+
+        if not result['drift'] and not result['untracked']:
+            self.stdout.write(self.style.SUCCESS('Document references match the profiles'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Fixed {len(result['drift'])} counters, deleted {result['deleted']} unreferenced blobs"
+            ))
+        else:
+            self.stdout.write(self.style.WARNING('Rerun with --fix to repair'))
+
+        report = storage_report()
+        self.stdout.write(
+            f"{report['references']} document references share {report['blobs']} stored files: "
+            f"{megabytes(report['stored_bytes'])} on disk for {megabytes(report['referenced_bytes'])} uploaded, "
+            f"{megabytes(report['saved_bytes'])} saved"
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from elections.tally import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute the vote tally from raw votes and report counter drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Overwrite drifted counters with recomputed values')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconciling tally counters against votes...')
+        drift = reconcile(fix=options['fix'])
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Tally counters match the recorded votes'))
+            return
+
+        for position, candidate_id, counted, recorded in drift:
+            self.stdout.write(
+                f'{position} candidate {candidate_id}: counted {counted}, counter {recorded} '
+                f'(drift {recorded - counted:+d})'
+            )
+        if options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(drift)} counters'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} counters drifted; rerun with --fix to repair'))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from elections.snapshots import take_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Store dashboard totals as a Snapshot (once, or every --interval seconds)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running and take a snapshot every N seconds, aligned to the clock')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            snapshot = take_snapshot()
+            self.stdout.write(self.style.SUCCESS(
+                f"Snapshot {snapshot.id} taken at {snapshot.taken_at:%Y-%m-%d %H:%M:%S}: "
+                f"{snapshot.totals['registrations']['total']} registrations"
+            ))
+            if not interval:
+                break
+            # Sleep to the next multiple of the interval so the cadence does not drift
+            time.sleep(interval - time.time() % interval)
@@ -0,0 +1,39 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.vote_chain import DEFAULT_CHUNK_SIZE, DEFAULT_SEGMENT_SIZE, verify_chain
+
+
+class Command(BaseCommand):
+    help = 'Verify the vote hash chain and report the first broken link'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes verifying segments in parallel (default: CPU count)')
+        parser.add_argument('--segment-size', type=int, default=DEFAULT_SEGMENT_SIZE,
+                            help='Votes per independently verified segment')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Votes fetched per database round trip')
+        parser.add_argument('--resume', action='store_true',
+                            help='Start from the latest checkpoint instead of the first vote')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Verifying vote chain...')
+        result = verify_chain(
+            workers=options['workers'],
+            resume=options['resume'],
+            segment_size=options['segment_size'],
+            chunk_size=options['chunk_size'],
+        )
+
+        if result['resumed_from'] is not None:
+            self.stdout.write(f"Resumed after checkpoint at vote {result['resumed_from']}")
+        rate = result['verified'] / result['seconds'] if result['seconds'] else 0
+        self.stdout.write(f"Checked {result['verified']} votes in {result['seconds']:.2f}s ({rate:,.0f} votes/s)")
+
+        if result['broken_at'] is not None:
+            raise CommandError(f"Vote chain broken at vote {result['broken_at']}")
+        if not result['head_ok']:
+            raise CommandError('Vote chain does not end at the recorded head; votes are missing')
+        self.stdout.write(self.style.SUCCESS('Vote chain intact'))
@@ -0,0 +1,201 @@
+"""
+Signed links to uploaded documents and the responses that serve them
+
+Media is not publicly routed outside ``DEBUG``. Instead the profile
+serializers, which only ever see profiles the requesting reviewer (or the
+student themselves) may read, render each document as a signed link to
+``serve_document``. That is the one permission check: following the link
+costs a signature check and a ``stat``, with no database query, so a PDF
+viewer fetching a transcript in dozens of ranges stays cheap.
+
+Links expire at the end of the next ``LINK_LIFETIME`` window rather than a
+fixed time after signing, so a page reloaded within the window gets the
+same URLs and the browser cache keeps working.
+
+When ``MEDIA_SENDFILE`` is set the file itself is handed to the front
+server (``X-Sendfile`` for Apache/lighttpd, ``X-Accel-Redirect`` for
+nginx), which handles ranges and revalidation. Otherwise ``file_response``
+does, through a ``FileResponse`` that streams only the requested range.
+"""
+import mimetypes
+import os
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, HttpResponse
+from django.urls import reverse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from .storage import blob_digest, is_blob
+
+SIGNING_SALT = 'elections.media'
+
+# Links stay valid for one to two of these windows
+LINK_LIFETIME = 60 * 60
+
+# Bytes read per iteration when streaming a file or range
+BLOCK_SIZE = 64 * 1024
+
+SENDFILE_HEADERS = {'x-sendfile': 'X-Sendfile', 'x-accel-redirect': 'X-Accel-Redirect'}
+
+
+class LinkError(Exception):
+    """The link was tampered with or has expired"""
+
+
+def signed_url(name, filename, request=None, now=None):
+    """
+    Link to a file under ``MEDIA_ROOT``.
+
+    Args:
+        name: Storage name of the file
+        filename: Name offered to the browser
+        request: Makes the link absolute when given
+    """
+    expires = (int((now or time.time()) // LINK_LIFETIME) + 2) * LINK_LIFETIME
+    token = signing.Signer(salt=SIGNING_SALT).sign_object({'n': name, 'f': filename, 'e': expires})
+    url = reverse('serve_document', args=[token])
+    return request.build_absolute_uri(url) if request else url
+
+
+def document_filename(field, name):
+    """Download name for a profile document: the field plus the stored extension"""
+    return field + os.path.splitext(name)[1]
+
+
+def read_link(token, now=None):
+    """
+    ``(name, filename)`` a link was signed for.
+
+    Raises:
+        LinkError: Bad signature or expired link
+    """
+    try:
+        payload = signing.Signer(salt=SIGNING_SALT).unsign_object(token)
+    except signing.BadSignature:
+        raise LinkError('Invalid document link')
+    if payload['e'] < (now or time.time()):
+        raise LinkError('Document link has expired; reload the page for a new one')
+    return payload['n'], payload['f']
+
+
+def file_etag(name, stat):
+    # Blob names already are content digests
+    if is_blob(name):
+        return f'"{blob_digest(name)}"'
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def requested_range(request, size, etag, last_modified):
+    """
+    ``(start, end)`` of a single satisfiable byte range, ``None`` to send
+    the whole file, or ``False`` if the range cannot be satisfied.
+
+    Multiple ranges are answered with the whole file, which RFC 9110 allows.
+    """
+    header = request.META.get('HTTP_RANGE', '')
+    if not header.startswith('bytes=') or ',' in header:
+        return None
+
+    # A range only applies to the representation the client already holds
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        return None
+
+    first, dash, last = header[len('bytes='):].strip().partition('-')
+    if not dash or not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            return False
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return False
+    if end < start:
+        return None
+    return start, end
+
+
+class RangeFile:
+    """Read at most ``length`` bytes of a file from ``start``, for ``FileResponse``"""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def stream_file(request, path, size, content_type, filename, etag, last_modified):
+    """The whole file, the requested range of it, or a 416"""
+    byte_range = requested_range(request, size, etag, last_modified)
+    if byte_range is False:
+        served = HttpResponse(status=416, content_type=content_type)
+        served['Content-Range'] = f'bytes */{size}'
+        return served
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        served = FileResponse(file, content_type=content_type, filename=filename)
+    else:
+        start, end = byte_range
+        served = FileResponse(RangeFile(file, start, end - start + 1), status=206,
+                              content_type=content_type, filename=filename)
+        served['Content-Length'] = str(end - start + 1)
+        served['Content-Range'] = f'bytes {start}-{end}/{size}'
+    served.block_size = BLOCK_SIZE
+    served['Accept-Ranges'] = 'bytes'
+    served['ETag'] = etag
+    served['Last-Modified'] = http_date(last_modified)
+    return served
+
+
+def file_response(request, name, filename):
+    """
+    Response for a file under ``MEDIA_ROOT``, or ``None`` if it is missing.
+
+    Conditional requests get a 304 (or 412), and a single byte range a 206
+    with only those bytes read from disk.
+    """
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    etag = file_etag(name, stat)
+    last_modified = int(stat.st_mtime)
+
+    mode = settings.MEDIA_SENDFILE
+    if mode in SENDFILE_HEADERS:
+        served = HttpResponse(content_type=content_type)
+        served[SENDFILE_HEADERS[mode]] = (
+            path if mode == 'x-sendfile' else quote(settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + name)
+        )
+        served['Content-Disposition'] = content_disposition_header(False, filename)
+    else:
+        served = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if served is None:
+            served = stream_file(request, path, stat.st_size, content_type, filename, etag, last_modified)
+
+    # Signed links are per reviewer, so shared caches must not keep the file
+    served['Cache-Control'] = f'private, max-age={LINK_LIFETIME}'
+    served['X-Content-Type-Options'] = 'nosniff'
+    return served
@@ -0,0 +1,181 @@
+"""
+Coverage metrics and profile statistics for the SAKU admin dashboard
+"""
+from django.db.models import Count, Value
+from django.db.models.functions import Coalesce
+
+from .models import Department, Gender, UserType, CouncilPosition, VettingStatus
+from .rules import GENDER_TARGET_RULE, TARGET_MIN_RULE, get_rule_set
+
+# Coverage targets used when no rule sets them
+TARGET_MIN = 3  # Minimum delegates per department
+GENDER_TARGET_FEMALE = 0.33  # 33% target
+
+# Score weights
+WEIGHTS = {'w_min_gap': 5.0, 'w_gender_gap': 20.0, 'w_buffer': 2.0}
+
+
+def department_delegate_counts():
+    """
+    Per-department delegate totals read from the delegate counters.
+
+    One query over departments (joined to their counter rows), with no
+    COUNT over profiles; departments without a counter report zeros.
+    """
+    return (
+        Department.objects
+        .annotate(
+            total_candidates=Coalesce('delegate_counter__candidates', Value(0)),
+            qualified=Coalesce('delegate_counter__delegates', Value(0)),
+            male=Coalesce('delegate_counter__male', Value(0)),
+            female=Coalesce('delegate_counter__female', Value(0)),
+        )
+        .values('name', 'code', 'total_candidates', 'qualified', 'male', 'female')
+        .order_by('id')
+    )
+
+
+def department_metrics(row, target_min=TARGET_MIN, gender_target=GENDER_TARGET_FEMALE):
+    """
+    Build the metrics entry for one department from its counts.
+
+    ``qualified`` is the number of approved delegates; the gender ratio is
+    taken over them.
+    """
+    total_candidates = row['total_candidates']
+    qualified = row['qualified']
+    female_count = row['female']
+    female_ratio = female_count / max(1, qualified)
+
+    return {
+        'department': row['name'],
+        'code': row['code'],
+        'total_candidates': total_candidates,
+        'qualified': qualified,
+        'target_min': target_min,
+        'gap_to_min': max(0, target_min - qualified),
+        'female': female_count,
+        'male': row['male'],
+        'gender_ratio_female': female_ratio,
+        'gender_target_female': gender_target,
+        'gender_gap': max(0, gender_target - female_ratio),
+    }
+
+
+def coverage_targets():
+    """``(target_min, gender_target)`` from the rules, falling back to the defaults"""
+    rule_set = get_rule_set()
+    return (rule_set.setting(TARGET_MIN_RULE, TARGET_MIN),
+            rule_set.setting(GENDER_TARGET_RULE, GENDER_TARGET_FEMALE))
+
+
+def coverage_score(metrics_data):
+    """Overall coverage score computed from per-department metrics"""
+    total_gap = sum(dept['gap_to_min'] for dept in metrics_data)
+    total_gender_gap = sum(dept['gender_gap'] for dept in metrics_data)
+    score = max(0, 100 - (total_gap * WEIGHTS['w_min_gap']) - (total_gender_gap * WEIGHTS['w_gender_gap']))
+
+    return {'score': score, 'components': {
+        'min_gap_sum': total_gap,
+        'gender_gap_sum': total_gender_gap,
+        'buffer_sum': 0,
+        'weights': dict(WEIGHTS)
+    }}
+
+
+def coverage_metrics(rows=None):
+    """
+    Compute the full coverage payload used by ``DelegateViewSet.metrics``.
+
+    Args:
+        rows: Pre-aggregated per-department counts; defaults to
+            ``department_delegate_counts()`` (one query over the counters).
+
+    Returns:
+        dict: ``{'departments': [...], 'score': {...}}``
+    """
+    if rows is None:
+        rows = department_delegate_counts()
+    target_min, gender_target = coverage_targets()
+    metrics_data = [department_metrics(row, target_min, gender_target) for row in rows]
+    return {
+        'departments': metrics_data,
+        'score': coverage_score(metrics_data),
+    }
+
+
+# Optional extra grouping dimensions for profile statistics
+STATISTICS_DIMENSIONS = {
+    'faculty': 'faculty__name',
+    'department': 'department__name',
+}
+
+
+def profile_statistics(queryset, dimension=None):
+    """
+    Profile statistics for the admin dashboard from one grouped aggregate.
+
+    Profiles are grouped on ``(user_type, council_position, vetting_status,
+    is_qualified)`` and every total is folded from those rows in Python, so
+    the cost stays at one query however many positions or user types exist.
+
+    Args:
+        queryset: UserProfile queryset to aggregate
+        dimension: Optional key of ``STATISTICS_DIMENSIONS`` to add a
+            per-faculty or per-department breakdown
+
+    Returns:
+        dict: Statistics payload used by ``UserProfileViewSet.statistics``
+    """
+    group_fields = ['user_type', 'council_position', 'vetting_status', 'is_qualified']
+    dimension_field = STATISTICS_DIMENSIONS.get(dimension)
+    if dimension_field:
+        group_fields.append(dimension_field)
+
+    rows = queryset.order_by().values(*group_fields).annotate(n=Count('id'))
+
+    total_profiles = qualified_profiles = pending_profiles = 0
+    by_type = {}
+    by_position = {}
+    by_dimension = {}
+
+    for row in rows:
+        n = row['n']
+        total_profiles += n
+        if row['is_qualified']:
+            qualified_profiles += n
+        if row['vetting_status'] == VettingStatus.NOT_STARTED:
+            pending_profiles += n
+        by_type[row['user_type']] = by_type.get(row['user_type'], 0) + n
+        if row['user_type'] == UserType.ASPIRANT and row['council_position']:
+            by_position[row['council_position']] = by_position.get(row['council_position'], 0) + n
+
+        if dimension_field:
+            bucket = by_dimension.setdefault(row[dimension_field] or 'Unassigned', {
+                'total': 0, 'qualified': 0, 'pending': 0,
+            })
+            bucket['total'] += n
+            if row['is_qualified']:
+                bucket['qualified'] += n
+            if row['vetting_status'] == VettingStatus.NOT_STARTED:
+                bucket['pending'] += n
+
+    stats = {
+        'total_profiles': total_profiles,
+        'qualified_profiles': qualified_profiles,
+        'pending_profiles': pending_profiles,
+        'by_user_type': {
+            'aspirants': by_type.get(UserType.ASPIRANT, 0),
+            'delegates': by_type.get(UserType.DELEGATE, 0),
+            'ieck_members': by_type.get(UserType.IECK, 0)
+        },
+        # Keep the choice order and only report positions with aspirants
+        'by_position': {
+            position_name: by_position[position_code]
+            for position_code, position_name in CouncilPosition.choices
+            if by_position.get(position_code)
+        }
+    }
+    if dimension_field:
+        stats[f'by_{dimension}'] = by_dimension
+    return stats
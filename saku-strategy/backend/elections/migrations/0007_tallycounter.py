@@ -0,0 +1,27 @@
+# Generated by Django 4.2.24 on 2026-10-18 15:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0006_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TallyCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.CharField(choices=[('CHAIR', 'Chair (President)'), ('VICE_CHAIR', 'Vice Chair'), ('SECRETARY_GENERAL', 'Secretary General'), ('FINANCE_SECRETARY', 'Finance Secretary'), ('ACADEMIC_SECRETARY', 'Academic Secretary'), ('SPORTS_SECRETARY', 'Sports Secretary'), ('SPECIAL_INTERESTS_SECRETARY', 'Special Interests Secretary')], max_length=50)),
+                ('votes', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tally_counters', to='elections.userprofile')),
+            ],
+            options={
+                'unique_together': {('position', 'candidate')},
+            },
+        ),
+    ]
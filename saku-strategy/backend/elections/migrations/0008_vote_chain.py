@@ -0,0 +1,58 @@
+# Generated by Django 4.2.24 on 2026-10-18 15:09
+
+import hashlib
+
+from django.db import migrations, models
+
+GENESIS_HASH = '0' * 64
+
+
+def chain_existing_votes(apps, schema_editor):
+    """Re-hash votes cast before the chain existed, in id order, and create its head"""
+    Vote = apps.get_model('elections', 'Vote')
+    VoteChain = apps.get_model('elections', 'VoteChain')
+
+    previous, length, batch = GENESIS_HASH, 0, []
+    for vote in Vote.objects.order_by('id').only('id', 'receipt', 'voter_id', 'position', 'candidate_id').iterator(2000):
+        link = f"{previous}|{vote.receipt}|{vote.voter_id}|{vote.position}|{vote.candidate_id}"
+        vote.vote_hash = previous = hashlib.sha256(link.encode()).hexdigest()
+        length += 1
+        batch.append(vote)
+        if len(batch) >= 2000:
+            Vote.objects.bulk_update(batch, ['vote_hash'])
+            batch = []
+    Vote.objects.bulk_update(batch, ['vote_hash'])
+    VoteChain.objects.create(head_hash=previous, length=length)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0007_tallycounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteChain',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('head_hash', models.CharField(max_length=64)),
+                ('length', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VoteChainCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vote_id', models.PositiveBigIntegerField(unique=True)),
+                ('vote_hash', models.CharField(max_length=64)),
+                ('length', models.PositiveBigIntegerField(help_text='Votes in the chain up to and including this one')),
+                ('verified_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['vote_id'],
+            },
+        ),
+        migrations.RunPython(chain_existing_votes, migrations.RunPython.noop),
+    ]
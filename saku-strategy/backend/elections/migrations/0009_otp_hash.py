@@ -0,0 +1,23 @@
+# Generated by Django 4.2.24 on 2026-10-18 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0008_vote_chain'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(choices=[('QUALIFIED', 'Qualification'), ('REJECTED', 'Rejection'), ('ADMIN_ALERT', 'Admin Registration Alert'), ('OTP', 'One-Time Password')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='otp_code',
+            field=models.CharField(blank=True, help_text='Hash of the current OTP code', max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.24 on 2026-10-18 15:16
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def count_existing_delegates(apps, schema_editor):
+    """Seed one counter per department from the current profiles"""
+    Department = apps.get_model('elections', 'Department')
+    DepartmentDelegateCounter = apps.get_model('elections', 'DepartmentDelegateCounter')
+
+    approved = Q(users__user_type='DELEGATE', users__is_delegate=True)
+    # Department already has a ``delegates`` relation, so annotate under other names
+    departments = Department.objects.annotate(
+        n_candidates=Count('users', filter=Q(users__user_type='DELEGATE')),
+        n_delegates=Count('users', filter=approved),
+        n_male=Count('users', filter=approved & Q(users__gender='Male')),
+        n_female=Count('users', filter=approved & Q(users__gender='Female')),
+    ).values('id', 'n_candidates', 'n_delegates', 'n_male', 'n_female')
+    DepartmentDelegateCounter.objects.bulk_create([
+        DepartmentDelegateCounter(
+            department_id=row['id'], candidates=row['n_candidates'], delegates=row['n_delegates'],
+            male=row['n_male'], female=row['n_female'],
+        )
+        for row in departments
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0009_otp_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentDelegateCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('candidates', models.PositiveIntegerField(default=0, help_text='Registered delegate applicants')),
+                ('delegates', models.PositiveIntegerField(default=0, help_text='Approved delegates')),
+                ('male', models.PositiveIntegerField(default=0, help_text='Approved male delegates')),
+                ('female', models.PositiveIntegerField(default=0, help_text='Approved female delegates')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('department', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='delegate_counter', to='elections.department')),
+            ],
+        ),
+        migrations.RunPython(count_existing_delegates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.24 on 2026-10-18 15:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0010_department_delegate_counter'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='snapshot',
+            options={'get_latest_by': 'taken_at'},
+        ),
+        migrations.AddIndex(
+            model_name='snapshot',
+            index=models.Index(fields=['taken_at'], name='elections_snapshot_taken_idx'),
+        ),
+    ]
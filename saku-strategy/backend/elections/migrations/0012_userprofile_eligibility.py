@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-18 15:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0011_snapshot_taken_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='eligibility',
+            field=models.JSONField(blank=True, default=dict, help_text='Latest result of the eligibility rules'),
+        ),
+    ]
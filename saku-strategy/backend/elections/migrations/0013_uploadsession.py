@@ -0,0 +1,33 @@
+# Generated by Django 4.2.24 on 2026-10-18 15:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0012_userprofile_eligibility'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('document', models.CharField(help_text='Profile document field being uploaded', max_length=50)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField()),
+                ('sha256', models.CharField(max_length=64)),
+                ('received', models.PositiveBigIntegerField(default=0, help_text='Bytes stored so far')),
+                ('status', models.CharField(choices=[('OPEN', 'Uploading'), ('COMPLETE', 'Complete')], default='OPEN', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='elections.userprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['profile', 'document'], name='elections_u_profile_5e9e0b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.24 on 2026-10-18 15:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0013_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='document_thumbnails',
+            field=models.JSONField(blank=True, default=dict, help_text='Processed screenshots and their thumbnails'),
+        ),
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('PENDING', 'PENDING'), ('DONE', 'DONE'), ('FAILED', 'FAILED')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_jobs', to='elections.userprofile')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='elections_i_status_d4d457_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='imagejob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'PENDING')), fields=('profile', 'document'), name='elections_imagejob_one_pending'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.24 on 2026-10-18 15:31
+
+import django.core.validators
+from django.db import migrations, models
+import elections.models
+import elections.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0014_image_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('references', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='course_registration_screenshot',
+            field=models.ImageField(help_text='Current semester course registration screenshot', storage=elections.storage.document_storage, upload_to=elections.models.user_document_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])]),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='good_conduct_certificate',
+            field=models.FileField(help_text='Certificate of Good Conduct (PDF)', storage=elections.storage.document_storage, upload_to=elections.models.user_document_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf'])]),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='last_semester_results',
+            field=models.FileField(help_text='Last semester results (PDF)', storage=elections.storage.document_storage, upload_to=elections.models.user_document_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf'])]),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='last_semester_transcript',
+            field=models.FileField(help_text='Last semester transcript (PDF)', storage=elections.storage.document_storage, upload_to=elections.models.user_document_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf'])]),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='school_fees_screenshot',
+            field=models.ImageField(help_text='Screenshot showing 80%+ school fees clearance', storage=elections.storage.document_storage, upload_to=elections.models.user_document_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])]),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='school_id_image',
+            field=models.ImageField(help_text='School ID image', storage=elections.storage.document_storage, upload_to=elections.models.user_document_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])]),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='second_last_semester_results',
+            field=models.FileField(help_text='Second last semester results (PDF)', storage=elections.storage.document_storage, upload_to=elections.models.user_document_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf'])]),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='second_last_semester_transcript',
+            field=models.FileField(help_text='Second last semester transcript (PDF)', storage=elections.storage.document_storage, upload_to=elections.models.user_document_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf'])]),
+        ),
+    ]
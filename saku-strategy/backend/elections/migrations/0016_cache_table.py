@@ -0,0 +1,20 @@
+# Generated by Django 4.2.24 on 2026-10-18 18:02
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    """Table for the database cache backend; a no-op under Redis or local memory"""
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0015_content_addressed_documents'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
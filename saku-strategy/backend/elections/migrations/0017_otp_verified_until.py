@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-18 15:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0016_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='otp_verified_until',
+            field=models.DateTimeField(blank=True, help_text='Voter verified by OTP until this time', null=True),
+        ),
+    ]
@@ -1,7 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
+from django.utils import timezone
 import os
+import uuid
+
+from .storage import document_storage
 
 
 class Faculty(models.Model):
@@ -73,10 +78,40 @@ class CouncilPosition(models.TextChoices):
 
 
 def user_document_upload_path(instance, filename):
-    """Generate upload path for user documents"""
+    """Generate upload path for user documents (the document storage keeps only its extension)"""
     return f"documents/{instance.user_type}/{instance.student_id}/{filename}"
 
 
+class UserProfileQuerySet(models.QuerySet):
+    """Shared querysets for the profile endpoints"""
+
+    # Columns read by the compact list representation
+    LIST_FIELDS = [
+        'id', 'user_id', 'user_type', 'full_name', 'gender', 'student_id',
+        'faculty__name', 'department__name', 'course__name', 'year_of_study',
+        'council_position', 'vetting_status', 'is_qualified', 'is_delegate',
+        'verified_by_id', 'verified_at', 'whatsapp_notification_sent',
+        'school_fees_screenshot', 'last_semester_results', 'second_last_semester_results',
+        'course_registration_screenshot', 'good_conduct_certificate', 'school_id_image',
+        'last_semester_transcript', 'second_last_semester_transcript',
+        'created_at', 'updated_at',
+    ]
+
+    # Columns never read by the API serializers
+    UNSERIALIZED_FIELDS = ['otp_code', 'otp_expires_at', 'otp_sent_at', 'otp_attempts', 'otp_locked_until',
+                           'otp_verified_until']
+
+    def for_list(self):
+        """Profiles with only the columns and relations list rows read"""
+        return self.select_related('faculty', 'department', 'course').only(*self.LIST_FIELDS)
+
+    def for_detail(self):
+        """Profiles with every relation the nested profile serializer walks"""
+        return self.select_related(
+            'user', 'faculty', 'department__faculty', 'course__department__faculty', 'verified_by'
+        ).defer(*self.UNSERIALIZED_FIELDS)
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     user_type = models.CharField(max_length=20, choices=UserType.choices)
@@ -101,47 +136,57 @@ class UserProfile(models.Model):
     # Document Uploads
     school_fees_screenshot = models.ImageField(
         upload_to=user_document_upload_path,
+        storage=document_storage,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])],
         help_text="Screenshot showing 80%+ school fees clearance"
     )
     last_semester_results = models.FileField(
         upload_to=user_document_upload_path,
+        storage=document_storage,
         validators=[FileExtensionValidator(allowed_extensions=['pdf'])],
         help_text="Last semester results (PDF)"
     )
     second_last_semester_results = models.FileField(
         upload_to=user_document_upload_path,
+        storage=document_storage,
         validators=[FileExtensionValidator(allowed_extensions=['pdf'])],
         help_text="Second last semester results (PDF)"
     )
     course_registration_screenshot = models.ImageField(
         upload_to=user_document_upload_path,
+        storage=document_storage,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])],
         help_text="Current semester course registration screenshot"
     )
     good_conduct_certificate = models.FileField(
         upload_to=user_document_upload_path,
+        storage=document_storage,
         validators=[FileExtensionValidator(allowed_extensions=['pdf'])],
         help_text="Certificate of Good Conduct (PDF)"
     )
     school_id_image = models.ImageField(
         upload_to=user_document_upload_path,
+        storage=document_storage,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])],
         help_text="School ID image"
     )
     last_semester_transcript = models.FileField(
         upload_to=user_document_upload_path,
+        storage=document_storage,
         validators=[FileExtensionValidator(allowed_extensions=['pdf'])],
         help_text="Last semester transcript (PDF)"
     )
     second_last_semester_transcript = models.FileField(
         upload_to=user_document_upload_path,
+        storage=document_storage,
         validators=[FileExtensionValidator(allowed_extensions=['pdf'])],
         help_text="Second last semester transcript (PDF)"
     )
     
     # Verification Status
     vetting_status = models.CharField(max_length=20, choices=VettingStatus.choices, default=VettingStatus.NOT_STARTED)
+    eligibility = models.JSONField(default=dict, blank=True, help_text="Latest result of the eligibility rules")
+    document_thumbnails = models.JSONField(default=dict, blank=True, help_text="Processed screenshots and their thumbnails")
     is_qualified = models.BooleanField(default=False)
     verification_notes = models.TextField(blank=True, null=True)
     verified_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="verified_profiles")
@@ -150,10 +195,25 @@ class UserProfile(models.Model):
     # WhatsApp Notification
     whatsapp_notification_sent = models.BooleanField(default=False)
     whatsapp_notification_sent_at = models.DateTimeField(null=True, blank=True)
+
+    # Delegate Approval
+    is_delegate = models.BooleanField(default=False, help_text="Whether this aspirant is a delegate (votable)")
+    delegate_approved_at = models.DateTimeField(null=True, blank=True, help_text="When delegate status was approved")
+    delegate_approved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="approved_delegates")
+
+    # OTP Verification
+    otp_code = models.CharField(max_length=64, blank=True, null=True, help_text="Hash of the current OTP code")
+    otp_expires_at = models.DateTimeField(null=True, blank=True, help_text="OTP expiration time")
+    otp_sent_at = models.DateTimeField(null=True, blank=True, help_text="Last OTP sent timestamp")
+    otp_attempts = models.PositiveSmallIntegerField(default=0, help_text="Failed OTP attempts")
+    otp_locked_until = models.DateTimeField(null=True, blank=True, help_text="Lock account until this time after too many failed attempts")
+    otp_verified_until = models.DateTimeField(null=True, blank=True, help_text="Voter verified by OTP until this time")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UserProfileQuerySet.as_manager()
+
     def __str__(self) -> str:
         return f"{self.full_name} ({self.student_id}) - {self.get_user_type_display()}"
 
@@ -161,6 +221,79 @@ class UserProfile(models.Model):
         ordering = ['-created_at']
 
 
+class Vote(models.Model):
+    voter = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="votes_cast")
+    candidate = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="votes_received")
+    position = models.CharField(max_length=50, choices=CouncilPosition.choices)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.TextField(null=True, blank=True)
+    voted_at = models.DateTimeField(auto_now_add=True)
+    receipt = models.CharField(max_length=50, unique=True, null=True, blank=True, help_text="Unique vote receipt number")
+    vote_hash = models.CharField(max_length=64, null=True, blank=True, help_text="Hash for vote integrity verification")
+
+    def __str__(self) -> str:
+        return f"Vote {self.receipt} ({self.position})"
+
+    class Meta:
+        ordering = ['-voted_at']
+        unique_together = [('voter', 'position')]
+        indexes = [
+            models.Index(fields=['voter', 'position'], name='elections_v_voter_i_16ddd8_idx'),
+            models.Index(fields=['candidate', 'position'], name='elections_v_candida_d828f9_idx'),
+        ]
+
+
+class TallyCounter(models.Model):
+    """Running vote count for one candidate, incremented in the ballot transaction"""
+    position = models.CharField(max_length=50, choices=CouncilPosition.choices)
+    candidate = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="tally_counters")
+    votes = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.position}: {self.candidate_id} = {self.votes}"
+
+    class Meta:
+        unique_together = [('position', 'candidate')]
+
+
+class VoteChain(models.Model):
+    """Head of the vote hash chain; its row lock serializes appends"""
+    head_hash = models.CharField(max_length=64)
+    length = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Vote chain ({self.length} votes)"
+
+
+class VoteChainCheckpoint(models.Model):
+    """A verified link of the vote chain that later verifications can resume from"""
+    vote_id = models.PositiveBigIntegerField(unique=True)
+    vote_hash = models.CharField(max_length=64)
+    length = models.PositiveBigIntegerField(help_text="Votes in the chain up to and including this one")
+    verified_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"Checkpoint at vote {self.vote_id}"
+
+    class Meta:
+        ordering = ['vote_id']
+
+
+class DepartmentDelegateCounter(models.Model):
+    """Denormalized delegate totals for one department, kept current by the approval workflow"""
+    department = models.OneToOneField(Department, on_delete=models.CASCADE, related_name="delegate_counter")
+    candidates = models.PositiveIntegerField(default=0, help_text="Registered delegate applicants")
+    delegates = models.PositiveIntegerField(default=0, help_text="Approved delegates")
+    male = models.PositiveIntegerField(default=0, help_text="Approved male delegates")
+    female = models.PositiveIntegerField(default=0, help_text="Approved female delegates")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.department_id}: {self.delegates}/{self.candidates}"
+
+
 class Delegate(models.Model):
     full_name = models.CharField(max_length=255)
     gender = models.CharField(max_length=10, choices=Gender.choices)
@@ -187,6 +320,25 @@ class Rule(models.Model):
     def __str__(self) -> str:
         return self.key
 
+    def clean(self):
+        from .rules import RuleError, compile_rule
+
+        try:
+            compile_rule(self.key, self.value, self.citation)
+        except RuleError as exc:
+            raise ValidationError({'value': str(exc)})
+
+
+class StoredDocument(models.Model):
+    """Reference count for one content-addressed document blob (see ``documents.py``)"""
+    name = models.CharField(max_length=100, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    references = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.references} references)"
+
 
 class Snapshot(models.Model):
     taken_at = models.DateTimeField(auto_now_add=True)
@@ -194,3 +346,97 @@ class Snapshot(models.Model):
 
     def __str__(self) -> str:
         return f"Snapshot {self.taken_at}"
+
+    class Meta:
+        get_latest_by = 'taken_at'
+        indexes = [models.Index(fields=['taken_at'], name='elections_snapshot_taken_idx')]
+
+
+class NotificationKind(models.TextChoices):
+    QUALIFIED = "QUALIFIED", "Qualification"
+    REJECTED = "REJECTED", "Rejection"
+    ADMIN_ALERT = "ADMIN_ALERT", "Admin Registration Alert"
+    OTP = "OTP", "One-Time Password"
+
+
+class NotificationStatus(models.TextChoices):
+    PENDING = "PENDING", "PENDING"
+    SENT = "SENT", "SENT"
+    FAILED = "FAILED", "FAILED"
+
+
+class Notification(models.Model):
+    """Outbox row for a WhatsApp message, delivered by the dispatch_notifications worker"""
+    kind = models.CharField(max_length=20, choices=NotificationKind.choices)
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="notifications", null=True, blank=True)
+    phone_number = models.CharField(max_length=20)
+    message = models.TextField()
+    status = models.CharField(max_length=20, choices=NotificationStatus.choices, default=NotificationStatus.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} to {self.phone_number} ({self.status})"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+
+class UploadStatus(models.TextChoices):
+    OPEN = "OPEN", "Uploading"
+    COMPLETE = "COMPLETE", "Complete"
+
+
+class UploadSession(models.Model):
+    """Resumable chunked upload of one profile document (see ``uploads.py``)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="upload_sessions")
+    document = models.CharField(max_length=50, help_text="Profile document field being uploaded")
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    received = models.PositiveBigIntegerField(default=0, help_text="Bytes stored so far")
+    status = models.CharField(max_length=20, choices=UploadStatus.choices, default=UploadStatus.OPEN)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.document} for {self.profile_id} ({self.received}/{self.size})"
+
+    class Meta:
+        indexes = [models.Index(fields=['profile', 'document'])]
+
+
+class ImageJobStatus(models.TextChoices):
+    PENDING = "PENDING", "PENDING"
+    DONE = "DONE", "DONE"
+    FAILED = "FAILED", "FAILED"
+
+
+class ImageJob(models.Model):
+    """Queued normalization of an uploaded screenshot, run by the process_images worker"""
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="image_jobs")
+    document = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=ImageJobStatus.choices, default=ImageJobStatus.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.document} for {self.profile_id} ({self.status})"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['profile', 'document'], condition=models.Q(status='PENDING'),
+                name='elections_imagejob_one_pending'
+            )
+        ]
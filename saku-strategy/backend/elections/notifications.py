@@ -0,0 +1,183 @@
+"""
+Notification outbox for SAKU election platform
+
+Views only write outbox rows; the ``dispatch_notifications`` worker sends
+them in batches so request latency never depends on the messaging provider.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationKind, NotificationStatus, UserProfile
+from .whatsapp_service import WhatsAppService
+
+# Retry policy
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+
+# How long a claimed row is hidden from other workers while it is being sent
+CLAIM_LEASE_SECONDS = 5 * 60
+
+# Delivery error that retrying cannot fix
+NOT_CONFIGURED = 'WhatsApp API not configured'
+
+# Kinds that report delivery back to UserProfile.whatsapp_notification_sent
+VERDICT_KINDS = [NotificationKind.QUALIFIED, NotificationKind.REJECTED]
+
+# Stored in place of an OTP message once it no longer needs sending
+REDACTED = '[redacted]'
+
+
+def build_verdict_notification(profile):
+    """Unsaved outbox row telling an applicant about their verification verdict"""
+    if profile.is_qualified:
+        position = profile.get_council_position_display() if profile.council_position else None
+        kind = NotificationKind.QUALIFIED
+        message = WhatsAppService.qualification_message(profile.full_name, position)
+    else:
+        kind = NotificationKind.REJECTED
+        message = WhatsAppService.rejection_message(profile.full_name, profile.verification_notes)
+
+    return Notification(
+        kind=kind,
+        profile=profile,
+        phone_number=WhatsAppService.format_phone_number(profile.whatsapp_number),
+        message=message,
+    )
+
+
+def enqueue_verdict_notifications(profiles):
+    """
+    Queue verdict messages for profiles that have not been notified yet.
+
+    Pending verdicts for the same profiles are superseded, so a reviewer
+    changing their mind before the worker runs sends only the latest one.
+
+    Returns:
+        list: The created Notification rows
+    """
+    profiles = [profile for profile in profiles if not profile.whatsapp_notification_sent]
+    if not profiles:
+        return []
+
+    with transaction.atomic():
+        Notification.objects.filter(
+            profile__in=profiles, kind__in=VERDICT_KINDS, status=NotificationStatus.PENDING
+        ).delete()
+        return Notification.objects.bulk_create([build_verdict_notification(profile) for profile in profiles])
+
+
+def enqueue_admin_registration_alert(reg_number, user_type, position=None):
+    """Queue the new-registration alert for the admin"""
+    admin_phone = getattr(settings, 'ADMIN_PHONE_NUMBER', '+254700000000')
+    return Notification.objects.create(
+        kind=NotificationKind.ADMIN_ALERT,
+        phone_number=WhatsAppService.format_phone_number(admin_phone),
+        message=WhatsAppService.admin_registration_message(reg_number, user_type, position),
+    )
+
+
+def enqueue_otp(profile, code, minutes):
+    """Queue a one-time code, superseding any unsent code for the same profile"""
+    with transaction.atomic():
+        Notification.objects.filter(
+            profile=profile, kind=NotificationKind.OTP, status=NotificationStatus.PENDING
+        ).delete()
+        return Notification.objects.create(
+            kind=NotificationKind.OTP,
+            profile=profile,
+            phone_number=WhatsAppService.format_phone_number(profile.whatsapp_number),
+            message=WhatsAppService.otp_message(code, minutes),
+        )
+
+
+def retry_delay(attempts):
+    """Exponential backoff before the next delivery attempt"""
+    return timedelta(seconds=min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1)))
+
+
+def claim_batch(batch_size):
+    """
+    Claim up to ``batch_size`` due notifications for this worker.
+
+    Claimed rows are leased by pushing ``next_attempt_at`` forward, so a
+    crashed worker's rows become due again once the lease expires.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            Notification.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=NotificationStatus.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        Notification.objects.filter(id__in=[n.id for n in batch]).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+        )
+    return batch
+
+
+def deliver(service, notification):
+    """Send one notification; returns an error message or '' on success"""
+    if notification.kind == NotificationKind.ADMIN_ALERT:
+        sent = service._send_whatsapp_link(notification.phone_number, notification.message)
+    elif not service.is_configured:
+        return NOT_CONFIGURED
+    else:
+        sent = service._send_message(notification.phone_number, notification.message)
+    return '' if sent else 'Provider rejected the message'
+
+
+def dispatch_pending(batch_size=50, service=None):
+    """
+    Send one batch of due notifications.
+
+    Args:
+        batch_size: Maximum number of notifications to send
+        service: WhatsAppService to send with; a new one (with its own
+            pooled session) is created if omitted
+
+    Returns:
+        dict: Counts of ``sent``, ``retrying`` and ``failed`` notifications
+    """
+    service = service or WhatsAppService()
+    batch = claim_batch(batch_size)
+    counts = {'sent': 0, 'retrying': 0, 'failed': 0}
+    notified_profiles = []
+
+    for notification in batch:
+        error = deliver(service, notification)
+        now = timezone.now()
+        notification.attempts += 1
+        notification.last_error = error
+
+        if not error:
+            notification.status = NotificationStatus.SENT
+            notification.sent_at = now
+            counts['sent'] += 1
+            if notification.kind in VERDICT_KINDS:
+                notified_profiles.append(notification.profile_id)
+        elif notification.attempts >= MAX_ATTEMPTS or error == NOT_CONFIGURED:
+            notification.status = NotificationStatus.FAILED
+            counts['failed'] += 1
+        else:
+            notification.next_attempt_at = now + retry_delay(notification.attempts)
+            counts['retrying'] += 1
+
+        # Codes are not kept in the outbox once delivery is settled
+        if notification.kind == NotificationKind.OTP and notification.status != NotificationStatus.PENDING:
+            notification.message = REDACTED
+
+    with transaction.atomic():
+        Notification.objects.bulk_update(
+            batch, ['status', 'attempts', 'last_error', 'sent_at', 'next_attempt_at', 'message']
+        )
+        if notified_profiles:
+            UserProfile.objects.filter(id__in=notified_profiles).update(
+                whatsapp_notification_sent=True,
+                whatsapp_notification_sent_at=timezone.now()
+            )
+    return counts
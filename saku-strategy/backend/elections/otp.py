@@ -0,0 +1,194 @@
+"""
+One-time passwords for voter verification
+
+Codes are sent over WhatsApp through the notification outbox and only an
+HMAC of each code is stored. Every state change is a single conditional
+``UPDATE`` on the profile row (issue, consume, count a failure, lock out),
+so concurrent requests never read-modify-write the OTP columns. Resend
+throttling and known lockouts are checked in the cache first, so bursts of
+requests for the same voter are turned away without touching the row.
+"""
+import hashlib
+import hmac
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .models import UserProfile
+from .notifications import enqueue_otp
+
+OTP_DIGITS = 6
+OTP_TTL_SECONDS = 5 * 60
+RESEND_SECONDS = 60
+
+# How long a confirmed code lets the voter cast a ballot
+VERIFIED_SECONDS = 15 * 60
+
+# Wrong codes allowed before the profile is locked out
+MAX_ATTEMPTS = 5
+LOCKOUT_SECONDS = 15 * 60
+
+
+class OTPError(Exception):
+    """The code was not issued or not accepted"""
+
+
+class OTPThrottled(OTPError):
+    """A code was sent too recently"""
+
+    def __init__(self, retry_after):
+        super().__init__('A verification code was sent recently; please wait before requesting another')
+        self.retry_after = retry_after
+
+
+class OTPLocked(OTPError):
+    """Too many wrong codes; no codes are issued or accepted until the lockout ends"""
+
+    def __init__(self, locked_until):
+        super().__init__('Too many incorrect codes; try again later')
+        self.locked_until = locked_until
+
+
+class OTPExpired(OTPError):
+    """There is no active code to check against"""
+
+    def __init__(self):
+        super().__init__('No active verification code; please request a new one')
+
+
+class InvalidOTP(OTPError):
+    """The code did not match"""
+
+    def __init__(self, attempts_remaining):
+        super().__init__('Incorrect verification code')
+        self.attempts_remaining = attempts_remaining
+
+
+def generate_code():
+    return f"{secrets.randbelow(10 ** OTP_DIGITS):0{OTP_DIGITS}d}"
+
+
+def hash_code(profile_id, code):
+    """Keyed hash stored in ``otp_code``; binds the code to the profile"""
+    return hmac.new(settings.SECRET_KEY.encode(), f"{profile_id}:{code}".encode(), hashlib.sha256).hexdigest()
+
+
+def _resend_key(profile_id):
+    return f'otp:resend:{profile_id}'
+
+
+def _lock_key(profile_id):
+    return f'otp:locked:{profile_id}'
+
+
+def _unlocked(now):
+    return Q(otp_locked_until__isnull=True) | Q(otp_locked_until__lte=now)
+
+
+def _raise_if_cached_lock(profile_id):
+    locked_until = cache.get(_lock_key(profile_id))
+    if locked_until and locked_until > timezone.now():
+        raise OTPLocked(locked_until)
+
+
+def _raise_if_locked(profile_id):
+    """Raise OTPLocked if the profile row is locked, remembering it in the cache"""
+    now = timezone.now()
+    locked_until = UserProfile.objects.filter(pk=profile_id).values_list('otp_locked_until', flat=True).first()
+    if locked_until and locked_until > now:
+        cache.set(_lock_key(profile_id), locked_until, timeout=(locked_until - now).total_seconds())
+        raise OTPLocked(locked_until)
+
+
+def issue_otp(profile):
+    """
+    Send a new code to the profile's WhatsApp number.
+
+    Args:
+        profile: UserProfile (only ``id`` and ``whatsapp_number`` are read)
+
+    Returns:
+        datetime: When the new code expires
+
+    Raises:
+        OTPThrottled: A code was sent less than ``RESEND_SECONDS`` ago
+        OTPLocked: The profile is locked out
+    """
+    _raise_if_cached_lock(profile.id)
+    if not cache.add(_resend_key(profile.id), True, timeout=RESEND_SECONDS):
+        raise OTPThrottled(RESEND_SECONDS)
+
+    now = timezone.now()
+    code = generate_code()
+    expires_at = now + timedelta(seconds=OTP_TTL_SECONDS)
+    # The resend window is enforced here too, as the cache may be per-process
+    issued = UserProfile.objects.filter(
+        _unlocked(now),
+        Q(otp_sent_at__isnull=True) | Q(otp_sent_at__lte=now - timedelta(seconds=RESEND_SECONDS)),
+        pk=profile.id,
+    ).update(otp_code=hash_code(profile.id, code), otp_expires_at=expires_at, otp_sent_at=now)
+
+    if not issued:
+        _raise_if_locked(profile.id)
+        raise OTPThrottled(RESEND_SECONDS)
+
+    enqueue_otp(profile, code, OTP_TTL_SECONDS // 60)
+    return expires_at
+
+
+def verify_otp(profile_id, code):
+    """
+    Check and consume the profile's active code.
+
+    A matching code is cleared in the same ``UPDATE`` that checks it, so it
+    can be used once even when submitted concurrently, and the voter is
+    marked verified for ``VERIFIED_SECONDS``. A wrong code
+    increments ``otp_attempts``; the attempt that reaches ``MAX_ATTEMPTS``
+    clears the code and locks the profile for ``LOCKOUT_SECONDS``.
+
+    Returns:
+        datetime: When the verification expires
+
+    Raises:
+        InvalidOTP: Wrong code (``attempts_remaining`` before lockout)
+        OTPExpired: No active code
+        OTPLocked: The profile is locked out
+    """
+    _raise_if_cached_lock(profile_id)
+
+    now = timezone.now()
+    active = UserProfile.objects.filter(_unlocked(now), pk=profile_id, otp_code__isnull=False, otp_expires_at__gt=now)
+    verified_until = now + timedelta(seconds=VERIFIED_SECONDS)
+    if active.filter(otp_code=hash_code(profile_id, code)).update(
+        otp_code=None, otp_expires_at=None, otp_attempts=0, otp_verified_until=verified_until
+    ):
+        return verified_until
+
+    # All SET expressions read the row's values from before this UPDATE
+    reaches_limit = When(otp_attempts__gte=MAX_ATTEMPTS - 1, then=Value(None))
+    counted = active.update(
+        otp_attempts=Case(When(otp_attempts__gte=MAX_ATTEMPTS - 1, then=Value(0)), default=F('otp_attempts') + 1),
+        otp_locked_until=Case(
+            When(otp_attempts__gte=MAX_ATTEMPTS - 1, then=Value(now + timedelta(seconds=LOCKOUT_SECONDS))),
+            default=F('otp_locked_until'),
+            output_field=models.DateTimeField(),
+        ),
+        otp_code=Case(reaches_limit, default=F('otp_code'), output_field=models.CharField()),
+        otp_expires_at=Case(reaches_limit, default=F('otp_expires_at'), output_field=models.DateTimeField()),
+    )
+    _raise_if_locked(profile_id)
+    if not counted:
+        raise OTPExpired()
+
+    attempts = UserProfile.objects.filter(pk=profile_id).values_list('otp_attempts', flat=True).first() or 0
+    raise InvalidOTP(max(MAX_ATTEMPTS - attempts, 0))
+
+
+def is_verified(profile, now=None):
+    """Whether the profile confirmed a code within the last ``VERIFIED_SECONDS``"""
+    return bool(profile.otp_verified_until and profile.otp_verified_until > (now or timezone.now()))
@@ -0,0 +1,133 @@
+"""
+Public vote receipt verification
+
+Voters can check that their receipt was recorded. Lookups first go through
+an in-process Bloom filter of issued receipts, so malformed or made-up
+receipts are rejected without a database query; only receipts the filter
+may contain reach the unique index on ``Vote.receipt``.
+
+Receipts issued by this process are added when their ballot commits. Votes
+written by other processes are picked up by reading rows past the highest
+vote id seen, at most once per ``REFRESH_SECONDS``. Vote ids follow commit
+order (appends are serialized by the vote chain), so that never skips a row.
+"""
+import hashlib
+import math
+import re
+import threading
+import time
+
+from .models import CouncilPosition, Vote
+
+RECEIPT_RE = re.compile(r'^SAKU-[0-9A-F]{16}$')
+
+FALSE_POSITIVE_RATE = 0.001
+MIN_CAPACITY = 10000
+REFRESH_SECONDS = 1
+REFRESH_CHUNK_SIZE = 5000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings"""
+
+    def __init__(self, capacity, error_rate=FALSE_POSITIVE_RATE):
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class ReceiptFilter:
+    """Bloom filter over every issued receipt, topped up from new votes"""
+
+    def __init__(self):
+        self.bloom = None
+        self.last_vote_id = 0
+        self.refreshed_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def refresh(self, max_age=0):
+        """Add receipts of votes newer than the last one seen, unless refreshed within ``max_age`` seconds"""
+        with self._lock:
+            # Concurrent misses wait here; only the first one queries
+            if time.monotonic() - self.refreshed_at < max_age:
+                return
+            bloom, last_vote_id = self.bloom, self.last_vote_id
+            if bloom is None or bloom.count >= bloom.capacity:
+                # Fill a new, larger filter before swapping it in, so concurrent lookups never see it half-built
+                issued = Vote.objects.exclude(receipt=None).count()
+                bloom, last_vote_id = BloomFilter(max(MIN_CAPACITY, issued * 2)), 0
+
+            new_votes = (
+                Vote.objects.filter(id__gt=last_vote_id).exclude(receipt=None)
+                .order_by('id').values_list('id', 'receipt')
+            )
+            for vote_id, receipt in new_votes.iterator(chunk_size=REFRESH_CHUNK_SIZE):
+                bloom.add(receipt)
+                last_vote_id = vote_id
+            self.bloom, self.last_vote_id = bloom, last_vote_id
+            self.refreshed_at = time.monotonic()
+
+    def add(self, receipts):
+        """Add receipts issued by this process"""
+        with self._lock:
+            if self.bloom is not None:
+                for receipt in receipts:
+                    self.bloom.add(receipt)
+
+    def might_contain(self, receipt):
+        """False only if ``receipt`` was certainly never issued"""
+        if self.bloom is None:
+            self.refresh()
+        if receipt in self.bloom:
+            return True
+        if time.monotonic() - self.refreshed_at > REFRESH_SECONDS:
+            self.refresh(max_age=REFRESH_SECONDS)
+            return receipt in self.bloom
+        return False
+
+
+# Global instance
+receipt_filter = ReceiptFilter()
+
+
+def normalize_receipt(receipt):
+    return (receipt or '').strip().upper()
+
+
+def lookup_receipt(receipt):
+    """
+    Public details of the vote behind a receipt.
+
+    The chosen candidate is never revealed, nor is anything computed from
+    it: a vote's chain hash covers the voter and candidate ids, and with a
+    ballot's receipts in hand those small ids could be brute-forced from it.
+
+    Returns:
+        dict or None: ``receipt``, ``position``, ``position_display`` and
+        ``voted_at``; None if no such receipt was issued
+    """
+    receipt = normalize_receipt(receipt)
+    if not RECEIPT_RE.match(receipt) or not receipt_filter.might_contain(receipt):
+        return None
+
+    vote = Vote.objects.filter(receipt=receipt).values('receipt', 'position', 'voted_at').first()
+    if vote is not None:
+        vote['position_display'] = dict(CouncilPosition.choices).get(vote['position'], vote['position'])
+    return vote
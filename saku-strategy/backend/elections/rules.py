@@ -0,0 +1,307 @@
+"""
+Eligibility rule engine
+
+``Rule`` rows hold the election rules as data. Keys under ``eligibility.``
+are conditions on a delegate's or aspirant's fields::
+
+    key:   eligibility.min_year
+    value: {"field": "year_of_study", "op": "gte", "value": 2,
+            "applies_to": ["DELEGATE", "ASPIRANT"],
+            "message": "Must be in second year or above"}
+
+Any other key is a plain setting, such as the coverage targets read by
+``metrics``. Each process compiles the rows into Python predicates once per
+rules version, which every ``Rule`` write bumps through model signals (the
+same scheme as the catalogue), and evaluates whole querysets from
+``values()`` rows without building model instances.
+"""
+import operator
+import re
+import threading
+import time
+
+from django.core.exceptions import FieldDoesNotExist
+
+from .models import Delegate, Rule, UserType, VettingStatus
+from .versions import bump_version, current_version
+
+RULES_VERSION_KEY = 'elections:rules:version'
+
+# Rebuild at least this often, for writes that bypass model signals
+MAX_AGE_SECONDS = 5 * 60
+
+# Rows fetched per database round-trip when evaluating a queryset
+EVALUATION_CHUNK_SIZE = 2000
+
+ELIGIBILITY_PREFIX = 'eligibility.'
+
+# Settings keys and the value types they accept
+TARGET_MIN_RULE = 'coverage.target_min'
+GENDER_TARGET_RULE = 'coverage.gender_target_female'
+SETTING_TYPES = {
+    TARGET_MIN_RULE: (int,),
+    GENDER_TARGET_RULE: (int, float),
+}
+
+
+def _contains(actual, expected):
+    return actual in expected
+
+
+def _excludes(actual, expected):
+    return actual not in expected
+
+
+def _present(actual, expected):
+    return actual not in (None, '', [], {})
+
+
+OPERATORS = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+    'in': _contains,
+    'not_in': _excludes,
+    'required': _present,
+}
+
+_FIELD_RE = re.compile(r'^[a-z][a-z0-9_]*(__[a-z][a-z0-9_]*)*$')
+
+
+class RuleError(ValueError):
+    """A ``Rule`` value that cannot be compiled"""
+
+
+class Check:
+    """One compiled eligibility condition"""
+
+    def __init__(self, key, field, predicate, applies_to, message, citation):
+        self.key = key
+        self.field = field
+        self.predicate = predicate
+        self.applies_to = applies_to
+        self.message = message
+        self.citation = citation
+
+    def failure(self):
+        return {'rule': self.key, 'message': self.message, 'citation': self.citation}
+
+
+def compile_predicate(field, op, expected):
+    """``row -> bool`` for one condition; values that cannot be compared fail"""
+    compare = OPERATORS[op]
+
+    def predicate(row):
+        try:
+            return bool(compare(row.get(field), expected))
+        except TypeError:
+            return False
+
+    return predicate
+
+
+def compile_rule(key, value, citation=''):
+    """
+    Compile one ``Rule`` row.
+
+    Returns:
+        Check | None: The compiled condition, or None for a setting
+
+    Raises:
+        RuleError: If the value does not fit the key
+    """
+    if not key.startswith(ELIGIBILITY_PREFIX):
+        types = SETTING_TYPES.get(key)
+        if types and (isinstance(value, bool) or not isinstance(value, types)):
+            raise RuleError(f"{key} must be a number")
+        return None
+
+    if not isinstance(value, dict):
+        raise RuleError("Eligibility rules need an object value")
+    field = value.get('field')
+    if not isinstance(field, str) or not _FIELD_RE.match(field):
+        raise RuleError("'field' must name a profile field, e.g. 'year_of_study'")
+    op = value.get('op')
+    if op not in OPERATORS:
+        raise RuleError(f"'op' must be one of: {', '.join(OPERATORS)}")
+    expected = value.get('value')
+    if op in ('in', 'not_in') and not isinstance(expected, list):
+        raise RuleError(f"'{op}' needs a list 'value'")
+    applies_to = value.get('applies_to')
+    if applies_to is not None:
+        if not isinstance(applies_to, list) or not set(applies_to) <= set(UserType.values):
+            raise RuleError(f"'applies_to' must list user types: {', '.join(UserType.values)}")
+        applies_to = frozenset(applies_to)
+
+    return Check(key, field, compile_predicate(field, op, expected), applies_to,
+                 value.get('message') or f"Failed rule {key}", citation)
+
+
+def _resolves(model, path):
+    """Whether ``path`` (``__``-separated) names a field reachable from ``model``"""
+    names = path.split('__')
+    for i, name in enumerate(names):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        model = field.related_model
+        if model is None and i < len(names) - 1:
+            return False
+    return True
+
+
+def _instance_value(instance, path):
+    """What ``values(path)`` would return for the instance's row"""
+    *relations, last = path.split('__')
+    value = instance
+    for name in relations:
+        field = value._meta.get_field(name)
+        # Reverse and many-to-many relations have no rows for a new instance
+        if not field.concrete or getattr(value, field.attname) is None:
+            return None
+        value = getattr(value, name)
+    field = value._meta.get_field(last)
+    return getattr(value, field.attname) if field.concrete else None
+
+
+class RuleSet:
+    """Compiled snapshot of every ``Rule`` row"""
+
+    def __init__(self, rules, version):
+        """
+        Args:
+            rules: ``(key, value, citation)`` tuples
+            version: Rules version the snapshot was built from
+        """
+        self.version = version
+        self.built_at = time.monotonic()
+        self.settings = {}
+        self.checks = []
+        self._applicable = {}
+
+        for key, value, citation in rules:
+            try:
+                check = compile_rule(key, value, citation)
+            except RuleError as exc:
+                if not key.startswith(ELIGIBILITY_PREFIX):
+                    continue  # Bad setting: callers fall back to their default
+                # Fail closed: a broken eligibility rule rejects everyone it might cover
+                check = Check(key, None, lambda row: False, None, f"Misconfigured rule: {exc}", citation)
+            if check is None:
+                self.settings[key] = value
+            else:
+                self.checks.append(check)
+
+    def setting(self, key, default=None):
+        return self.settings.get(key, default)
+
+    def checks_for(self, model, user_type):
+        """Checks covering ``user_type`` whose field exists on ``model``"""
+        cache_key = (model, user_type)
+        checks = self._applicable.get(cache_key)
+        if checks is None:
+            checks = [
+                check for check in self.checks
+                if (check.applies_to is None or user_type in check.applies_to)
+                and (check.field is None or _resolves(model, check.field))
+            ]
+            self._applicable[cache_key] = checks
+        return checks
+
+    def evaluate(self, row, user_type, model):
+        """
+        Eligibility of one ``values()`` row.
+
+        Returns:
+            dict: Stored as ``eligibility``; ``status`` is ``pending`` when
+            no rule covers the row, otherwise ``eligible`` or ``ineligible``
+            with the failed rules
+        """
+        checks = self.checks_for(model, user_type)
+        if not checks:
+            return {'status': 'pending', 'message': 'Awaiting admin verification'}
+        failed = [check.failure() for check in checks if not check.predicate(row)]
+        return {'status': 'ineligible' if failed else 'eligible', 'failed': failed}
+
+    def evaluate_instance(self, instance):
+        """
+        Eligibility of one (possibly unsaved) ``Delegate`` or ``UserProfile``,
+        so a new row can be stored with its verdict in a single ``INSERT``.
+        """
+        model = type(instance)
+        user_type = UserType.DELEGATE if model is Delegate else instance.user_type
+        fields = {check.field for check in self.checks_for(model, user_type) if check.field}
+        return self.evaluate({field: _instance_value(instance, field) for field in fields}, user_type, model)
+
+    def evaluate_queryset(self, queryset, chunk_size=EVALUATION_CHUNK_SIZE):
+        """
+        Evaluate every row of a ``Delegate`` or ``UserProfile`` queryset.
+
+        Only the fields the rules read are selected, streamed in chunks.
+        ``Delegate`` rows are judged as ``DELEGATE``; profiles by their own
+        ``user_type``.
+
+        Yields:
+            tuple: ``(pk, eligibility)``
+        """
+        for row, eligibility in self.evaluate_rows(queryset, chunk_size=chunk_size):
+            yield row['pk'], eligibility
+
+    def evaluate_rows(self, queryset, extra=(), chunk_size=EVALUATION_CHUNK_SIZE):
+        """
+        Like ``evaluate_queryset``, yielding ``(row, eligibility)`` where
+        ``row`` also carries the ``extra`` fields.
+        """
+        model = queryset.model
+        type_field = None if model is Delegate else 'user_type'
+        fields = {check.field for check in self.checks if check.field and _resolves(model, check.field)}
+        fields.update(extra)
+        if type_field:
+            fields.add(type_field)
+
+        for row in queryset.values('pk', *sorted(fields)).iterator(chunk_size=chunk_size):
+            user_type = row[type_field] if type_field else UserType.DELEGATE
+            yield row, self.evaluate(row, user_type, model)
+
+
+def qualifies(eligibility, vetting_status):
+    """Qualified once vetting has passed, unless a rule rejects the row"""
+    return eligibility.get('status') != 'ineligible' and vetting_status == VettingStatus.PASSED
+
+
+def rules_version() -> int:
+    """Current rules version"""
+    return current_version(RULES_VERSION_KEY)
+
+
+def bump_rules_version() -> int:
+    """Invalidate every compiled rule set"""
+    return bump_version(RULES_VERSION_KEY)
+
+
+def build_rule_set(version):
+    """Compile every rule in one query"""
+    return RuleSet(Rule.objects.order_by('key').values_list('key', 'value', 'citation'), version)
+
+
+_rule_set = None
+_lock = threading.Lock()
+
+
+def _is_stale(rule_set, version):
+    return rule_set is None or rule_set.version != version or time.monotonic() - rule_set.built_at > MAX_AGE_SECONDS
+
+
+def get_rule_set():
+    """The current compiled rules, rebuilt if any rule changed or they are stale"""
+    global _rule_set
+    version = rules_version()
+    if _is_stale(_rule_set, version):
+        with _lock:
+            if _is_stale(_rule_set, version):
+                _rule_set = build_rule_set(version)
+    return _rule_set
@@ -1,11 +1,24 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.models import User
+from django.db import models
+from .media import document_filename, signed_url
 from .models import (
-    Faculty, Department, Course, Delegate, UserProfile, 
+    Faculty, Department, Course, Delegate, UploadSession, UserProfile, 
     UserType, CouncilPosition, VettingStatus
 )
 
 
+# OTP state is never exposed through the API
+OTP_FIELDS = ['otp_code', 'otp_expires_at', 'otp_sent_at', 'otp_attempts', 'otp_locked_until', 'otp_verified_until']
+
+# Verdict fields only administrators may write; ballot candidacy depends on them
+VETTING_FIELDS = ['vetting_status', 'is_qualified', 'verification_notes']
+
+# Changing what a student is standing for sends their application back to vetting
+CANDIDACY_FIELDS = ['user_type', 'council_position']
+
+
 class FacultySerializer(serializers.ModelSerializer):
     class Meta:
         model = Faculty
@@ -39,7 +52,29 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class SignedDocumentField(serializers.FileField):
+    """Renders the stored file as an expiring signed link (see media.py)"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return signed_url(value.name, document_filename(self.field_name, value.name), self.context.get('request'))
+
+
+class SignedImageField(SignedDocumentField, serializers.ImageField):
+    pass
+
+
+class SignedDocumentsMixin:
+    """Profile serializers only render profiles the requester may read, so their links are signed here"""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.FileField: SignedDocumentField,
+        models.ImageField: SignedImageField,
+    }
+
+
+class UserProfileSerializer(SignedDocumentsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     faculty = FacultySerializer(read_only=True)
     department = DepartmentSerializer(read_only=True)
@@ -51,15 +86,123 @@ class UserProfileSerializer(serializers.ModelSerializer):
     council_position_display = serializers.CharField(source='get_council_position_display', read_only=True)
     vetting_status_display = serializers.CharField(source='get_vetting_status_display', read_only=True)
     verified_by_name = serializers.CharField(source='verified_by.get_full_name', read_only=True)
+    thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = UserProfile
-        fields = '__all__'
+        exclude = OTP_FIELDS + ['document_thumbnails']
         read_only_fields = ['user', 'created_at', 'updated_at', 'verified_by', 'verified_at', 
-                           'whatsapp_notification_sent', 'whatsapp_notification_sent_at']
+                           'whatsapp_notification_sent', 'whatsapp_notification_sent_at',
+                           'is_delegate', 'delegate_approved_at', 'delegate_approved_by', 'eligibility']
+
+    def is_staff_request(self):
+        request = self.context.get('request')
+        return bool(request and request.user.is_staff)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.is_staff_request():
+            for field in VETTING_FIELDS:
+                fields[field].read_only = True
+        return fields
+
+    def update(self, instance, validated_data):
+        if not self.is_staff_request() and any(
+            field in validated_data and validated_data[field] != getattr(instance, field) for field in CANDIDACY_FIELDS
+        ):
+            validated_data.update(vetting_status=VettingStatus.NOT_STARTED, is_qualified=False)
+        return super().update(instance, validated_data)
+
+    def get_thumbnails(self, obj):
+        """Reviewer-size thumbnail URL per screenshot, once the current file is processed"""
+        thumbnails = {}
+        for field, processed in (obj.document_thumbnails or {}).items():
+            document = getattr(obj, field, None)
+            if document and processed.get('source') == document.name:
+                thumbnails[field] = signed_url(processed['thumbnail'], document_filename(field, processed['thumbnail']),
+                                               self.context.get('request'))
+        return thumbnails
+
+
+# Uploaded documents on a profile, reported as presence flags in list rows
+DOCUMENT_FIELDS = [
+    'school_fees_screenshot', 'last_semester_results', 'second_last_semester_results',
+    'course_registration_screenshot', 'good_conduct_certificate', 'school_id_image',
+    'last_semester_transcript', 'second_last_semester_transcript'
+]
+
+
+class UserProfileListSerializer(serializers.ModelSerializer):
+    """
+    Compact profile representation for list endpoints.
+
+    Related objects are flattened to ids and display names and documents
+    are reported as presence flags; the nested form is served by
+    ``UserProfileSerializer`` on retrieve.
+    """
+    faculty_name = serializers.CharField(source='faculty.name', read_only=True, default=None)
+    department_name = serializers.CharField(source='department.name', read_only=True, default=None)
+    course_name = serializers.CharField(source='course.name', read_only=True)
+    user_type_display = serializers.CharField(source='get_user_type_display', read_only=True)
+    council_position_display = serializers.CharField(source='get_council_position_display', read_only=True)
+    vetting_status_display = serializers.CharField(source='get_vetting_status_display', read_only=True)
+    documents = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UserProfile
+        fields = [
+            'id', 'user', 'user_type', 'user_type_display', 'full_name', 'gender', 'student_id',
+            'faculty', 'faculty_name', 'department', 'department_name', 'course', 'course_name',
+            'year_of_study', 'council_position', 'council_position_display',
+            'vetting_status', 'vetting_status_display', 'is_qualified', 'is_delegate',
+            'verified_by', 'verified_at', 'whatsapp_notification_sent', 'documents',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+    def get_documents(self, obj):
+        return {field: bool(getattr(obj, field)) for field in DOCUMENT_FIELDS}
+
+
+class VerificationVerdictSerializer(serializers.Serializer):
+    """One verdict in a bulk verification request"""
+    id = serializers.IntegerField()
+    is_qualified = serializers.BooleanField()
+    verification_notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class DelegateApprovalSerializer(serializers.Serializer):
+    """Profiles to promote to (or withdraw from) delegate status"""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
 
 
-class UserProfileCreateSerializer(serializers.ModelSerializer):
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """A chunked document upload and how far it has got"""
+    document = serializers.ChoiceField(choices=DOCUMENT_FIELDS)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'document', 'filename', 'size', 'sha256', 'received', 'status', 'created_at']
+        read_only_fields = ['id', 'received', 'status', 'created_at']
+
+
+class BallotChoiceSerializer(serializers.Serializer):
+    position = serializers.ChoiceField(choices=CouncilPosition.choices)
+    candidate = serializers.IntegerField()
+
+
+class BallotSerializer(serializers.Serializer):
+    """A voter's choices for every position they are voting on"""
+    votes = BallotChoiceSerializer(many=True, allow_empty=False)
+
+    def validate_votes(self, votes):
+        positions = [vote['position'] for vote in votes]
+        if len(positions) != len(set(positions)):
+            raise serializers.ValidationError('Each position may only be voted for once per ballot')
+        return votes
+
+
+class UserProfileCreateSerializer(SignedDocumentsMixin, serializers.ModelSerializer):
     username = serializers.CharField(write_only=True)
     email = serializers.EmailField(write_only=True)
     password = serializers.CharField(write_only=True, min_length=8)
@@ -67,7 +210,13 @@ class UserProfileCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
         exclude = ['user', 'verified_by', 'verified_at', 'whatsapp_notification_sent', 
-                  'whatsapp_notification_sent_at', 'created_at', 'updated_at']
+                  'whatsapp_notification_sent_at', 'created_at', 'updated_at',
+                  'is_delegate', 'delegate_approved_at', 'delegate_approved_by'] + OTP_FIELDS
+        # Documents can be attached after registration through the chunked upload API
+        extra_kwargs = {
+            **{field: {'required': False} for field in DOCUMENT_FIELDS},
+            **{field: {'read_only': True} for field in VETTING_FIELDS},
+        }
 
     def create(self, validated_data):
         # Extract user data
@@ -175,4 +324,32 @@ class DelegateSerializer(serializers.ModelSerializer):
         read_only_fields = ['eligibility','is_qualified','created_at']
 
 
+class ProfileTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Token serializer that attaches the user's profile to the token pair.
+
+    Credentials are checked once by the parent serializer; the profile is
+    loaded from the already-authenticated user with all its relations in a
+    single query.
+    """
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        user = self.user
 
+        try:
+            profile = UserProfile.objects.for_detail().get(user=user)
+            data['profile'] = UserProfileSerializer(profile).data
+            data['user_type'] = profile.user_type
+        except UserProfile.DoesNotExist:
+            # If no profile exists, create basic user data
+            data['profile'] = {
+                'id': user.id,
+                'username': user.username,
+                'email': user.email,
+                'first_name': user.first_name,
+                'last_name': user.last_name,
+            }
+            data['user_type'] = 'STUDENT'
+        data['is_admin'] = user.is_staff
+        return data
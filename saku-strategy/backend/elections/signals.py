@@ -0,0 +1,92 @@
+"""
+Model signal handlers for the elections app
+"""
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .catalogue import bump_catalogue_version
+from .delegates import adjust_counters, counted_state, counter_deltas, saved_state
+from .documents import adjust_references, document_names, reference_deltas
+from .events import registration_event
+from .images import IMAGE_FIELDS, enqueue_images, stale_images
+from .serializers import DOCUMENT_FIELDS
+from .models import Faculty, Department, Course, Rule, UserProfile
+from .rules import bump_rules_version
+
+
+@receiver([post_save, post_delete], sender=Faculty)
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Course)
+def catalogue_changed(sender, **kwargs):
+    """Invalidate catalogue caches (course search index) on any catalogue write"""
+    bump_catalogue_version()
+
+
+@receiver([post_save, post_delete], sender=Rule)
+def rules_changed(sender, **kwargs):
+    """Recompile eligibility rules in every process on their next use"""
+    bump_rules_version()
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_registered(sender, instance, created, **kwargs):
+    """Push new registrations to live dashboards"""
+    if created:
+        registration_event(instance)
+
+
+@receiver(post_init, sender=UserProfile)
+def remember_counted_state(sender, instance, **kwargs):
+    """Note the fields the delegate counters depend on so a save can tell what changed"""
+    instance._counted_state = counted_state(instance)
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_counters_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Move the profile between department delegate counters when its counted fields change"""
+    previous = None if created else instance._counted_state
+    current = saved_state(previous, counted_state(instance), update_fields)
+    # A snapshot missing deferred fields cannot say what changed
+    if created or (previous is not None and current is not None):
+        adjust_counters(counter_deltas(previous, current))
+    instance._counted_state = current
+
+
+@receiver(post_delete, sender=UserProfile)
+def profile_deleted(sender, instance, **kwargs):
+    """Keep the department delegate counters in step with deleted applicants"""
+    adjust_counters(counter_deltas(instance._counted_state, None))
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_images_changed(sender, instance, update_fields=None, **kwargs):
+    """Queue new screenshots for normalization and thumbnails"""
+    if update_fields is not None and not set(update_fields) & set(IMAGE_FIELDS):
+        return
+    if set(IMAGE_FIELDS) & instance.get_deferred_fields():
+        return
+    fields = stale_images(instance)
+    if fields:
+        enqueue_images(instance, fields)
+
+
+@receiver(post_init, sender=UserProfile)
+def remember_documents(sender, instance, **kwargs):
+    """Note the stored document names so a save can tell which ones changed"""
+    instance._stored_documents = document_names(instance)
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_documents_saved(sender, instance, update_fields=None, **kwargs):
+    """Move document references from replaced files to new ones"""
+    current = document_names(instance)
+    fields = DOCUMENT_FIELDS if update_fields is None else [f for f in DOCUMENT_FIELDS if f in update_fields]
+    adjust_references(reference_deltas(instance._stored_documents, current, fields))
+    instance._stored_documents = current
+
+
+@receiver(post_delete, sender=UserProfile)
+def profile_documents_deleted(sender, instance, **kwargs):
+    adjust_references({name: -count for name, count in Counter(document_names(instance).values()).items()})
@@ -0,0 +1,115 @@
+"""
+Historical dashboard totals
+
+The ``take_snapshot`` command stores aggregate totals as ``Snapshot`` rows
+at a fixed cadence. Trend charts read a downsampled series of those rows
+instead of recomputing totals against the live tables.
+"""
+from django.db.models import Count, Q, Sum
+
+from .metrics import coverage_metrics
+from .models import Gender, Snapshot, TallyCounter, UserProfile, UserType, VettingStatus, Vote
+
+# Series endpoint limits
+DEFAULT_POINTS = 200
+MAX_POINTS = 1000
+
+
+def registration_totals():
+    """Registration, vetting and gender totals from one aggregate query"""
+    counts = UserProfile.objects.aggregate(
+        total=Count('id'),
+        qualified=Count('id', filter=Q(is_qualified=True)),
+        delegates=Count('id', filter=Q(is_delegate=True)),
+        female=Count('id', filter=Q(gender=Gender.FEMALE)),
+        male=Count('id', filter=Q(gender=Gender.MALE)),
+        **{f'type_{value}': Count('id', filter=Q(user_type=value)) for value in UserType.values},
+        **{f'vetting_{value}': Count('id', filter=Q(vetting_status=value)) for value in VettingStatus.values},
+    )
+    return {
+        'registrations': {
+            'total': counts['total'],
+            'by_user_type': {value: counts[f'type_{value}'] for value in UserType.values},
+        },
+        'vetting': {
+            **{value: counts[f'vetting_{value}'] for value in VettingStatus.values},
+            'qualified': counts['qualified'],
+        },
+        'gender': {
+            'female': counts['female'],
+            'male': counts['male'],
+            'female_ratio': counts['female'] / max(1, counts['total']),
+        },
+        'delegates': counts['delegates'],
+    }
+
+
+def coverage_totals():
+    """Delegate coverage score and gaps, read from the department counters"""
+    score = coverage_metrics()['score']
+    return {
+        'score': score['score'],
+        'min_gap_sum': score['components']['min_gap_sum'],
+        'gender_gap_sum': score['components']['gender_gap_sum'],
+    }
+
+
+def turnout_totals(eligible):
+    """Voters and votes so far, or None before voting has started"""
+    votes = TallyCounter.objects.aggregate(total=Sum('votes'))['total']
+    if not votes:
+        return None
+    voters = Vote.objects.aggregate(n=Count('voter', distinct=True))['n']
+    return {
+        'votes': votes,
+        'voters': voters,
+        'eligible': eligible,
+        'rate': voters / max(1, eligible),
+    }
+
+
+def compute_totals():
+    """Everything stored in one snapshot"""
+    totals = registration_totals()
+    totals['coverage'] = coverage_totals()
+    turnout = turnout_totals(totals['registrations']['total'])
+    if turnout is not None:
+        totals['turnout'] = turnout
+    return totals
+
+
+def take_snapshot():
+    return Snapshot.objects.create(totals=compute_totals())
+
+
+def snapshot_series(since=None, until=None, points=DEFAULT_POINTS):
+    """
+    Snapshots in a time range, downsampled to at most ``points`` rows.
+
+    The range is split into ``points`` equal time buckets and the latest
+    snapshot in each bucket is kept. Only ids and timestamps are read to
+    pick them; totals are loaded for the chosen rows alone.
+
+    Returns:
+        tuple: ``(snapshots, total_in_range)`` with snapshots oldest first
+    """
+    snapshots = Snapshot.objects.all()
+    if since is not None:
+        snapshots = snapshots.filter(taken_at__gte=since)
+    if until is not None:
+        snapshots = snapshots.filter(taken_at__lte=until)
+
+    stamps = list(snapshots.order_by('taken_at', 'id').values_list('id', 'taken_at'))
+    if len(stamps) > points:
+        start, end = stamps[0][1], stamps[-1][1]
+        width = (end - start) / points
+        latest = {}
+        for snapshot_id, taken_at in stamps:
+            bucket = min(int((taken_at - start) / width), points - 1) if width else 0
+            latest[bucket] = snapshot_id
+        chosen = sorted(latest.values())
+    else:
+        chosen = [snapshot_id for snapshot_id, _ in stamps]
+
+    rows = list(Snapshot.objects.filter(id__in=chosen).order_by('taken_at', 'id').values('taken_at', 'totals'))
+    return rows, len(stamps)
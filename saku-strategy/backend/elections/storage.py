@@ -0,0 +1,90 @@
+"""
+Content-addressed file storage for profile documents
+
+Files are stored under the SHA-256 of their bytes,
+``blobs/<aa>/<bb>/<sha256><ext>``, so identical uploads (re-submitted
+transcripts, the same good-conduct template) share one file and a new
+upload never collides with an old one. The digest is computed while the
+upload is streamed to a temporary file, in the same single pass that
+writes it.
+
+Which blobs are still in use is tracked by ``documents.py``; this module
+only knows about files.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+BLOB_PREFIX = 'blobs'
+INCOMING_DIR = 'blobs/.incoming'
+
+_EXTENSION_RE = re.compile(r'^\.[a-z0-9]{1,10}$')
+_BLOB_RE = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]{1,10})?$')
+
+
+def blob_name(digest, extension=''):
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def is_blob(name):
+    return bool(name) and bool(_BLOB_RE.match(name))
+
+
+def blob_digest(name):
+    """SHA-256 a blob name was derived from"""
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def thumbnail_name(name):
+    root, _ = os.path.splitext(name)
+    return f'{root}.thumb.jpg'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """``FileSystemStorage`` that names every file after its SHA-256"""
+
+    def get_available_name(self, name, max_length=None):
+        # The stored name comes from the content, so the upload name never needs a suffix
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        if not _EXTENSION_RE.match(extension):
+            extension = ''
+
+        incoming = self.path(INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=incoming)
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    out.write(chunk)
+
+            name = blob_name(digest.hexdigest(), extension)
+            path = self.path(name)
+            if os.path.exists(path):
+                # Already stored: refresh its mtime so a pending sweep leaves it alone
+                os.remove(temp_path)
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+
+def document_storage():
+    """Storage for ``UserProfile`` documents (a callable so settings overrides apply)"""
+    return ContentAddressedStorage()
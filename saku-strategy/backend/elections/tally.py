@@ -0,0 +1,106 @@
+"""
+Incremental live tally for SAKU council elections
+
+Each ballot increments one ``TallyCounter`` row per chosen candidate in the
+same transaction that records the votes, so results are read from the
+counters in O(candidates) instead of counting the Vote table on every poll.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import CouncilPosition, TallyCounter, Vote
+
+
+def record_votes(choices):
+    """
+    Add one vote to each chosen candidate's counter.
+
+    Must run inside the ballot's transaction. Missing counter rows are
+    created first (ignoring ones another ballot created concurrently), then
+    every counter is incremented in a single ``UPDATE``.
+
+    Args:
+        choices: Mapping of council position to candidate profile id
+    """
+    TallyCounter.objects.bulk_create(
+        [TallyCounter(position=position, candidate_id=candidate_id) for position, candidate_id in choices.items()],
+        ignore_conflicts=True
+    )
+    TallyCounter.objects.filter(
+        reduce(or_, (Q(position=position, candidate_id=candidate_id) for position, candidate_id in choices.items()))
+    ).update(votes=F('votes') + 1, updated_at=timezone.now())
+
+
+def results():
+    """
+    Current standings per position, read from the counters only.
+
+    Returns:
+        dict: ``{position: {'position_display', 'total_votes', 'candidates': [...]}}``
+        with candidates sorted by votes, most first
+    """
+    counters = (
+        TallyCounter.objects
+        .select_related('candidate')
+        .only('position', 'votes', 'candidate__id', 'candidate__full_name', 'candidate__student_id')
+        .order_by('position', '-votes', 'candidate_id')
+    )
+    labels = dict(CouncilPosition.choices)
+    standings = {}
+    for counter in counters:
+        entry = standings.setdefault(counter.position, {
+            'position_display': labels.get(counter.position, counter.position),
+            'total_votes': 0,
+            'candidates': [],
+        })
+        entry['total_votes'] += counter.votes
+        entry['candidates'].append({
+            'id': counter.candidate.id,
+            'full_name': counter.candidate.full_name,
+            'student_id': counter.candidate.student_id,
+            'votes': counter.votes,
+        })
+    return standings
+
+
+def reconcile(fix=False):
+    """
+    Recompute the tally from raw votes and compare it with the counters.
+
+    Ballots cast while this runs can show up as transient drift; run with
+    ``fix`` once voting has closed or is paused.
+
+    Args:
+        fix: Overwrite drifted counters with the recomputed values
+
+    Returns:
+        list: ``(position, candidate_id, counted, recorded)`` for every
+        counter that disagrees with the raw votes
+    """
+    counted = {
+        (row['position'], row['candidate_id']): row['n']
+        for row in Vote.objects.order_by().values('position', 'candidate_id').annotate(n=Count('id'))
+    }
+    recorded = {
+        (position, candidate_id): votes
+        for position, candidate_id, votes in TallyCounter.objects.values_list('position', 'candidate_id', 'votes')
+    }
+
+    drift = [
+        (*key, counted.get(key, 0), recorded.get(key, 0))
+        for key in sorted(counted.keys() | recorded.keys())
+        if counted.get(key, 0) != recorded.get(key, 0)
+    ]
+
+    if fix and drift:
+        TallyCounter.objects.bulk_create(
+            [TallyCounter(position=position, candidate_id=candidate_id, votes=votes)
+             for position, candidate_id, votes, _ in drift],
+            update_conflicts=True,
+            unique_fields=['position', 'candidate'],
+            update_fields=['votes', 'updated_at'],
+        )
+    return drift
@@ -1,3 +1,1810 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import frontend
+from core.urls import serve_frontend_file
+
+from .models import (
+    Faculty, Department, Course, Delegate, DepartmentDelegateCounter, ImageJob, UserProfile, Notification, NotificationKind,
+    NotificationStatus, Rule, Snapshot, StoredDocument, TallyCounter, UploadSession, Vote, VoteChainCheckpoint
+)
+from . import ballots, checks, delegates, documents, media, otp, receipts, uploads
+from .delegates import reconcile as delegate_reconcile
+from .eligibility import recompute, recompute_range, shard_ranges
+from .images import process_pending
+from .storage import document_storage
+from .events import STREAM_TOKEN_SECONDS, EventHub, hub, issue_stream_token, read_stream_token
+from .metrics import coverage_metrics
+from .notifications import MAX_ATTEMPTS, dispatch_pending, enqueue_verdict_notifications
+from .receipts import BloomFilter, ReceiptFilter
+from .rules import bump_rules_version, get_rule_set
+from .snapshots import compute_totals
+from .tally import reconcile
+from .vote_chain import GENESIS_HASH, link_hash, verify_chain
+from .views import ReceiptLookupThrottle
+from .whatsapp_service import WhatsAppService
+
+
+def make_catalogue(departments=1, courses_per_department=1):
+    """Create a faculty with the given number of departments and courses"""
+    faculty = Faculty.objects.create(code='technology', name='School of Technology')
+    created = []
+    for i in range(departments):
+        dept = Department.objects.create(faculty=faculty, code=f'dept_{i}', name=f'Department {i}')
+        for j in range(courses_per_department):
+            Course.objects.create(department=dept, name=f'Course {i}-{j}', code=f'C{i}{j}')
+        created.append(dept)
+    return faculty, created
+
+
+def make_profile(course, n, **extra):
+    """Create a user with a profile on the given course"""
+    user = User.objects.create_user(username=f'student{n}')
+    fields = {
+        'user_type': 'STUDENT', 'full_name': f'Student {n}', 'gender': 'Female',
+        'student_id': f'KCA/{n:05d}', 'faculty': course.department.faculty,
+        'department': course.department, 'course': course, 'year_of_study': 2,
+        'whatsapp_number': '+254700000000', 'email': f'student{n}@example.com',
+        'phone_number': '+254700000000',
+    }
+    fields.update(extra)
+    return UserProfile.objects.create(user=user, **fields)
+
+
+class DelegateMetricsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.next_n = 100
+        get_rule_set()  # Compiled once per process; keep it out of the query counts
+
+    def _add_applicants(self, dept, genders, qualified=0):
+        course = dept.courses.first()
+        profiles = []
+        for i, gender in enumerate(genders):
+            self.next_n += 1
+            profiles.append(make_profile(course, self.next_n, user_type='DELEGATE', gender=gender,
+                                         is_qualified=i < qualified))
+        return profiles
+
+    def _approve(self, profiles):
+        return self.client.post('/api/profiles/approve_delegates/', {'ids': [p.id for p in profiles]}, format='json')
+
+    def _metrics_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get('/api/delegates/metrics/')
+        self.assertEqual(resp.status_code, 200)
+        return resp.json(), len(ctx.captured_queries)
+
+    def test_metrics_counts_and_empty_departments(self):
+        _, (dept_a, dept_b) = make_catalogue(departments=2)
+        applicants = self._add_applicants(dept_a, ['Male', 'Female', 'Female', 'Male'], qualified=3)
+        self._approve(applicants)
+
+        data, _ = self._metrics_queries()
+        by_code = {d['code']: d for d in data['departments']}
+
+        self.assertEqual(by_code['dept_0']['total_candidates'], 4)
+        self.assertEqual(by_code['dept_0']['qualified'], 3)
+        self.assertEqual(by_code['dept_0']['male'], 1)
+        self.assertEqual(by_code['dept_0']['female'], 2)
+        self.assertEqual(by_code['dept_0']['gap_to_min'], 0)
+        self.assertEqual(by_code['dept_0']['gender_gap'], 0)
+        self.assertEqual(by_code['dept_1']['total_candidates'], 0)
+        self.assertEqual(by_code['dept_1']['gap_to_min'], 3)
+        self.assertAlmostEqual(by_code['dept_1']['gender_gap'], 0.33)
+
+        components = data['score']['components']
+        self.assertEqual(components['min_gap_sum'], 3)
+        self.assertAlmostEqual(data['score']['score'], 100 - 3 * 5 - 0.33 * 20)
+
+    def test_metrics_query_count_is_constant(self):
+        _, departments = make_catalogue(departments=2)
+        for dept in departments:
+            self._approve(self._add_applicants(dept, ['Male', 'Female'], qualified=2))
+        _, small = self._metrics_queries()
+
+        faculty = Faculty.objects.get()
+        for i in range(2, 12):
+            dept = Department.objects.create(faculty=faculty, code=f'dept_{i}', name=f'Department {i}')
+            Course.objects.create(department=dept, name=f'Course {i}')
+            self._approve(self._add_applicants(dept, ['Female'], qualified=1))
+        with CaptureQueriesContext(connection) as ctx:
+            data, large = self._metrics_queries()
+
+        self.assertEqual(len(data['departments']), 12)
+        self.assertEqual(small, large)
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+
+    def test_approval_is_one_bulk_update(self):
+        _, (dept_a, dept_b) = make_catalogue(departments=2)
+        eligible = self._add_applicants(dept_a, ['Female'] * 3, qualified=3) + \
+            self._add_applicants(dept_b, ['Male'] * 2, qualified=2)
+        unvetted, = self._add_applicants(dept_a, ['Male'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self._approve(eligible + [unvetted])
+        self.assertEqual(sorted(resp.json()['approved']), sorted(p.id for p in eligible))
+        self.assertEqual(resp.json()['skipped'], [unvetted.id])
+        profile_updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "elections_userprofile"')]
+        self.assertEqual(len(profile_updates), 1)
+
+        promoted = UserProfile.objects.get(id=eligible[0].id)
+        self.assertTrue(promoted.is_delegate)
+        self.assertEqual(promoted.delegate_approved_by, self.admin)
+
+        # Approving again changes nothing
+        self.assertEqual(self._approve(eligible).json()['approved'], [])
+        counters = {c.department_id: (c.candidates, c.delegates, c.male, c.female)
+                    for c in DepartmentDelegateCounter.objects.all()}
+        self.assertEqual(counters, {dept_a.id: (4, 3, 0, 3), dept_b.id: (2, 2, 2, 0)})
+
+    def test_revoke_and_delete_keep_counters_in_step(self):
+        _, (dept,) = make_catalogue()
+        first, second = self._add_applicants(dept, ['Male', 'Female'], qualified=2)
+        self._approve([first, second])
+
+        resp = self.client.post('/api/profiles/revoke_delegates/', {'ids': [first.id]}, format='json')
+        self.assertEqual(resp.json()['revoked'], [first.id])
+        UserProfile.objects.get(id=second.id).delete()
+
+        self.assertEqual(delegate_reconcile(), [])
+        counter = DepartmentDelegateCounter.objects.get(department=dept)
+        self.assertEqual((counter.candidates, counter.delegates, counter.male, counter.female), (1, 0, 0, 0))
+
+    def _counters(self):
+        return {c.department_id: (c.candidates, c.delegates, c.male, c.female)
+                for c in DepartmentDelegateCounter.objects.all()}
+
+    def test_profile_edits_move_counters(self):
+        _, (dept_a, dept_b) = make_catalogue(departments=2)
+        first, second, third = self._add_applicants(dept_a, ['Male', 'Female', 'Female'], qualified=3)
+        self._approve([first, second])
+
+        resp = self.client.patch(f'/api/profiles/{first.id}/', {'gender': 'Female'}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.client.force_authenticate(third.user)
+        resp = self.client.put('/api/auth/profile/update/', {'user_type': 'ASPIRANT'}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        moved = UserProfile.objects.get(id=second.id)
+        moved.department = dept_b
+        moved.save()
+
+        self.assertEqual(delegate_reconcile(), [])
+        self.assertEqual(self._counters(), {dept_a.id: (1, 1, 0, 1), dept_b.id: (1, 1, 0, 1)})
+
+    def test_failing_verdicts_withdraw_delegate_status(self):
+        _, (dept,) = make_catalogue()
+        first, second, third = self._add_applicants(dept, ['Male', 'Female', 'Female'], qualified=3)
+        self._approve([first, second, third])
+
+        resp = self.client.post(f'/api/profiles/{first.id}/verify/', {'is_qualified': False}, format='json')
+        self.assertFalse(resp.json()['is_delegate'])
+        resp = self.client.post('/api/profiles/bulk_verify/', [
+            {'id': second.id, 'is_qualified': False}, {'id': third.id, 'is_qualified': True}
+        ], format='json')
+        self.assertEqual(resp.status_code, 200)
+
+        self.assertEqual(delegate_reconcile(), [])
+        self.assertEqual(self._counters(), {dept.id: (3, 1, 0, 1)})
+        self.assertFalse(UserProfile.objects.get(id=second.id).is_delegate)
+
+    def test_reconcile_repairs_drift(self):
+        _, (dept,) = make_catalogue()
+        self._approve(self._add_applicants(dept, ['Female', 'Female'], qualified=2))
+        DepartmentDelegateCounter.objects.filter(department=dept).update(delegates=7)
+
+        out = StringIO()
+        call_command('reconcile_delegate_counters', stdout=out)
+        self.assertIn('1 counter values drifted', out.getvalue())
+        call_command('reconcile_delegate_counters', '--fix', stdout=StringIO())
+        self.assertEqual(delegate_reconcile(), [])
+
+    def test_approval_is_admin_only(self):
+        self.client.force_authenticate(User.objects.create_user(username='student'))
+        self.assertEqual(self._approve([]).status_code, 403)
+
+
+class RuleEngineTests(TestCase):
+    def setUp(self):
+        _, (self.dept,) = make_catalogue()
+        self.course = self.dept.courses.first()
+
+    def tearDown(self):
+        # Rolled-back rules send no signals
+        bump_rules_version()
+
+    def _delegate(self, n, **extra):
+        fields = {'full_name': f'Delegate {n}', 'gender': 'Female', 'department': self.dept,
+                  'course': self.course, 'year_of_study': 2, 'student_id': f'DEL/{n:03d}'}
+        fields.update(extra)
+        return Delegate.objects.create(**fields)
+
+    def test_invalid_rules_are_rejected(self):
+        for key, value in (('eligibility.year', {'field': 'year_of_study', 'op': 'about'}),
+                           ('eligibility.year', {'field': 'year of study', 'op': 'gte', 'value': 2}),
+                           ('eligibility.gender', {'field': 'gender', 'op': 'in', 'value': 'Female'}),
+                           ('eligibility.type', {'field': 'gender', 'op': 'required', 'applies_to': ['VOTER']}),
+                           ('coverage.target_min', 'three')):
+            with self.assertRaises(ValidationError, msg=key):
+                Rule(key=key, value=value).full_clean()
+        Rule(key='coverage.target_min', value=4).full_clean()
+
+    def test_queryset_is_evaluated_in_one_query(self):
+        Rule.objects.create(key='eligibility.min_year', citation='Art. 12(3)', value={
+            'field': 'year_of_study', 'op': 'gte', 'value': 2, 'message': 'Second year or above'})
+        Rule.objects.create(key='eligibility.department', value={
+            'field': 'department__code', 'op': 'ne', 'value': 'closed'})
+        first, second = self._delegate(1, year_of_study=1), self._delegate(2, year_of_study=3)
+
+        rule_set = get_rule_set()
+        with self.assertNumQueries(1):
+            results = dict(rule_set.evaluate_queryset(Delegate.objects.all()))
+        self.assertEqual(results[first.pk], {'status': 'ineligible', 'failed': [
+            {'rule': 'eligibility.min_year', 'message': 'Second year or above', 'citation': 'Art. 12(3)'}]})
+        self.assertEqual(results[second.pk], {'status': 'eligible', 'failed': []})
+
+    def test_rules_recompile_after_a_change(self):
+        rule_set = get_rule_set()
+        self.assertIs(get_rule_set(), rule_set)
+        self.assertEqual(coverage_metrics()['departments'][0]['target_min'], 3)
+
+        rule = Rule.objects.create(key='coverage.target_min', value=5)
+        self.assertIsNot(get_rule_set(), rule_set)
+        self.assertEqual(coverage_metrics()['departments'][0]['gap_to_min'], 5)
+
+        rule.delete()
+        self.assertEqual(coverage_metrics()['departments'][0]['target_min'], 3)
+
+    def test_profiles_are_judged_by_user_type(self):
+        Rule.objects.create(key='eligibility.position', value={
+            'field': 'council_position', 'op': 'required', 'applies_to': ['ASPIRANT']})
+        aspirant = make_profile(self.course, 1, user_type='ASPIRANT')
+        student = make_profile(self.course, 2)
+        delegate = self._delegate(3)
+
+        results = dict(get_rule_set().evaluate_queryset(UserProfile.objects.all()))
+        self.assertEqual(results[aspirant.pk]['status'], 'ineligible')
+        self.assertEqual(results[student.pk]['status'], 'pending')
+        # Delegates have no council position, so the rule does not cover them
+        self.assertEqual(dict(get_rule_set().evaluate_queryset(Delegate.objects.all()))[delegate.pk]['status'],
+                         'pending')
+
+    def test_misconfigured_rule_fails_closed(self):
+        Rule.objects.create(key='eligibility.broken', value={'field': 'year_of_study', 'op': 'about'})
+        delegate = self._delegate(1)
+        (_, result), = get_rule_set().evaluate_queryset(Delegate.objects.all())
+        self.assertEqual(result['status'], 'ineligible')
+        self.assertIn('Misconfigured rule', result['failed'][0]['message'])
+        self.assertEqual(delegate.eligibility, {})
+
+    def test_new_delegate_is_checked_against_the_rules(self):
+        Rule.objects.create(key='eligibility.min_year', value={'field': 'year_of_study', 'op': 'gte', 'value': 2})
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+        get_rule_set()  # Compiled once per process; keep it out of the query counts
+        with CaptureQueriesContext(connection) as ctx:
+            resp = client.post('/api/delegates/', {
+                'full_name': 'First Year', 'gender': 'Male', 'department_id': self.dept.id,
+                'course_id': self.course.id, 'year_of_study': 1, 'student_id': 'DEL/100',
+            }, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')])
+        delegate = Delegate.objects.get(student_id='DEL/100')
+        self.assertEqual(delegate.eligibility['status'], 'ineligible')
+        self.assertFalse(delegate.is_qualified)
+
+
+class RecomputeEligibilityTests(TestCase):
+    def setUp(self):
+        _, (self.dept,) = make_catalogue()
+        self.course = self.dept.courses.first()
+        Rule.objects.create(key='eligibility.min_year', value={'field': 'year_of_study', 'op': 'gte', 'value': 2})
+
+    def tearDown(self):
+        bump_rules_version()
+
+    def _delegates(self, years, **extra):
+        return [Delegate.objects.create(full_name=f'Delegate {n}', gender='Male', department=self.dept,
+                                        course=self.course, year_of_study=year, student_id=f'DEL/{n:03d}', **extra)
+                for n, year in enumerate(years)]
+
+    def test_only_changed_rows_are_written(self):
+        first_year, vetted = self._delegates([1, 3], vetting_status='PASSED')
+        out = StringIO()
+        call_command('recompute_eligibility', '--only', 'delegates', stdout=out)
+        self.assertIn('delegates: checked 2 rows', out.getvalue())
+        self.assertIn('2 changed', out.getvalue())
+
+        first_year.refresh_from_db()
+        vetted.refresh_from_db()
+        self.assertEqual(first_year.eligibility['status'], 'ineligible')
+        self.assertFalse(first_year.is_qualified)
+        self.assertEqual(vetted.eligibility['status'], 'eligible')
+        self.assertTrue(vetted.is_qualified)
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = recompute(['delegates'])
+        self.assertEqual(result['delegates']['changed'], 0)
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')])
+
+    def test_verified_profiles_lose_qualification_when_rules_reject_them(self):
+        aspirant = make_profile(self.course, 1, user_type='ASPIRANT', year_of_study=1,
+                                vetting_status='PASSED', is_qualified=True)
+        student = make_profile(self.course, 2, year_of_study=1)
+        call_command('recompute_eligibility', '--only', 'profiles', stdout=StringIO())
+
+        aspirant.refresh_from_db()
+        student.refresh_from_db()
+        self.assertFalse(aspirant.is_qualified)
+        self.assertEqual(aspirant.eligibility['failed'][0]['rule'], 'eligibility.min_year')
+        self.assertEqual(student.eligibility, {})
+
+    def test_delegates_who_stop_qualifying_are_revoked(self):
+        delegate = make_profile(self.course, 1, user_type='DELEGATE', year_of_study=1,
+                                vetting_status='PASSED', is_qualified=True)
+        delegates.approve_delegates([delegate.id], approved_by=None)
+        recompute(['profiles'])
+
+        delegate.refresh_from_db()
+        self.assertFalse(delegate.is_delegate)
+        self.assertEqual(delegate_reconcile(), [])
+        counter = DepartmentDelegateCounter.objects.get(department=self.dept)
+        self.assertEqual((counter.candidates, counter.delegates), (1, 0))
+
+    def test_shards_cover_every_row_once(self):
+        delegates = self._delegates([1, 2, 3, 1, 2, 3, 1])
+        ranges = shard_ranges('delegates', 3)
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(ranges[0][0], delegates[0].pk)
+        self.assertEqual(ranges[-1][1], delegates[-1].pk)
+
+        counts = [recompute_range('delegates', first, last, chunk_size=2) for first, last in ranges]
+        self.assertEqual(sum(examined for examined, _ in counts), 7)
+        self.assertEqual(sum(changed for _, changed in counts), 7)
+        self.assertEqual(shard_ranges('delegates', 50)[-1][1], delegates[-1].pk)
+        Delegate.objects.all().delete()
+        self.assertEqual(shard_ranges('delegates', 3), [])
+
+
+class ParallelRecomputeTests(TransactionTestCase):
+    def tearDown(self):
+        bump_rules_version()
+
+    def test_workers_recompute_every_range(self):
+        _, (dept,) = make_catalogue()
+        course = dept.courses.first()
+        Rule.objects.create(key='eligibility.min_year', value={'field': 'year_of_study', 'op': 'gte', 'value': 2})
+        for n, year in enumerate([1, 2, 3, 1, 2, 3]):
+            Delegate.objects.create(full_name=f'Delegate {n}', gender='Male', department=dept, course=course,
+                                    year_of_study=year, student_id=f'DEL/{n:03d}')
+
+        with mock.patch('elections.eligibility.connections.close_all',
+                        wraps=connections.close_all) as close_all:
+            result = recompute(['delegates'], workers=2, chunk_size=2)
+        close_all.assert_called_once()
+        self.assertEqual(result['delegates']['examined'], 6)
+        self.assertEqual(result['delegates']['changed'], 6)
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        media, partial = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.addCleanup(partial.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name, UPLOAD_SESSION_ROOT=partial.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        _, (dept,) = make_catalogue()
+        self.profile = make_profile(dept.courses.first(), 1, user_type='ASPIRANT')
+        self.client = APIClient()
+        self.client.force_authenticate(self.profile.user)
+        self.document = os.urandom(250_000)
+
+    def _open(self, **overrides):
+        body = {'document': 'last_semester_results', 'filename': 'results.pdf', 'size': len(self.document),
+                'sha256': hashlib.sha256(self.document).hexdigest(), **overrides}
+        return self.client.post('/api/uploads/', body, format='json')
+
+    def _put(self, session_id, offset, chunk, **headers):
+        return self.client.put(f'/api/uploads/{session_id}/', chunk, content_type='application/octet-stream',
+                               HTTP_UPLOAD_OFFSET=str(offset), **headers)
+
+    def test_registration_leaves_documents_to_upload_sessions(self):
+        client = APIClient()
+        resp = client.post('/api/profiles/', {
+            'username': 'newcomer', 'email': 'newcomer@example.com', 'password': 'pass12345',
+            'user_type': 'ASPIRANT', 'full_name': 'New Comer', 'gender': 'Male', 'student_id': 'KCA/09999',
+            'course': self.profile.course_id, 'year_of_study': 2, 'whatsapp_number': '+254700000001',
+            'phone_number': '+254700000001',
+        }, format='json')
+        self.assertEqual(resp.status_code, 201, resp.content)
+
+        self.client.force_authenticate(User.objects.get(username='newcomer'))
+        session_id = self._open().json()['id']
+        self.assertEqual(self._put(session_id, 0, self.document).json()['status'], 'COMPLETE')
+        profile = UserProfile.objects.get(user__username='newcomer')
+        self.assertTrue(profile.last_semester_results)
+        self.assertFalse(profile.school_fees_screenshot)
+
+    def test_upload_resumes_and_attaches_document(self):
+        resp = self._open()
+        self.assertEqual(resp.status_code, 201)
+        session_id = resp.json()['id']
+
+        resp = self._put(session_id, 0, self.document[:100_000])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Upload-Offset'], '100000')
+        # A retried chunk from before the connection dropped
+        resp = self._put(session_id, 0, self.document[:100_000])
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.json()['received'], 100_000)
+
+        # Reopening the same document resumes the session
+        resp = self._open()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((resp.json()['id'], resp.json()['received']), (session_id, 100_000))
+
+        digest = hashlib.sha256(self.document[100_000:200_000]).hexdigest()
+        self.assertEqual(self._put(session_id, 100_000, self.document[100_000:200_000],
+                                   HTTP_X_CHUNK_SHA256=digest).status_code, 200)
+        resp = self._put(session_id, 200_000, self.document[200_000:])
+        self.assertEqual(resp.json()['status'], 'COMPLETE')
+
+        self.profile.refresh_from_db()
+        with self.profile.last_semester_results.open('rb') as stored:
+            self.assertEqual(stored.read(), self.document)
+        self.assertFalse(os.path.exists(uploads.session_dir(session_id)))
+
+    def test_corrupt_chunks_and_documents_are_rejected(self):
+        session_id = self._open().json()['id']
+        resp = self._put(session_id, 0, self.document[:1000], HTTP_X_CHUNK_SHA256='0' * 64)
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()['received'], 0)
+
+        corrupt = bytearray(self.document)
+        corrupt[-1] ^= 0xFF
+        self._put(session_id, 0, bytes(corrupt[:200_000]))
+        resp = self._put(session_id, 200_000, bytes(corrupt[200_000:]))
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('SHA-256', resp.json()['error'])
+
+        session = UploadSession.objects.get(id=session_id)
+        self.assertEqual((session.status, session.received), ('OPEN', 0))
+        self.profile.refresh_from_db()
+        self.assertFalse(self.profile.last_semester_results)
+
+    def test_sessions_are_validated_and_private(self):
+        self.assertIn('filename', self._open(filename='results.exe').json())
+        self.assertIn('document', self._open(document='password').json())
+        self.assertIn('size', self._open(size=uploads.DOCUMENT_MAX_BYTES + 1).json())
+
+        session_id = self._open().json()['id']
+        other = make_profile(self.profile.course, 2)
+        self.client.force_authenticate(other.user)
+        self.assertEqual(self.client.get(f'/api/uploads/{session_id}/').status_code, 404)
+
+
+def photo_bytes(size=(3000, 1000), fmt='JPEG', **options):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'navy').save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+class ImageProcessingTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        _, (dept,) = make_catalogue()
+        self.profile = make_profile(dept.courses.first(), 1, user_type='ASPIRANT')
+
+    def test_photo_is_normalized_and_thumbnailed_off_request(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Taken rotated: display turned 90 degrees clockwise
+        exif[0x010F] = 'PhoneMaker'
+        self.profile.school_id_image.save('id.jpg', ContentFile(photo_bytes(exif=exif.tobytes())))
+        self.assertEqual(ImageJob.objects.filter(status='PENDING').count(), 1)
+        # Saving again before the worker runs does not queue it twice
+        self.profile.save()
+        self.assertEqual(ImageJob.objects.count(), 1)
+
+        self.assertEqual(process_pending(), {'processed': 1, 'retrying': 0, 'failed': 0})
+        self.profile.refresh_from_db()
+        with self.profile.school_id_image.open('rb') as stored:
+            original = Image.open(stored)
+            self.assertEqual(original.size, (667, 2000))
+            self.assertEqual(dict(original.getexif()), {})
+        thumbnail = self.profile.document_thumbnails['school_id_image']
+        with self.profile.school_id_image.storage.open(thumbnail['thumbnail']) as stored:
+            self.assertEqual(max(Image.open(stored).size), 480)
+
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+        thumbnails = admin.get(f'/api/profiles/{self.profile.id}/').json()['thumbnails']
+        self.assertEqual(admin.get(thumbnails['school_id_image'])['Content-Type'], 'image/jpeg')
+
+        # A processed profile queues nothing on later saves
+        self.profile.save()
+        self.assertEqual(ImageJob.objects.filter(status='PENDING').count(), 0)
+
+    def test_unreadable_image_fails_without_retry(self):
+        self.profile.school_fees_screenshot.save('fees.png', ContentFile(b'not really a png'))
+        self.profile.course_registration_screenshot.save('courses.png', ContentFile(photo_bytes(fmt='PNG')))
+
+        self.assertEqual(process_pending(), {'processed': 1, 'retrying': 0, 'failed': 1})
+        job = ImageJob.objects.get(document='school_fees_screenshot')
+        self.assertEqual(job.status, 'FAILED')
+        self.profile.refresh_from_db()
+        self.assertEqual(list(self.profile.document_thumbnails), ['course_registration_screenshot'])
+        self.assertEqual(self.profile.course_registration_screenshot.name.rsplit('.', 1)[-1], 'png')
+
+    def test_truncated_image_fails_but_missing_file_is_retried(self):
+        self.profile.school_fees_screenshot.save('fees.jpg', ContentFile(photo_bytes()[:2000]))
+        self.profile.school_id_image.save('id.jpg', ContentFile(photo_bytes()))
+        # Not visible to this worker yet, as when the web service and worker do not share a disk
+        self.profile.school_id_image.storage.delete(self.profile.school_id_image.name)
+
+        self.assertEqual(process_pending(), {'processed': 0, 'retrying': 1, 'failed': 1})
+        self.assertEqual(ImageJob.objects.get(document='school_fees_screenshot').status, 'FAILED')
+        missing = ImageJob.objects.get(document='school_id_image')
+        self.assertEqual((missing.status, missing.attempts), ('PENDING', 1))
+
+    def test_replacing_a_photo_queues_it_again(self):
+        self.profile.school_id_image.save('id.jpg', ContentFile(photo_bytes()))
+        process_pending()
+        self.profile.school_id_image.save('id-new.jpg', ContentFile(photo_bytes()))
+        self.assertEqual(ImageJob.objects.filter(status='PENDING').count(), 1)
+        process_pending()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.document_thumbnails['school_id_image']['source'],
+                         self.profile.school_id_image.name)
+
+
+class DocumentStorageTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        grace = mock.patch.object(documents, 'SWEEP_GRACE_SECONDS', 0)
+        grace.start()
+        self.addCleanup(grace.stop)
+
+        _, (dept,) = make_catalogue()
+        course = dept.courses.first()
+        self.first, self.second = make_profile(course, 1), make_profile(course, 2)
+        self.certificate = b'%PDF-1.4 good conduct template' * 1000
+
+    def _upload(self, profile, content, field='good_conduct_certificate', name='conduct.pdf'):
+        with self.captureOnCommitCallbacks(execute=True):
+            getattr(profile, field).save(name, ContentFile(content))
+        return getattr(profile, field).name
+
+    def test_identical_documents_share_one_blob(self):
+        name = self._upload(self.first, self.certificate)
+        self.assertEqual(self._upload(self.second, self.certificate, name='copy.pdf'), name)
+        self.assertEqual(name, f'blobs/{name[6:8]}/{name[9:11]}/{hashlib.sha256(self.certificate).hexdigest()}.pdf')
+        self.assertEqual(StoredDocument.objects.get(name=name).references, 2)
+
+        report = documents.storage_report()
+        self.assertEqual((report['blobs'], report['references']), (1, 2))
+        self.assertEqual(report['saved_bytes'], len(self.certificate))
+
+    def test_blob_is_deleted_with_its_last_reference(self):
+        shared = self._upload(self.first, self.certificate)
+        self._upload(self.second, self.certificate)
+        storage = document_storage()
+
+        self._upload(self.first, b'%PDF-1.4 a different certificate')
+        self.assertTrue(storage.exists(shared))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+        self.assertFalse(storage.exists(shared))
+        self.assertFalse(StoredDocument.objects.filter(name=shared).exists())
+
+    def test_reconcile_repairs_counts_and_collects_orphans(self):
+        name = self._upload(self.first, self.certificate)
+        StoredDocument.objects.filter(name=name).update(references=3)
+        orphan = document_storage().save('orphan.pdf', ContentFile(b'never referenced'))
+
+        out = StringIO()
+        call_command('reconcile_documents', stdout=out)
+        self.assertIn('1 stored blobs have no reference counter', out.getvalue())
+        call_command('reconcile_documents', '--fix', stdout=out)
+
+        self.assertEqual(StoredDocument.objects.get(name=name).references, 1)
+        self.assertFalse(document_storage().exists(orphan))
+        self.assertTrue(document_storage().exists(name))
+        self.assertEqual(documents.reconcile(), {'drift': [], 'untracked': [], 'deleted': 0})
+
+
+class DocumentServingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, MEDIA_SENDFILE='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        _, (dept,) = make_catalogue()
+        self.profile = make_profile(dept.courses.first(), 1)
+        self.transcript = bytes(range(256)) * 400
+        self.profile.last_semester_transcript.save('transcript.pdf', ContentFile(self.transcript))
+
+        self.admin = APIClient()
+        self.admin.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+        self.url = self.admin.get(f'/api/profiles/{self.profile.id}/').json()['last_semester_transcript']
+        # The link itself is the credential
+        self.client = APIClient()
+
+    def test_signed_link_serves_document_without_queries(self):
+        with self.assertNumQueries(0):
+            served = self.client.get(self.url)
+        self.assertEqual(served.status_code, 200)
+        self.assertEqual(b''.join(served.streaming_content), self.transcript)
+        self.assertEqual(served['Content-Type'], 'application/pdf')
+        self.assertEqual(served['Content-Disposition'], 'inline; filename="last_semester_transcript.pdf"')
+        self.assertEqual(served['ETag'], f'"{hashlib.sha256(self.transcript).hexdigest()}"')
+        self.assertEqual(served['Accept-Ranges'], 'bytes')
+        self.assertIn('private', served['Cache-Control'])
+
+        # Reloading the page within the window yields the same link, so the browser cache applies
+        self.assertEqual(self.admin.get(f'/api/profiles/{self.profile.id}/').json()['last_semester_transcript'],
+                         self.url)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=served['ETag']).status_code, 304)
+
+    def test_byte_ranges(self):
+        served = self.client.get(self.url, HTTP_RANGE='bytes=1000-1099')
+        self.assertEqual(served.status_code, 206)
+        self.assertEqual(served['Content-Range'], f'bytes 1000-1099/{len(self.transcript)}')
+        self.assertEqual(served['Content-Length'], '100')
+        self.assertEqual(b''.join(served.streaming_content), self.transcript[1000:1100])
+
+        served = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(served.streaming_content), self.transcript[-10:])
+
+        served = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.transcript)}-')
+        self.assertEqual(served.status_code, 416)
+        self.assertEqual(served['Content-Range'], f'bytes */{len(self.transcript)}')
+
+        # A stale If-Range gets the whole current file instead of a mismatched slice
+        served = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(served.status_code, 200)
+        self.assertEqual(len(b''.join(served.streaming_content)), len(self.transcript))
+
+    def test_tampered_and_expired_links_are_refused(self):
+        token = self.url.rstrip('/').rsplit('/', 1)[1]
+        self.assertEqual(self.client.get(f'/api/documents/{token[:-1]}x/').status_code, 403)
+
+        name, filename = media.read_link(token)
+        expired = media.signed_url(name, filename, now=time.time() - 3 * media.LINK_LIFETIME)
+        self.assertEqual(self.client.get(expired).status_code, 403)
+
+    def test_front_server_offload(self):
+        name = self.profile.last_semester_transcript.name
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected-media/'):
+            served = self.client.get(self.url)
+        self.assertEqual(served['X-Accel-Redirect'], f'/protected-media/{name}')
+        self.assertEqual(served.content, b'')
+
+        with override_settings(MEDIA_SENDFILE='x-sendfile'):
+            served = self.client.get(self.url)
+        self.assertEqual(served['X-Sendfile'], os.path.join(settings.MEDIA_ROOT, name))
+
+
+class FrontendPageTests(TestCase):
+    def setUp(self):
+        with open(os.path.join(frontend.FRONTEND_DIR, 'login-fixed.html'), 'rb') as f:
+            self.login_page = f.read()
+
+    def test_pages_are_served_compressed_from_memory(self):
+        served = self.client.get('/login/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(served.status_code, 200)
+        self.assertEqual(served['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(served.content), self.login_page)
+        self.assertIn('Accept-Encoding', served['Vary'])
+        self.assertIn('max-age', served['Cache-Control'])
+
+        plain = self.client.get('/login/', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(plain.content, self.login_page)
+        # Each encoding is a different representation with its own strong ETag
+        self.assertNotEqual(plain['ETag'], served['ETag'])
+
+        with mock.patch('builtins.open', side_effect=AssertionError('page read from disk')):
+            revalidated = self.client.get('/login/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=served['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b'')
+
+    def test_debug_reloads_changed_pages(self):
+        pages = tempfile.TemporaryDirectory()
+        self.addCleanup(pages.cleanup)
+        path = os.path.join(pages.name, 'page.html')
+        with open(path, 'w') as f:
+            f.write('<p>first</p>')
+
+        with mock.patch.object(frontend, 'FRONTEND_DIR', pages.name), override_settings(DEBUG=True):
+            request = RequestFactory().get('/page/')
+            first = frontend.page_response(request, 'page.html')
+            with open(path, 'w') as f:
+                f.write('<p>second</p>')
+            os.utime(path, (time.time() + 5, time.time() + 5))
+            second = frontend.page_response(request, 'page.html')
+
+            self.assertEqual((first.content, second.content), (b'<p>first</p>', b'<p>second</p>'))
+            self.assertNotEqual(first['ETag'], second['ETag'])
+            os.remove(path)
+            self.assertIsNone(frontend.page_response(request, 'page.html'))
+
+    def test_missing_page_is_404(self):
+        self.assertEqual(self.client.get('/login/').status_code, 200)
+        self.assertEqual(serve_frontend_file(RequestFactory().get('/'), 'missing.html').status_code, 404)
+
+
+class ProfileStatisticsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        _, departments = make_catalogue(departments=2)
+        self.courses = [dept.courses.first() for dept in departments]
+
+    def test_statistics_response_shape(self):
+        course_a, course_b = self.courses
+        make_profile(course_a, 1, user_type='ASPIRANT', council_position='CHAIR', is_qualified=True,
+                     vetting_status='PASSED')
+        make_profile(course_a, 2, user_type='ASPIRANT', council_position='CHAIR')
+        make_profile(course_b, 3, user_type='ASPIRANT', council_position='SPORTS_SECRETARY')
+        make_profile(course_b, 4, user_type='DELEGATE')
+        make_profile(course_b, 5, user_type='IECK', vetting_status='FAILED')
+
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/profiles/statistics/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {
+            'total_profiles': 5,
+            'qualified_profiles': 1,
+            'pending_profiles': 3,
+            'by_user_type': {'aspirants': 3, 'delegates': 1, 'ieck_members': 1},
+            'by_position': {'Chair (President)': 2, 'Sports Secretary': 1},
+        })
+
+    def test_statistics_by_department(self):
+        course_a, course_b = self.courses
+        make_profile(course_a, 1, is_qualified=True, vetting_status='PASSED')
+        make_profile(course_b, 2)
+
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/profiles/statistics/', {'by': 'department'})
+        self.assertEqual(resp.json()['by_department'], {
+            'Department 0': {'total': 1, 'qualified': 1, 'pending': 0},
+            'Department 1': {'total': 1, 'qualified': 0, 'pending': 1},
+        })
+
+    def test_statistics_rejects_unknown_dimension(self):
+        resp = self.client.get('/api/profiles/statistics/', {'by': 'gender'})
+        self.assertEqual(resp.status_code, 400)
+
+
+class AdminProfileListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        _, departments = make_catalogue(departments=2)
+        self.courses = [dept.courses.first() for dept in departments]
+        for n in range(1, 8):
+            make_profile(self.courses[n % 2], n, user_type='ASPIRANT' if n <= 3 else 'STUDENT')
+
+    def test_cursor_pages_cover_all_profiles_once(self):
+        seen = []
+        url = '/api/profiles/admin_all_profiles/?page_size=3'
+        while url:
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            data = resp.json()
+            self.assertLessEqual(len(data['profiles']), 3)
+            seen.extend(p['id'] for p in data['profiles'])
+            url = data['next']
+
+        expected = list(UserProfile.objects.order_by('-created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_filters_are_applied(self):
+        dept = self.courses[0].department
+        resp = self.client.get('/api/profiles/admin_all_profiles/', {
+            'user_type': 'ASPIRANT', 'department': dept.id,
+        })
+        profiles = resp.json()['profiles']
+        self.assertEqual({p['student_id'] for p in profiles}, {'KCA/00002'})
+
+        resp = self.client.get('/api/profiles/admin_all_profiles/', {'faculty': 'abc'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_unpaginated_listing_returns_everything_with_count(self):
+        data = self.client.get('/api/profiles/admin_all_profiles/').json()
+        self.assertEqual(data['count'], 7)
+        self.assertEqual(len(data['profiles']), 7)
+        self.assertNotIn('next', data)
+
+    def test_dashboard_page_request_filters_on_the_server(self):
+        UserProfile.objects.filter(student_id='KCA/00003').update(vetting_status='IN_PROGRESS')
+        UserProfile.objects.filter(student_id='KCA/00001').update(vetting_status='PASSED')
+        # What the dashboard's "Pending Approvals" view sends, with a search
+        resp = self.client.get('/api/profiles/admin_all_profiles/', {
+            'page_size': 2, 'vetting_status': 'NOT_STARTED,IN_PROGRESS', 'user_type': 'ASPIRANT', 'search': 'student',
+        })
+        data = resp.json()
+        self.assertEqual([p['student_id'] for p in data['profiles']], ['KCA/00003', 'KCA/00002'])
+        self.assertIsNone(data['next'])
+
+        resp = self.client.get('/api/profiles/admin_all_profiles/', {'page_size': 50, 'search': '00005'})
+        self.assertEqual([p['student_id'] for p in resp.json()['profiles']], ['KCA/00005'])
+
+    def test_export_streams_ndjson(self):
+        resp = self.client.get('/api/profiles/export_profiles/', {'user_type': 'STUDENT'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(row['user_type'] == 'STUDENT' for row in rows))
+
+    def test_non_staff_cannot_list_or_export(self):
+        student = UserProfile.objects.first().user
+        self.client.force_authenticate(student)
+        self.assertEqual(self.client.get('/api/profiles/admin_all_profiles/').status_code, 403)
+        self.assertEqual(self.client.get('/api/profiles/export_profiles/').status_code, 403)
+
+
+class ProfileSerializerTierTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        _, (dept,) = make_catalogue()
+        self.profile = make_profile(dept.courses.first(), 1, good_conduct_certificate='documents/x/conduct.pdf')
+
+    def test_list_rows_are_compact(self):
+        row = self.client.get('/api/profiles/').json()[0]
+        self.assertEqual(row['faculty'], self.profile.faculty_id)
+        self.assertEqual(row['department_name'], 'Department 0')
+        self.assertEqual(row['course_name'], 'Course 0-0')
+        self.assertTrue(row['documents']['good_conduct_certificate'])
+        self.assertFalse(row['documents']['school_id_image'])
+        self.assertNotIn('school_id_image', row)
+
+    def test_retrieve_keeps_nested_form(self):
+        data = self.client.get(f'/api/profiles/{self.profile.id}/').json()
+        self.assertEqual(data['course']['department']['faculty']['code'], 'technology')
+        self.assertIn('good_conduct_certificate', data)
+        self.assertNotIn('otp_code', data)
+
+
+class ProfileQueryBudgetTests(TestCase):
+    """Every profile list endpoint must stay within a fixed query budget"""
+    QUERY_BUDGET = 2
+    LIST_ENDPOINTS = [
+        '/api/profiles/',
+        '/api/profiles/pending_verification/',
+        '/api/profiles/qualified/',
+        '/api/profiles/by_type/?type=ASPIRANT',
+        '/api/profiles/admin_all_profiles/',
+        '/api/profiles/export_profiles/',
+    ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        _, self.departments = make_catalogue(departments=3, courses_per_department=2)
+        self.created = 0
+
+    def _add_profiles(self, count):
+        courses = list(Course.objects.all())
+        for _ in range(count):
+            self.created += 1
+            make_profile(courses[self.created % len(courses)], self.created, user_type='ASPIRANT',
+                         council_position='CHAIR', is_qualified=self.created % 2 == 0)
+
+    def _queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+            if resp.streaming:
+                b''.join(resp.streaming_content)
+        self.assertEqual(resp.status_code, 200, url)
+        return len(ctx.captured_queries)
+
+    def test_list_endpoints_stay_within_budget(self):
+        self._add_profiles(3)
+        small = {url: self._queries(url) for url in self.LIST_ENDPOINTS}
+        self._add_profiles(12)
+        for url in self.LIST_ENDPOINTS:
+            queries = self._queries(url)
+            self.assertLessEqual(queries, self.QUERY_BUDGET, url)
+            self.assertEqual(queries, small[url], url)
+
+    def test_retrieve_loads_relations_in_one_query(self):
+        self._add_profiles(1)
+        profile = UserProfile.objects.get()
+        self.assertEqual(self._queries(f'/api/profiles/{profile.id}/'), 1)
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        _, (dept,) = make_catalogue()
+        self.profile = make_profile(dept.courses.first(), 1, user_type='ASPIRANT')
+        self.profile.user.set_password('pass12345')
+        self.profile.user.save()
+
+    def _login(self, username, password):
+        original = PBKDF2PasswordHasher.verify
+        with mock.patch.object(PBKDF2PasswordHasher, 'verify', autospec=True, side_effect=original) as verify:
+            resp = self.client.post('/api/auth/login/', {'username': username, 'password': password})
+        return resp, verify.call_count
+
+    def test_login_hashes_password_once_and_returns_profile(self):
+        resp, hashes = self._login('student1', 'pass12345')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(hashes, 1)
+        data = resp.json()
+        self.assertIn('access', data)
+        self.assertEqual(data['user_type'], 'ASPIRANT')
+        self.assertEqual(data['profile']['course']['department']['faculty']['code'], 'technology')
+        self.assertFalse(data['is_admin'])
+
+    def test_login_without_profile_returns_basic_user_data(self):
+        User.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        resp, _ = self._login('admin', 'pass12345')
+        data = resp.json()
+        self.assertEqual(data['profile']['username'], 'admin')
+        self.assertEqual(data['user_type'], 'STUDENT')
+        self.assertTrue(data['is_admin'])
+
+    def test_bad_credentials_are_rejected(self):
+        resp, _ = self._login('student1', 'wrong-password')
+        self.assertEqual(resp.status_code, 401)
+
+
+class StubProviderHandler(BaseHTTPRequestHandler):
+    """Records WhatsApp API posts and answers with the server's queued statuses"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append((self.path, json.loads(body)))
+        status_code = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class NotificationOutboxTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubProviderHandler)
+        cls.server.requests = []
+        cls.server.statuses = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.server.statuses.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        _, (dept,) = make_catalogue()
+        self.profile = make_profile(dept.courses.first(), 1, user_type='ASPIRANT', council_position='CHAIR',
+                                    whatsapp_number='0712345678')
+        settings_patch = override_settings(
+            WHATSAPP_API_URL=f'http://127.0.0.1:{self.server.server_port}',
+            WHATSAPP_API_TOKEN='test-token', WHATSAPP_PHONE_NUMBER_ID='12345',
+        )
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+
+    def test_verify_queues_instead_of_sending(self):
+        resp = self.client.post(f'/api/profiles/{self.profile.id}/verify/', {'is_qualified': True}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.server.requests, [])
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.kind, NotificationKind.QUALIFIED)
+        self.assertEqual(notification.phone_number, '+254712345678')
+        self.assertIn('Chair (President)', notification.message)
+
+    def test_reverdict_supersedes_pending_notification(self):
+        self.client.post(f'/api/profiles/{self.profile.id}/verify/', {'is_qualified': True}, format='json')
+        self.client.post(f'/api/profiles/{self.profile.id}/verify/',
+                         {'is_qualified': False, 'verification_notes': 'Fees below 80%'}, format='json')
+        notification = Notification.objects.get()
+        self.assertEqual(notification.kind, NotificationKind.REJECTED)
+        self.assertIn('Fees below 80%', notification.message)
+
+    def test_dispatch_sends_batch_and_records_delivery(self):
+        enqueue_verdict_notifications([self.profile])
+        counts = dispatch_pending(service=WhatsAppService())
+
+        self.assertEqual(counts, {'sent': 1, 'retrying': 0, 'failed': 0})
+        path, payload = self.server.requests[0]
+        self.assertEqual(path, '/12345/messages')
+        self.assertEqual(payload['to'], '+254712345678')
+        self.assertEqual(Notification.objects.get().status, NotificationStatus.SENT)
+        self.profile.refresh_from_db()
+        self.assertTrue(self.profile.whatsapp_notification_sent)
+        self.assertIsNotNone(self.profile.whatsapp_notification_sent_at)
+
+    def test_failed_delivery_backs_off_then_gives_up(self):
+        enqueue_verdict_notifications([self.profile])
+        self.server.statuses.extend([500] * MAX_ATTEMPTS)
+        service = WhatsAppService()
+
+        self.assertEqual(dispatch_pending(service=service)['retrying'], 1)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.attempts, 1)
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+        # Not due yet
+        self.assertEqual(dispatch_pending(service=service), {'sent': 0, 'retrying': 0, 'failed': 0})
+
+        for _ in range(MAX_ATTEMPTS - 1):
+            Notification.objects.update(next_attempt_at=timezone.now())
+            dispatch_pending(service=service)
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, NotificationStatus.FAILED)
+        self.assertEqual(notification.attempts, MAX_ATTEMPTS)
+        self.profile.refresh_from_db()
+        self.assertFalse(self.profile.whatsapp_notification_sent)
+
+    def test_unconfigured_provider_fails_without_retrying(self):
+        enqueue_verdict_notifications([self.profile])
+        with override_settings(WHATSAPP_API_TOKEN=''):
+            counts = dispatch_pending(service=WhatsAppService())
+        self.assertEqual(counts['failed'], 1)
+        self.assertEqual(self.server.requests, [])
+
+
+class BulkVerifyTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        _, (dept,) = make_catalogue()
+        self.course = dept.courses.first()
+        self.created = 0
+
+    def _profiles(self, count):
+        profiles = []
+        for _ in range(count):
+            self.created += 1
+            profiles.append(make_profile(self.course, self.created, user_type='ASPIRANT', council_position='CHAIR'))
+        return profiles
+
+    def _bulk_verify(self, payload):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post('/api/profiles/bulk_verify/', payload, format='json')
+        writes = [q for q in ctx.captured_queries
+                  if q['sql'].split()[0].upper() in ('INSERT', 'UPDATE', 'DELETE')]
+        return resp, len(writes)
+
+    def test_applies_verdicts_and_queues_notifications(self):
+        passed, failed = self._profiles(2)
+        resp, _ = self._bulk_verify([
+            {'id': passed.id, 'is_qualified': True},
+            {'id': failed.id, 'is_qualified': False, 'verification_notes': 'Missing transcript'},
+            {'id': 999999, 'is_qualified': True},
+        ])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['verified'], 2)
+        self.assertEqual(resp.json()['results'], [
+            {'id': passed.id, 'status': 'verified', 'vetting_status': 'PASSED'},
+            {'id': failed.id, 'status': 'verified', 'vetting_status': 'FAILED'},
+            {'id': 999999, 'status': 'not_found'},
+        ])
+
+        passed.refresh_from_db()
+        failed.refresh_from_db()
+        self.assertTrue(passed.is_qualified)
+        self.assertEqual(passed.verified_by, self.admin)
+        self.assertEqual(failed.verification_notes, 'Missing transcript')
+        self.assertEqual(
+            dict(Notification.objects.values_list('profile_id', 'kind')),
+            {passed.id: NotificationKind.QUALIFIED, failed.id: NotificationKind.REJECTED},
+        )
+
+    def test_write_queries_do_not_grow_with_batch_size(self):
+        small = [{'id': p.id, 'is_qualified': True} for p in self._profiles(2)]
+        large = [{'id': p.id, 'is_qualified': i % 2 == 0} for i, p in enumerate(self._profiles(20))]
+
+        _, small_writes = self._bulk_verify(small)
+        resp, large_writes = self._bulk_verify(large)
+        self.assertEqual(resp.json()['verified'], 20)
+        self.assertEqual(small_writes, large_writes)
+
+    def test_rejects_invalid_payload_and_non_staff(self):
+        resp, _ = self._bulk_verify([{'is_qualified': True}])
+        self.assertEqual(resp.status_code, 400)
+
+        self.client.force_authenticate(User.objects.create_user(username='student'))
+        resp, _ = self._bulk_verify([])
+        self.assertEqual(resp.status_code, 403)
+
+
+class CourseSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='student'))
+        _, (dept,) = make_catalogue(courses_per_department=0)
+        for name, code in [('Bachelor of Science in Software Development', 'BSD'),
+                           ('Bachelor of Business Information Technology', 'BBIT'),
+                           ('Diploma in Software Engineering', 'DSE'),
+                           ('Bachelor of Science in Data Science', 'BDS')]:
+            Course.objects.create(department=dept, name=name, code=code)
+
+    def _search(self, q):
+        resp = self.client.get('/api/courses/search/', {'q': q})
+        self.assertEqual(resp.status_code, 200)
+        return [course['name'] for course in resp.json()]
+
+    def test_ranks_prefix_before_word_prefix_before_infix(self):
+        self.assertEqual(self._search('soft'), [
+            'Bachelor of Science in Software Development',
+            'Diploma in Software Engineering',
+        ])
+        self.assertEqual(self._search('dip')[0], 'Diploma in Software Engineering')
+        self.assertEqual(self._search('bachelor sci'), [
+            'Bachelor of Science in Data Science',
+            'Bachelor of Science in Software Development',
+        ])
+        # Infix matches are still found, after the prefix matches
+        self.assertEqual(self._search('ineer'), ['Diploma in Software Engineering'])
+        self.assertEqual(self._search('bbi'), ['Bachelor of Business Information Technology'])
+        self.assertEqual(self._search('x'), [])
+
+    def test_results_keep_course_serializer_shape(self):
+        course = self.client.get('/api/courses/search/', {'q': 'data'}).json()[0]
+        self.assertEqual(course['department_name'], 'Department 0')
+        self.assertEqual(course['faculty_name'], 'School of Technology')
+        self.assertEqual(course['department']['faculty']['code'], 'technology')
+
+    def test_warm_searches_skip_the_database_and_writes_rebuild(self):
+        self._search('bach')
+        with self.assertNumQueries(0):
+            self.client.get('/api/courses/search/', {'q': 'bach'})
+
+        Course.objects.filter(code='BDS').get().delete()
+        self.assertNotIn('Bachelor of Science in Data Science', self._search('bach'))
+        Course.objects.create(department=Department.objects.get(), name='Bachelor of Arts in Film', code='BAF')
+        self.assertIn('Bachelor of Arts in Film', self._search('bach'))
+
+
+class CatalogueTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.faculty, self.departments = make_catalogue(departments=2, courses_per_department=2)
+
+    def test_database_cache_fallback_is_flagged_outside_debug(self):
+        database_cache = {'default': {'BACKEND': checks.DATABASE_CACHE, 'LOCATION': 'django_cache'}}
+        with override_settings(CACHES=database_cache, DEBUG=False):
+            self.assertEqual([w.id for w in checks.shared_cache_check(None)], ['elections.W001'])
+        with override_settings(CACHES=database_cache, DEBUG=True):
+            self.assertEqual(checks.shared_cache_check(None), [])
+
+    def test_normalized_tree(self):
+        resp = self.client.get('/api/catalogue/')
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        dept_a, dept_b = self.departments
+
+        self.assertEqual(data['faculties'], [{
+            'id': self.faculty.id, 'code': 'technology', 'name': 'School of Technology',
+            'departments': [dept_a.id, dept_b.id],
+        }])
+        self.assertEqual(data['departments'][0]['faculty'], self.faculty.id)
+        self.assertEqual(data['departments'][0]['courses'],
+                         list(dept_a.courses.order_by('name').values_list('id', flat=True)))
+        self.assertEqual(len(data['courses']), 4)
+        self.assertEqual({c['department'] for c in data['courses']}, {dept_a.id, dept_b.id})
+
+    def test_repeat_requests_revalidate_without_database_work(self):
+        first = self.client.get('/api/catalogue/')
+        self.assertTrue(first['ETag'].startswith('"'))
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            again = self.client.get('/api/catalogue/', HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(again.status_code, 304)
+            since = self.client.get('/api/catalogue/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+            self.assertEqual(since.status_code, 304)
+            self.assertEqual(self.client.get('/api/catalogue/').status_code, 200)
+
+    def test_catalogue_write_changes_etag(self):
+        first = self.client.get('/api/catalogue/')
+        Course.objects.create(department=self.departments[0], name='New Course')
+        resp = self.client.get('/api/catalogue/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], first['ETag'])
+        self.assertEqual(len(resp.json()['courses']), 5)
+
+
+class BallotTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        _, (dept,) = make_catalogue()
+        course = dept.courses.first()
+        self.chair = make_profile(course, 1, user_type='ASPIRANT', council_position='CHAIR', is_qualified=True)
+        self.vice = make_profile(course, 2, user_type='ASPIRANT', council_position='VICE_CHAIR', is_qualified=True)
+        self.unvetted = make_profile(course, 3, user_type='ASPIRANT', council_position='CHAIR')
+        self.voter = make_profile(course, 4, otp_verified_until=timezone.now() + timedelta(minutes=5))
+        self.client.force_authenticate(self.voter.user)
+
+    def _cast(self, votes):
+        return self.client.post('/api/ballots/', {'votes': votes}, format='json')
+
+    def test_ballot_records_every_position_with_receipts(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self._cast([{'position': 'CHAIR', 'candidate': self.chair.id},
+                               {'position': 'VICE_CHAIR', 'candidate': self.vice.id}])
+        self.assertEqual(resp.status_code, 201)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "elections_vote"')]
+        self.assertEqual(len(inserts), 1)
+
+        receipts = {r['position']: r['receipt'] for r in resp.json()['receipts']}
+        vote = Vote.objects.get(position='CHAIR')
+        self.assertEqual(vote.receipt, receipts['CHAIR'])
+        self.assertEqual(vote.voter, self.voter)
+        self.assertEqual(vote.candidate, self.chair)
+        self.assertEqual(len(vote.vote_hash), 64)
+
+    def test_students_cannot_make_themselves_candidates(self):
+        student = self.client
+        resp = student.patch(f'/api/profiles/{self.voter.id}/', {
+            'user_type': 'ASPIRANT', 'council_position': 'CHAIR', 'is_qualified': True, 'vetting_status': 'PASSED',
+        }, format='json')
+        self.assertEqual(resp.status_code, 200)
+        resp = student.put('/api/auth/profile/update/', {'is_qualified': True, 'verification_notes': 'ok'},
+                           format='json')
+        self.assertEqual(resp.status_code, 200)
+
+        self.voter.refresh_from_db()
+        self.assertEqual((self.voter.user_type, self.voter.council_position), ('ASPIRANT', 'CHAIR'))
+        self.assertEqual((self.voter.vetting_status, self.voter.is_qualified), ('NOT_STARTED', False))
+        self.assertIsNone(self.voter.verification_notes)
+        self.assertNotIn(self.voter, ballots.votable_candidates())
+
+        # A vetted candidate who changes position goes back to vetting
+        student.force_authenticate(self.chair.user)
+        student.patch(f'/api/profiles/{self.chair.id}/', {'council_position': 'VICE_CHAIR'}, format='json')
+        self.assertNotIn(self.chair, ballots.votable_candidates())
+
+    def test_second_ballot_for_a_position_is_rejected_atomically(self):
+        self._cast([{'position': 'CHAIR', 'candidate': self.chair.id}])
+        resp = self._cast([{'position': 'VICE_CHAIR', 'candidate': self.vice.id},
+                           {'position': 'CHAIR', 'candidate': self.chair.id}])
+        self.assertEqual(resp.status_code, 409)
+        # The valid VICE_CHAIR vote in the rejected ballot was not kept
+        self.assertEqual(Vote.objects.count(), 1)
+
+    def test_invalid_ballots(self):
+        for votes in ([], [{'position': 'CHAIR', 'candidate': self.vice.id}],
+                      [{'position': 'CHAIR', 'candidate': self.unvetted.id}],
+                      [{'position': 'CHAIR', 'candidate': self.chair.id},
+                       {'position': 'CHAIR', 'candidate': self.chair.id}]):
+            self.assertEqual(self._cast(votes).status_code, 400, votes)
+        self.assertFalse(Vote.objects.exists())
+
+
+class TallyTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        _, (dept,) = make_catalogue()
+        self.course = dept.courses.first()
+        self.chair_a = make_profile(self.course, 1, user_type='ASPIRANT', council_position='CHAIR', is_qualified=True)
+        self.chair_b = make_profile(self.course, 2, user_type='ASPIRANT', council_position='CHAIR', is_qualified=True)
+        self.vice = make_profile(self.course, 3, user_type='ASPIRANT', council_position='VICE_CHAIR', is_qualified=True)
+        self.admin = User.objects.create_user(username='admin', password='pass12345', is_staff=True)
+
+    def _vote(self, n, chair, vice=None):
+        choices = {'CHAIR': chair.id}
+        if vice:
+            choices['VICE_CHAIR'] = vice.id
+        ballots.cast_ballot(make_profile(self.course, n), choices)
+
+    def test_counters_follow_ballots_and_results_read_only_counters(self):
+        self._vote(10, self.chair_a, self.vice)
+        self._vote(11, self.chair_a)
+        self._vote(12, self.chair_b, self.vice)
+
+        self.client.force_authenticate(self.admin)
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/results/')
+        positions = resp.json()['positions']
+
+        self.assertEqual(positions['CHAIR']['total_votes'], 3)
+        self.assertEqual([(c['id'], c['votes']) for c in positions['CHAIR']['candidates']],
+                         [(self.chair_a.id, 2), (self.chair_b.id, 1)])
+        self.assertEqual(positions['VICE_CHAIR']['position_display'], 'Vice Chair')
+        self.assertEqual(positions['VICE_CHAIR']['candidates'][0]['votes'], 2)
+
+    def test_rejected_ballot_does_not_touch_counters(self):
+        voter = make_profile(self.course, 10)
+        ballots.cast_ballot(voter, {'CHAIR': self.chair_a.id})
+        with self.assertRaises(ballots.AlreadyVoted):
+            ballots.cast_ballot(voter, {'CHAIR': self.chair_b.id, 'VICE_CHAIR': self.vice.id})
+        self.assertEqual(dict(TallyCounter.objects.values_list('candidate_id', 'votes')), {self.chair_a.id: 1})
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        self._vote(10, self.chair_a)
+        self._vote(11, self.chair_b)
+        self.assertEqual(reconcile(), [])
+
+        TallyCounter.objects.filter(candidate=self.chair_a).update(votes=5)
+        TallyCounter.objects.filter(candidate=self.chair_b).delete()
+        out = StringIO()
+        call_command('reconcile_tally', stdout=out)
+        self.assertIn('2 counters drifted', out.getvalue())
+
+        call_command('reconcile_tally', '--fix', stdout=StringIO())
+        self.assertEqual(reconcile(), [])
+        self.assertEqual(TallyCounter.objects.get(candidate=self.chair_a).votes, 1)
+
+    def test_results_are_admin_only(self):
+        self.client.force_authenticate(User.objects.create_user(username='student'))
+        self.assertEqual(self.client.get('/api/results/').status_code, 403)
+
+
+class VoteChainTests(TestCase):
+    def setUp(self):
+        _, (dept,) = make_catalogue()
+        self.course = dept.courses.first()
+        self.chair = make_profile(self.course, 1, user_type='ASPIRANT', council_position='CHAIR', is_qualified=True)
+        self.vice = make_profile(self.course, 2, user_type='ASPIRANT', council_position='VICE_CHAIR', is_qualified=True)
+        for n in range(10, 14):
+            ballots.cast_ballot(make_profile(self.course, n), {'CHAIR': self.chair.id, 'VICE_CHAIR': self.vice.id})
+
+    def _verify(self, *args):
+        out = StringIO()
+        call_command('verify_vote_chain', *args, stdout=out)
+        return out.getvalue()
+
+    def test_each_vote_hash_covers_the_previous_one(self):
+        previous = GENESIS_HASH
+        for vote in Vote.objects.order_by('id'):
+            self.assertEqual(vote.vote_hash, link_hash(previous, vote.receipt, vote.voter_id, vote.position,
+                                                       vote.candidate_id))
+            previous = vote.vote_hash
+        result = verify_chain()
+        self.assertEqual((result['verified'], result['broken_at'], result['head_ok']), (8, None, True))
+
+    def test_parallel_segments_verify_and_checkpoint(self):
+        output = self._verify('--workers', '2', '--segment-size', '3')
+        self.assertIn('Checked 8 votes', output)
+        self.assertIn('Vote chain intact', output)
+        self.assertEqual(list(VoteChainCheckpoint.objects.values_list('length', flat=True)), [3, 6, 8])
+
+        ballots.cast_ballot(make_profile(self.course, 20), {'CHAIR': self.chair.id})
+        output = self._verify('--resume')
+        self.assertIn('Checked 1 votes', output)
+        self.assertIn('Vote chain intact', output)
+
+    def test_reports_first_broken_link(self):
+        votes = list(Vote.objects.order_by('id'))
+        Vote.objects.filter(id=votes[5].id).update(candidate=self.vice)
+        Vote.objects.filter(id=votes[2].id).update(receipt='SAKU-FORGED')
+
+        for workers in ('1', '2'):
+            with self.assertRaisesMessage(CommandError, f'Vote chain broken at vote {votes[2].id}'):
+                self._verify('--workers', workers, '--segment-size', '2')
+
+    def test_detects_removed_votes(self):
+        Vote.objects.order_by('id').last().delete()
+        with self.assertRaisesMessage(CommandError, 'votes are missing'):
+            self._verify('--workers', '1')
+
+
+class ReceiptVerificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Ids of rolled-back test votes are reused, so start every test with an empty filter
+        patcher = mock.patch.object(receipts, 'receipt_filter', ReceiptFilter())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        _, (dept,) = make_catalogue()
+        self.course = dept.courses.first()
+        self.chair = make_profile(self.course, 1, user_type='ASPIRANT', council_position='CHAIR', is_qualified=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            (self.vote,) = ballots.cast_ballot(make_profile(self.course, 10), {'CHAIR': self.chair.id})
+
+    def test_valid_receipt_confirms_position_only(self):
+        resp = self.client.get(f'/api/receipts/{self.vote.receipt.lower()}/')
+        self.assertEqual(resp.status_code, 200)
+        body = resp.json()
+        self.assertTrue(body['valid'])
+        self.assertEqual((body['receipt'], body['position'], body['position_display']),
+                         (self.vote.receipt, 'CHAIR', 'Chair (President)'))
+        # Nothing derived from the candidate, including the chain hash that covers it
+        self.assertEqual(set(body), {'valid', 'receipt', 'position', 'position_display', 'voted_at'})
+        self.assertNotIn(self.vote.vote_hash.encode(), resp.content)
+
+    @mock.patch.object(receipts, 'REFRESH_SECONDS', 60)
+    def test_unknown_receipts_are_rejected_without_queries(self):
+        self.client.get(f'/api/receipts/{self.vote.receipt}/')
+        for receipt in ('SAKU-0000000000000000', 'SAKU-FFFFFFFFFFFFFFFF', 'not-a-receipt'):
+            with self.assertNumQueries(0):
+                resp = self.client.get(f'/api/receipts/{receipt}/')
+            self.assertEqual(resp.status_code, 404)
+            self.assertFalse(resp.json()['valid'])
+
+    @mock.patch.object(receipts, 'REFRESH_SECONDS', 0)
+    def test_receipts_from_other_processes_are_picked_up(self):
+        self.client.get(f'/api/receipts/{self.vote.receipt}/')
+        # Written without this process's on-commit hook, as another worker would
+        other = Vote.objects.create(voter=make_profile(self.course, 11), candidate=self.chair, position='CHAIR',
+                                    receipt='SAKU-00000000000000AB')
+        self.assertEqual(self.client.get(f'/api/receipts/{other.receipt}/').status_code, 200)
+
+    @mock.patch.object(ReceiptLookupThrottle, 'rate', '3/minute', create=True)
+    def test_lookups_are_rate_limited(self):
+        statuses = [self.client.get('/api/receipts/SAKU-0000000000000000/').status_code for _ in range(4)]
+        self.assertEqual(statuses, [404, 404, 404, 429])
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(5000)
+        issued = [ballots.generate_receipt() for _ in range(5000)]
+        for receipt in issued:
+            bloom.add(receipt)
+        self.assertTrue(all(receipt in bloom for receipt in issued))
+        false_positives = sum(ballots.generate_receipt() in bloom for _ in range(5000))
+        self.assertLess(false_positives, 25)
+
+
+def sent_code(profile):
+    """The code in the profile's latest queued OTP message"""
+    notification = Notification.objects.filter(profile=profile, kind=NotificationKind.OTP).latest('id')
+    return re.search(r'\b(\d{6})\b', notification.message).group(1)
+
+
+class OTPTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _, (dept,) = make_catalogue()
+        self.profile = make_profile(dept.courses.first(), 1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.profile.user)
+
+    def test_code_is_queued_and_stored_hashed(self):
+        resp = self.client.post('/api/auth/otp/request/')
+        self.assertEqual(resp.status_code, 202)
+        code = sent_code(self.profile)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.otp_code, otp.hash_code(self.profile.id, code))
+        self.assertNotIn(code, self.profile.otp_code)
+
+    def test_resend_is_throttled_from_cache(self):
+        otp.issue_otp(self.profile)
+        with self.assertNumQueries(0), self.assertRaises(otp.OTPThrottled):
+            otp.issue_otp(self.profile)
+
+        # Another process's cache does not know about the first code; the row does
+        cache.clear()
+        with self.assertRaises(otp.OTPThrottled):
+            otp.issue_otp(self.profile)
+        self.assertEqual(self.client.post('/api/auth/otp/request/').status_code, 429)
+
+    def test_code_is_single_use(self):
+        otp.issue_otp(self.profile)
+        code = sent_code(self.profile)
+        resp = self.client.post('/api/auth/otp/verify/', {'code': code}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        with self.assertRaises(otp.OTPExpired):
+            otp.verify_otp(self.profile.id, code)
+
+    def test_ballots_need_a_confirmed_code(self):
+        candidate = make_profile(self.profile.course, 2, user_type='ASPIRANT', council_position='CHAIR', is_qualified=True)
+        ballot = {'votes': [{'position': 'CHAIR', 'candidate': candidate.id}]}
+        self.assertEqual(self.client.post('/api/ballots/', ballot, format='json').status_code, 403)
+
+        otp.issue_otp(self.profile)
+        resp = self.client.post('/api/auth/otp/verify/', {'code': sent_code(self.profile)}, format='json')
+        self.assertIsNotNone(resp.json()['verified_until'])
+
+        # The verification lapses after VERIFIED_SECONDS
+        UserProfile.objects.filter(pk=self.profile.pk).update(otp_verified_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.client.post('/api/ballots/', ballot, format='json').status_code, 403)
+        self.assertFalse(Vote.objects.exists())
+
+        UserProfile.objects.filter(pk=self.profile.pk).update(otp_verified_until=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(self.client.post('/api/ballots/', ballot, format='json').status_code, 201)
+
+    def test_wrong_codes_lock_the_profile(self):
+        otp.issue_otp(self.profile)
+        code = sent_code(self.profile)
+        wrong = '000000' if code != '000000' else '111111'
+
+        remaining = []
+        for _ in range(otp.MAX_ATTEMPTS - 1):
+            resp = self.client.post('/api/auth/otp/verify/', {'code': wrong}, format='json')
+            remaining.append(resp.json()['attempts_remaining'])
+        self.assertEqual(remaining, [4, 3, 2, 1])
+
+        resp = self.client.post('/api/auth/otp/verify/', {'code': wrong}, format='json')
+        self.assertEqual(resp.status_code, 403)
+        # Rejected from the cache while locked, even with the right code
+        with self.assertNumQueries(0), self.assertRaises(otp.OTPLocked):
+            otp.verify_otp(self.profile.id, code)
+        with self.assertRaises(otp.OTPLocked):
+            otp.issue_otp(self.profile)
+
+    def test_delivered_codes_are_redacted(self):
+        otp.issue_otp(self.profile)
+        service = mock.Mock(is_configured=True)
+        service._send_message.return_value = True
+        dispatch_pending(service=service)
+
+        self.assertRegex(service._send_message.call_args.args[1], r'\b\d{6}\b')
+        notification = Notification.objects.get(kind=NotificationKind.OTP)
+        self.assertEqual(notification.status, NotificationStatus.SENT)
+        self.assertNotRegex(notification.message, r'\d{6}')
+
+
+class OTPConcurrencyTests(TransactionTestCase):
+    """Many requests for one profile at once, each on its own connection"""
+
+    def setUp(self):
+        cache.clear()
+        _, (dept,) = make_catalogue()
+        self.profile = make_profile(dept.courses.first(), 1)
+        otp.issue_otp(self.profile)
+        self.code = sent_code(self.profile)
+
+    def _race(self, code, threads=20):
+        barrier = threading.Barrier(threads)
+        outcomes = []
+
+        def submit():
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        outcomes.append(otp.verify_otp(self.profile.id, code))
+                        return
+                    except otp.OTPError as e:
+                        outcomes.append(type(e))
+                        return
+                    except OperationalError:
+                        # SQLite's shared in-memory test database refuses concurrent writers; retry the statement
+                        continue
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=submit) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return outcomes
+
+    def test_concurrent_wrong_codes_lock_after_max_attempts(self):
+        outcomes = self._race('000000' if self.code != '000000' else '111111')
+
+        self.assertLessEqual(outcomes.count(otp.InvalidOTP), otp.MAX_ATTEMPTS - 1)
+        self.assertEqual(outcomes.count(otp.InvalidOTP) + outcomes.count(otp.OTPLocked), 20)
+        self.profile.refresh_from_db()
+        self.assertIsNotNone(self.profile.otp_locked_until)
+        self.assertIsNone(self.profile.otp_code)
+        self.assertEqual(self.profile.otp_attempts, 0)
+
+    def test_concurrent_correct_codes_succeed_once(self):
+        outcomes = self._race(self.code)
+        # Success returns when the verification expires
+        self.assertEqual(len([outcome for outcome in outcomes if not isinstance(outcome, type)]), 1)
+        self.assertEqual(outcomes.count(otp.OTPExpired), 19)
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        _, (dept,) = make_catalogue()
+        self.course = dept.courses.first()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+
+    def test_snapshot_totals(self):
+        chair = make_profile(self.course, 1, user_type='ASPIRANT', council_position='CHAIR', is_qualified=True,
+                             vetting_status='PASSED', gender='Male')
+        make_profile(self.course, 2)
+        call_command('take_snapshot', stdout=StringIO())
+        totals = Snapshot.objects.latest().totals
+
+        self.assertEqual(totals['registrations']['total'], 2)
+        self.assertEqual(totals['registrations']['by_user_type']['ASPIRANT'], 1)
+        self.assertEqual((totals['vetting']['PASSED'], totals['vetting']['NOT_STARTED']), (1, 1))
+        self.assertEqual((totals['gender']['female'], totals['gender']['male']), (1, 1))
+        self.assertEqual(totals['coverage']['min_gap_sum'], 3)
+        self.assertNotIn('turnout', totals)
+
+        ballots.cast_ballot(make_profile(self.course, 3), {'CHAIR': chair.id})
+        self.assertEqual(compute_totals()['turnout'], {'votes': 1, 'voters': 1, 'eligible': 3, 'rate': 1 / 3})
+
+    def test_totals_use_a_fixed_number_of_queries(self):
+        with CaptureQueriesContext(connection) as small:
+            compute_totals()
+        for n in range(10, 30):
+            make_profile(self.course, n, user_type='DELEGATE')
+        with CaptureQueriesContext(connection) as large:
+            compute_totals()
+        self.assertEqual(len(small), len(large))
+
+    def test_series_is_downsampled(self):
+        start = timezone.now() - timedelta(hours=1)
+        for minute in range(50):
+            snapshot = Snapshot.objects.create(totals={'minute': minute})
+            Snapshot.objects.filter(id=snapshot.id).update(taken_at=start + timedelta(minutes=minute))
+
+        resp = self.client.get('/api/snapshots/', {'points': 10})
+        self.assertEqual(resp.status_code, 200)
+        body = resp.json()
+        minutes = [row['totals']['minute'] for row in body['snapshots']]
+        self.assertEqual(body['count'], 50)
+        self.assertLessEqual(len(minutes), 10)
+        self.assertEqual(minutes, sorted(minutes))
+        self.assertEqual(minutes[-1], 49)
+
+        since = (start + timedelta(minutes=45)).isoformat()
+        self.assertEqual(self.client.get('/api/snapshots/', {'since': since}).json()['count'], 5)
+        self.assertEqual(self.client.get('/api/snapshots/', {'points': 0}).status_code, 400)
+        self.assertEqual(self.client.get('/api/snapshots/', {'since': 'yesterday'}).status_code, 400)
+        resp = self.client.get('/api/snapshots/', {'since': '2024-02-30T00:00:00'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json(), {'error': 'since must be an ISO 8601 datetime'})
+
+
+class LiveEventTests(TestCase):
+    def test_hub_fans_out_to_hundreds_of_subscribers(self):
+        async def scenario():
+            events = EventHub()
+            streams = [events.subscribe() for _ in range(500)]
+            # The first message registers each subscription
+            await asyncio.gather(*(stream.__anext__() for stream in streams))
+            self.assertEqual(events.subscriber_count, 500)
+
+            # Producers may publish from worker threads
+            publisher = threading.Thread(target=events.publish, args=('tally', {'position': 'CHAIR'}))
+            publisher.start()
+            received = await asyncio.gather(*(stream.__anext__() for stream in streams))
+            publisher.join()
+
+            await asyncio.gather(*(stream.aclose() for stream in streams))
+            return received, events.subscriber_count
+
+        received, remaining = asyncio.run(scenario())
+        self.assertEqual(set(received), {b'id: 1\nevent: tally\ndata: {"position":"CHAIR"}\n\n'})
+        self.assertEqual(remaining, 0)
+
+    def test_stalled_subscriber_keeps_latest_events(self):
+        async def scenario():
+            events = EventHub(queue_size=2)
+            stream = events.subscribe()
+            await stream.__anext__()
+            for n in range(5):
+                events.publish('registration', {'id': n})
+            await asyncio.sleep(0)
+            received = [await stream.__anext__(), await stream.__anext__()]
+            await stream.aclose()
+            return received
+
+        received = asyncio.run(scenario())
+        self.assertEqual([message.split(b'\n')[0] for message in received], [b'id: 4', b'id: 5'])
+
+    def test_stream_ends_after_max_age(self):
+        async def scenario():
+            events = EventHub()
+            received = [message async for message in events.subscribe(heartbeat=0.01, max_age=0.05)]
+            return received, events.subscriber_count
+
+        received, remaining = asyncio.run(scenario())
+        self.assertEqual(received[0], b'retry: 5000\n\n')
+        self.assertIn(b': keep-alive\n\n', received)
+        self.assertEqual(remaining, 0)
+
+    def test_write_paths_publish_after_commit(self):
+        _, (dept,) = make_catalogue()
+        course = dept.courses.first()
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        with mock.patch.object(hub, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                candidate = make_profile(course, 1, user_type='ASPIRANT', council_position='CHAIR')
+            with self.captureOnCommitCallbacks(execute=True):
+                client.post(f'/api/profiles/{candidate.id}/verify/', {'is_qualified': True}, format='json')
+            with self.captureOnCommitCallbacks(execute=True):
+                ballots.cast_ballot(make_profile(course, 2), {'CHAIR': candidate.id})
+
+        self.assertEqual([call.args[0] for call in publish.call_args_list],
+                         ['registration', 'verification', 'registration', 'tally'])
+        self.assertEqual(publish.call_args_list[1].args[1],
+                         {'profiles': [{'id': candidate.id, 'vetting_status': 'PASSED', 'is_qualified': True}]})
+        self.assertEqual(publish.call_args_list[3].args[1], {'votes': [{'position': 'CHAIR', 'candidate': candidate.id}]})
+
+    def test_stream_requires_admin_stream_token(self):
+        student = User.objects.create_user(username='student')
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        self.assertEqual(self.client.get('/api/events/').status_code, 401)
+        self.assertEqual(self.client.get('/api/events/?token=garbage').status_code, 401)
+        # Access tokens are never accepted in the URL
+        self.assertEqual(self.client.get(f'/api/events/?token={AccessToken.for_user(admin)}').status_code, 401)
+        self.assertEqual(self.client.get(f'/api/events/?token={issue_stream_token(student)}').status_code, 403)
+        with mock.patch('django.core.signing.time.time', return_value=time.time() - STREAM_TOKEN_SECONDS - 1):
+            expired = issue_stream_token(admin)
+        self.assertEqual(self.client.get(f'/api/events/?token={expired}').status_code, 401)
+        # A sync worker would be held for the whole stream, so WSGI refuses it
+        self.assertEqual(self.client.get(f'/api/events/?token={issue_stream_token(admin)}').status_code, 503)
+
+    def test_stream_tokens_are_issued_to_admins_when_enabled(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='student'))
+        self.assertEqual(client.post('/api/events/token/').status_code, 403)
+
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        client.force_authenticate(admin)
+        with override_settings(LIVE_EVENTS=False):
+            self.assertEqual(client.post('/api/events/token/').status_code, 503)
+        with override_settings(LIVE_EVENTS=True):
+            token = client.post('/api/events/token/').json()['token']
+        self.assertEqual(read_stream_token(token), admin.pk)
+
+    async def test_stream_delivers_published_events(self):
+        admin = await User.objects.acreate(username='admin', is_staff=True)
+        stream_response = await self.async_client.get(f'/api/events/?token={issue_stream_token(admin)}')
+        self.assertEqual(stream_response['Content-Type'], 'text/event-stream')
+
+        stream = stream_response.streaming_content
+        self.assertEqual(await stream.__anext__(), b'retry: 5000\n\n')
+        hub.publish('verification', {'profiles': []})
+        self.assertIn(b'event: verification\ndata: {"profiles":[]}', await stream.__anext__())
+        await stream.aclose()
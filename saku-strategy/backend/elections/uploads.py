@@ -0,0 +1,282 @@
+"""
+Resumable chunked uploads for profile documents
+
+A student opens an upload session per document (declaring its name, size
+and SHA-256), then sends the bytes as a series of small chunks at
+increasing offsets. Each chunk is streamed from the request straight into
+its own file under ``UPLOAD_SESSION_ROOT``, so a worker never holds more
+than one copy buffer, and a dropped connection only costs the chunk in
+flight: the session records how many bytes have arrived and the client
+resumes from there.
+
+When the last chunk lands, the chunks are read back to back into the
+document's storage while being hashed, and the file is attached to the
+profile only if the digest matches the declared one.
+"""
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.utils import timezone
+
+from .documents import discard_unreferenced
+from .models import UploadSession, UploadStatus, UserProfile
+from .serializers import DOCUMENT_FIELDS
+
+# Largest document accepted, and largest chunk per request
+DOCUMENT_MAX_BYTES = 10 * 1024 * 1024
+CHUNK_MAX_BYTES = 2 * 1024 * 1024
+
+# Suggested to clients when a session is opened
+CHUNK_SIZE = 1024 * 1024
+
+# Bytes copied per read when streaming chunks to and from disk
+COPY_BUFFER = 64 * 1024
+
+# One chunk at a time per session; expires if the writer dies mid-chunk
+CHUNK_LOCK_KEY = 'elections:upload:{session_id}:lock'
+CHUNK_LOCK_SECONDS = 5 * 60
+
+# Unfinished sessions are purged after this long
+SESSION_TTL = timedelta(days=1)
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(Exception):
+    """The chunk or session was rejected"""
+
+
+class OffsetMismatch(UploadError):
+    """The chunk does not start where the upload left off"""
+
+    def __init__(self, offset):
+        super().__init__(f"Upload continues at byte {offset}")
+        self.offset = offset
+
+
+class ChunkInProgress(UploadError):
+    """Another chunk for the session is still being written"""
+
+
+class ChecksumMismatch(UploadError):
+    """The assembled document does not match its declared SHA-256"""
+
+
+def session_dir(session_id):
+    return os.path.join(settings.UPLOAD_SESSION_ROOT, str(session_id))
+
+
+def chunk_path(session_id, offset):
+    # Zero-padded so the chunks sort in offset order
+    return os.path.join(session_dir(session_id), f'{offset:012d}.part')
+
+
+def validate_document(document, filename, size, sha256):
+    """
+    Check a new session's declared document before any bytes arrive.
+
+    Raises:
+        ValidationError: Keyed by the offending field
+    """
+    if document not in DOCUMENT_FIELDS:
+        raise ValidationError({'document': f"Must be one of: {', '.join(DOCUMENT_FIELDS)}"})
+    if not 0 < size <= DOCUMENT_MAX_BYTES:
+        raise ValidationError({'size': f"Documents must be 1 to {DOCUMENT_MAX_BYTES} bytes"})
+    if not SHA256_RE.match(sha256):
+        raise ValidationError({'sha256': 'Must be a lowercase hex SHA-256 digest'})
+    # Same extension checks as a direct upload to the profile field
+    try:
+        for validator in UserProfile._meta.get_field(document).validators:
+            validator(File(None, name=filename))
+    except ValidationError as exc:
+        raise ValidationError({'filename': exc.messages})
+
+
+def open_session(profile, document, filename, size, sha256):
+    """
+    Start (or resume) the upload of one document.
+
+    An unfinished session for the same document, name, size and digest is
+    returned as is, so a client that lost its session id resumes instead of
+    starting over. Any other unfinished session for the document is
+    discarded.
+
+    Returns:
+        tuple: ``(session, created)``
+    """
+    validate_document(document, filename, size, sha256)
+    open_sessions = UploadSession.objects.filter(profile=profile, document=document, status=UploadStatus.OPEN)
+    for session in open_sessions:
+        if (session.filename, session.size, session.sha256) == (filename, size, sha256):
+            return session, False
+        discard_session(session)
+    session = UploadSession.objects.create(
+        profile=profile, document=document, filename=filename, size=size, sha256=sha256
+    )
+    return session, True
+
+
+def discard_session(session):
+    shutil.rmtree(session_dir(session.id), ignore_errors=True)
+    session.delete()
+
+
+def write_chunk(session, offset, stream, length, sha256=None):
+    """
+    Stream one chunk from ``stream`` into the session.
+
+    Args:
+        session: Open ``UploadSession``
+        offset: Byte offset the chunk starts at; must equal the bytes
+            received so far
+        stream: File-like request body
+        length: Declared chunk length (``Content-Length``)
+        sha256: Optional hex digest of the chunk
+
+    Returns:
+        UploadSession: The session, completed if this was the last chunk
+
+    Raises:
+        OffsetMismatch: ``offset`` is not where the upload continues
+        ChunkInProgress: Another request is writing to the session
+        ChecksumMismatch: The chunk or the assembled document is corrupt
+        UploadError: The chunk is too large, truncated or past the end
+    """
+    if session.status != UploadStatus.OPEN:
+        raise UploadError('Upload already complete')
+    if offset != session.received:
+        raise OffsetMismatch(session.received)
+    if not 0 < length <= CHUNK_MAX_BYTES:
+        raise UploadError(f"Chunks must be 1 to {CHUNK_MAX_BYTES} bytes")
+    if offset + length > session.size:
+        raise UploadError('Chunk runs past the declared document size')
+
+    lock_key = CHUNK_LOCK_KEY.format(session_id=session.id)
+    if not cache.add(lock_key, 1, timeout=CHUNK_LOCK_SECONDS):
+        raise ChunkInProgress('Another chunk is being uploaded for this document')
+    try:
+        directory = session_dir(session.id)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.incoming-')
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while written < length:
+                    block = stream.read(min(COPY_BUFFER, length - written))
+                    if not block:
+                        break
+                    out.write(block)
+                    digest.update(block)
+                    written += len(block)
+            if written != length:
+                raise UploadError(f"Chunk ended after {written} of {length} bytes")
+            if sha256 and digest.hexdigest() != sha256.lower():
+                raise ChecksumMismatch('Chunk does not match its SHA-256; send it again')
+            os.replace(temp_path, chunk_path(session.id, offset))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        advanced = UploadSession.objects.filter(
+            pk=session.pk, status=UploadStatus.OPEN, received=offset
+        ).update(received=offset + length, updated_at=timezone.now())
+        session.refresh_from_db()
+        if not advanced:
+            raise OffsetMismatch(session.received)
+    finally:
+        cache.delete(lock_key)
+
+    if session.received == session.size:
+        assemble(session)
+    return session
+
+
+class ChunkReader(io.RawIOBase):
+    """Read a session's chunk files back to back, hashing the bytes read"""
+
+    def __init__(self, paths):
+        self.paths = iter(paths)
+        self.current = None
+        self.sha256 = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while True:
+            if self.current is None:
+                path = next(self.paths, None)
+                if path is None:
+                    return 0
+                self.current = open(path, 'rb')
+            n = self.current.readinto(buffer)
+            if n:
+                self.sha256.update(memoryview(buffer)[:n])
+                return n
+            self.current.close()
+            self.current = None
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+        super().close()
+
+
+def assemble(session):
+    """
+    Copy a fully received session into the profile's document field.
+
+    Raises:
+        ChecksumMismatch: The document does not match the declared digest;
+            the session is reset so the client can upload it again
+    """
+    directory = session_dir(session.id)
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.part'))
+    profile = session.profile
+    field_file = getattr(profile, session.document)
+
+    reader = ChunkReader(paths)
+    with io.BufferedReader(reader, buffer_size=COPY_BUFFER) as stream:
+        content = File(stream, name=session.filename)
+        content.size = session.size
+        field_file.save(session.filename, content, save=False)
+
+    if reader.sha256.hexdigest() != session.sha256:
+        discard_unreferenced(field_file.name)
+        shutil.rmtree(directory, ignore_errors=True)
+        UploadSession.objects.filter(pk=session.pk).update(received=0, updated_at=timezone.now())
+        session.received = 0
+        raise ChecksumMismatch('Document does not match its SHA-256; upload it again')
+
+    profile.save(update_fields=[session.document, 'updated_at'])
+    session.status = UploadStatus.COMPLETE
+    session.save(update_fields=['status', 'updated_at'])
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def purge_expired(now=None):
+    """
+    Remove unfinished sessions idle for longer than ``SESSION_TTL``, and
+    the records of completed ones.
+
+    Returns:
+        int: Sessions removed
+    """
+    cutoff = (now or timezone.now()) - SESSION_TTL
+    expired = list(UploadSession.objects.filter(updated_at__lt=cutoff))
+    for session in expired:
+        shutil.rmtree(session_dir(session.id), ignore_errors=True)
+    UploadSession.objects.filter(pk__in=[session.pk for session in expired]).delete()
+    return len(expired)
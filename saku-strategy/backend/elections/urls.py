@@ -1,7 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
-from .views import FacultyViewSet, DepartmentViewSet, CourseViewSet, DelegateViewSet, UserProfileViewSet
+from .views import (
+    FacultyViewSet, DepartmentViewSet, CourseViewSet, DelegateViewSet, UserProfileViewSet, catalogue, cast_ballot,
+    election_results, live_events, live_events_token, verify_receipt, snapshots, upload_sessions, upload_session, serve_document
+)
 from . import auth_views
 
 router = DefaultRouter()
@@ -13,6 +16,16 @@ router.register(r'profiles', UserProfileViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('catalogue/', catalogue, name='catalogue'),
+    path('ballots/', cast_ballot, name='cast_ballot'),
+    path('results/', election_results, name='election_results'),
+    path('snapshots/', snapshots, name='snapshots'),
+    path('receipts/<str:receipt>/', verify_receipt, name='verify_receipt'),
+    path('events/', live_events, name='live_events'),
+    path('events/token/', live_events_token, name='live_events_token'),
+    path('uploads/', upload_sessions, name='upload_sessions'),
+    path('uploads/<uuid:session_id>/', upload_session, name='upload_session'),
+    path('documents/<str:token>/', serve_document, name='serve_document'),
     
     # Authentication endpoints
     path('auth/login/', auth_views.CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -21,6 +34,8 @@ urlpatterns = [
     path('auth/logout/', auth_views.logout_user, name='logout_user'),
     path('auth/profile/', auth_views.get_user_profile, name='get_user_profile'),
     path('auth/profile/update/', auth_views.update_user_profile, name='update_user_profile'),
+    path('auth/otp/request/', auth_views.request_otp, name='request_otp'),
+    path('auth/otp/verify/', auth_views.confirm_otp, name='confirm_otp'),
 ]
 
 
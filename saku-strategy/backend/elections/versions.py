@@ -0,0 +1,34 @@
+"""
+Shared version counters for cache invalidation
+
+A version lives under one cache key shared by every process. Writers bump
+it; readers compare the version a cached object was built from with the
+current one and rebuild when they differ.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _fresh_version() -> int:
+    # Seeded from the clock so a version evicted from the cache is never reissued
+    return time.time_ns() // 1000
+
+
+def current_version(key) -> int:
+    """Version stored under ``key``, seeded on first use"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_version(key) -> int:
+    """Advance the version stored under ``key``, invalidating what was built from it"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _fresh_version()
+        cache.set(key, version, timeout=None)
+        return version
@@ -1,14 +1,38 @@
 from rest_framework import viewsets, filters, decorators, response, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.throttling import AnonRateThrottle
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils import timezone
-from .models import Faculty, Department, Course, Delegate, UserProfile
+import json
+from datetime import timedelta
+from .models import Faculty, Department, Course, Delegate, UploadSession, UserProfile
 from .serializers import (
     FacultySerializer, DepartmentSerializer, CourseSerializer, DelegateSerializer,
-    UserProfileSerializer, UserProfileCreateSerializer
+    UserProfileSerializer, UserProfileListSerializer, UserProfileCreateSerializer,
+    VerificationVerdictSerializer, DelegateApprovalSerializer, BallotSerializer, UploadSessionSerializer
 )
-from .whatsapp_service import whatsapp_service
-# Rules engine removed - using simple validation instead
+from .notifications import enqueue_admin_registration_alert, enqueue_verdict_notifications
+from . import ballots, delegates, media, otp, tally, uploads
+from .events import STREAM_TOKEN_SECONDS, hub, issue_stream_token, read_stream_token, verification_event
+from .catalogue import get_catalogue
+from .receipts import lookup_receipt
+from .rules import get_rule_set, qualifies
+from .snapshots import DEFAULT_POINTS, MAX_POINTS, snapshot_series
+from .course_index import search_courses
+from .metrics import coverage_metrics, profile_statistics, STATISTICS_DIMENSIONS
 
 
 class FacultyViewSet(viewsets.ModelViewSet):
@@ -34,9 +58,8 @@ class CourseViewSet(viewsets.ModelViewSet):
         if len(query) < 2:
             return response.Response([])
         
-        courses = self.queryset.filter(name__icontains=query)[:10]
-        serializer = self.get_serializer(courses, many=True)
-        return response.Response(serializer.data)
+        # Served from the in-process index; no database query per keystroke
+        return response.Response(search_courses(query, limit=10))
 
 
 class DelegateViewSet(viewsets.ModelViewSet):
@@ -46,72 +69,78 @@ class DelegateViewSet(viewsets.ModelViewSet):
     search_fields = ['full_name','student_id','department__name','course__name']
 
     def perform_create(self, serializer):
-        instance = serializer.save()
-        # Simple validation - all delegates are considered eligible by default
-        # Admin can manually verify and update status later
-        instance.eligibility = {"status": "pending", "message": "Awaiting admin verification"}
-        instance.is_qualified = False  # Default to False until admin verifies
-        instance.save(update_fields=['eligibility','is_qualified'])
+        # Checked against the configured eligibility rules; qualification also waits for vetting
+        candidate = Delegate(**serializer.validated_data)
+        eligibility = get_rule_set().evaluate_instance(candidate)
+        serializer.save(eligibility=eligibility, is_qualified=qualifies(eligibility, candidate.vetting_status))
 
     @decorators.action(detail=False, methods=['get'])
     def metrics(self, request):
-        # Basic coverage metrics per department
-        departments = Department.objects.all()
-        metrics_data = []
-        
-        for dept in departments:
-            total_candidates = Delegate.objects.filter(department=dept).count()
-            qualified = Delegate.objects.filter(department=dept, is_qualified=True).count()
-            target_min = 3  # Minimum delegates per department
-            
-            # Gender distribution
-            male_count = Delegate.objects.filter(department=dept, gender='Male').count()
-            female_count = Delegate.objects.filter(department=dept, gender='Female').count()
-            
-            metrics_data.append({
-                'department': dept.name,
-                'code': dept.code,
-                'total_candidates': total_candidates,
-                'qualified': qualified,
-                'target_min': target_min,
-                'gap_to_min': max(0, target_min - qualified),
-                'female': female_count,
-                'male': male_count,
-                'gender_ratio_female': female_count / max(1, total_candidates),
-                'gender_target_female': 0.33,  # 33% target
-                'gender_gap': max(0, 0.33 - (female_count / max(1, total_candidates)))
-            })
-        
-        # Calculate overall score
-        total_gap = sum(dept['gap_to_min'] for dept in metrics_data)
-        total_gender_gap = sum(dept['gender_gap'] for dept in metrics_data)
-        score = max(0, 100 - (total_gap * 5) - (total_gender_gap * 20))
-        
-        return response.Response({
-            'departments': metrics_data,
-            'score': {'score': score, 'components': {
-                'min_gap_sum': total_gap,
-                'gender_gap_sum': total_gender_gap,
-                'buffer_sum': 0,
-                'weights': {'w_min_gap': 5.0, 'w_gender_gap': 20.0, 'w_buffer': 2.0}
-            }}
-        })
+        # Coverage metrics per department, read from the delegate counters in a single query
+        return response.Response(coverage_metrics())
 
 
 
+# Rows fetched per database round-trip when exporting profiles
+EXPORT_CHUNK_SIZE = 500
+
+
+class ProfileCursorPagination(CursorPagination):
+    """Keyset pagination for the admin profile list, newest first"""
+    ordering = ('-created_at', 'id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+def filter_admin_profiles(queryset, params):
+    """
+    Apply the admin dashboard filters from query params in SQL.
+
+    ``user_type`` and ``vetting_status`` accept comma-separated values;
+    ``search`` matches the name or registration number.
+    """
+    for param, field in (('user_type', 'user_type'), ('vetting_status', 'vetting_status'),
+                         ('faculty', 'faculty_id'), ('department', 'department_id')):
+        value = params.get(param)
+        if not value:
+            continue
+        if field.endswith('_id'):
+            if not value.isdigit():
+                raise ValidationError({param: 'Must be a numeric id'})
+            queryset = queryset.filter(**{field: value})
+        else:
+            queryset = queryset.filter(**{f'{field}__in': value.split(',')})
+    search = params.get('search', '').strip()
+    if search:
+        queryset = queryset.filter(Q(full_name__icontains=search) | Q(student_id__icontains=search))
+    return queryset
+
+
 class UserProfileViewSet(viewsets.ModelViewSet):
-    queryset = UserProfile.objects.select_related('user', 'department', 'course', 'verified_by').all().order_by('-created_at')
+    queryset = UserProfile.objects.all().order_by('-created_at')
     serializer_class = UserProfileSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['full_name', 'student_id', 'department__name', 'course__name', 'user_type']
     ordering_fields = ['created_at', 'full_name', 'vetting_status']
     ordering = ['-created_at']
 
+    # Actions that return many profiles use the compact list representation
+    list_actions = ['list', 'pending_verification', 'qualified', 'by_type', 'admin_all_profiles', 'export_profiles']
+
     def get_serializer_class(self):
         if self.action == 'create':
             return UserProfileCreateSerializer
+        if self.action in self.list_actions:
+            return UserProfileListSerializer
         return UserProfileSerializer
 
+    def optimize_queryset(self, queryset):
+        """Load only the columns and relations the action's serializer reads"""
+        if self.action in self.list_actions:
+            return queryset.for_list()
+        return queryset.for_detail()
+
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires.
@@ -131,29 +160,22 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         if self.request.user.is_authenticated:
             if self.request.user.is_staff:
                 # Admin can see all profiles
-                return UserProfile.objects.select_related('user', 'department', 'course', 'verified_by').all().order_by('-created_at')
+                return self.optimize_queryset(UserProfile.objects.all()).order_by('-created_at')
             else:
                 # Students can only see their own profile
-                return UserProfile.objects.filter(user=self.request.user).select_related('user', 'department', 'course', 'verified_by').order_by('-created_at')
+                return self.optimize_queryset(UserProfile.objects.filter(user=self.request.user)).order_by('-created_at')
         else:
             # Unauthenticated users see nothing
             return UserProfile.objects.none()
 
     def create(self, request, *args, **kwargs):
-        """Create a new user profile and send admin notification"""
-        from django.conf import settings
-        
+        """Create a new user profile and queue an admin notification"""
         response = super().create(request, *args, **kwargs)
         
-        # Send admin notification if profile was created successfully
+        # Queue admin notification if profile was created successfully
         if response.status_code == 201:
             profile_data = response.data
-            admin_phone = getattr(settings, 'ADMIN_PHONE_NUMBER', '+254700000000')
-            
-            # Send WhatsApp notification to admin
-            whatsapp_service.send_admin_registration_alert(
-                admin_phone=admin_phone,
-                student_name=profile_data.get('full_name', 'Unknown'),
+            enqueue_admin_registration_alert(
                 reg_number=profile_data.get('student_id', 'Unknown'),
                 user_type=profile_data.get('user_type', 'Unknown'),
                 position=profile_data.get('council_position')
@@ -178,42 +200,119 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         profile.verification_notes = verification_notes
         profile.verified_by = request.user
         profile.verified_at = timezone.now()
+        if not is_qualified and profile.is_delegate:
+            # A failing verdict withdraws delegate status; the save moves the counters
+            profile.is_delegate = False
+            profile.delegate_approved_at = None
+            profile.delegate_approved_by = None
         profile.save()
         
-        # Send WhatsApp notification
-        if not profile.whatsapp_notification_sent:
-            if is_qualified:
-                success = whatsapp_service.send_qualification_notification(
-                    phone_number=profile.whatsapp_number,
-                    full_name=profile.full_name,
-                    position=profile.get_council_position_display() if profile.council_position else None
-                )
-            else:
-                success = whatsapp_service.send_rejection_notification(
-                    phone_number=profile.whatsapp_number,
-                    full_name=profile.full_name,
-                    reason=verification_notes
-                )
-            
-            if success:
-                profile.whatsapp_notification_sent = True
-                profile.whatsapp_notification_sent_at = timezone.now()
-                profile.save()
+        # WhatsApp notification is sent by the dispatch_notifications worker
+        enqueue_verdict_notifications([profile])
+        verification_event([profile])
         
         serializer = self.get_serializer(profile)
         return response.Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def bulk_verify(self, request):
+        """Apply many verification verdicts in one transaction (Admin only)"""
+        if not request.user.is_staff:
+            return response.Response({
+                'error': 'Only administrators can verify profiles'
+            }, status=403)
+        
+        verdicts = VerificationVerdictSerializer(data=request.data, many=True)
+        verdicts.is_valid(raise_exception=True)
+        # The last verdict wins if a profile is listed twice
+        by_id = {item['id']: item for item in verdicts.validated_data}
+        
+        now = timezone.now()
+        with transaction.atomic():
+            profiles = list(
+                UserProfile.objects.select_for_update()
+                .filter(id__in=by_id)
+                .only('id', 'full_name', 'council_position', 'whatsapp_number', 'whatsapp_notification_sent')
+            )
+            for profile in profiles:
+                verdict = by_id[profile.id]
+                profile.vetting_status = 'PASSED' if verdict['is_qualified'] else 'FAILED'
+                profile.is_qualified = verdict['is_qualified']
+                profile.verification_notes = verdict['verification_notes']
+                profile.verified_by = request.user
+                profile.verified_at = now
+            
+            UserProfile.objects.bulk_update(
+                profiles, ['vetting_status', 'is_qualified', 'verification_notes', 'verified_by', 'verified_at']
+            )
+            failed = [profile.id for profile in profiles if not profile.is_qualified]
+            if failed:
+                delegates.revoke_delegates(failed)
+            # WhatsApp notifications are sent by the dispatch_notifications worker
+            enqueue_verdict_notifications(profiles)
+            verification_event(profiles)
+        
+        verified = {profile.id: profile for profile in profiles}
+        results = []
+        for item in verdicts.validated_data:
+            profile = verified.get(item['id'])
+            if profile is None:
+                results.append({'id': item['id'], 'status': 'not_found'})
+            else:
+                results.append({'id': profile.id, 'status': 'verified', 'vetting_status': profile.vetting_status})
+        
+        return response.Response({
+            'verified': len(profiles),
+            'results': results
+        })
+
+    @action(detail=False, methods=['post'])
+    def approve_delegates(self, request):
+        """Promote qualified delegate applicants in one update (Admin only)"""
+        if not request.user.is_staff:
+            return response.Response({
+                'error': 'Only administrators can approve delegates'
+            }, status=403)
+        
+        serializer = DelegateApprovalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        approved = delegates.approve_delegates(ids, approved_by=request.user)
+        
+        return response.Response({
+            'approved': approved,
+            'skipped': sorted(set(ids) - set(approved))
+        })
+
+    @action(detail=False, methods=['post'])
+    def revoke_delegates(self, request):
+        """Withdraw delegate status in one update (Admin only)"""
+        if not request.user.is_staff:
+            return response.Response({
+                'error': 'Only administrators can revoke delegates'
+            }, status=403)
+        
+        serializer = DelegateApprovalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        revoked = delegates.revoke_delegates(ids)
+        
+        return response.Response({
+            'revoked': revoked,
+            'skipped': sorted(set(ids) - set(revoked))
+        })
+
     @action(detail=False, methods=['get'])
     def pending_verification(self, request):
         """Get all profiles pending verification"""
-        pending_profiles = self.queryset.filter(vetting_status='NOT_STARTED')
+        pending_profiles = self.optimize_queryset(self.queryset.filter(vetting_status='NOT_STARTED'))
         serializer = self.get_serializer(pending_profiles, many=True)
         return response.Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def qualified(self, request):
         """Get all qualified profiles"""
-        qualified_profiles = self.queryset.filter(is_qualified=True)
+        qualified_profiles = self.optimize_queryset(self.queryset.filter(is_qualified=True))
         serializer = self.get_serializer(qualified_profiles, many=True)
         return response.Response(serializer.data)
 
@@ -222,7 +321,7 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         """Get profiles by user type"""
         user_type = request.query_params.get('type')
         if user_type:
-            profiles = self.queryset.filter(user_type=user_type)
+            profiles = self.optimize_queryset(self.queryset.filter(user_type=user_type))
             serializer = self.get_serializer(profiles, many=True)
             return response.Response(serializer.data)
         return response.Response({'error': 'Type parameter required'}, status=status.HTTP_400_BAD_REQUEST)
@@ -234,50 +333,324 @@ class UserProfileViewSet(viewsets.ModelViewSet):
             return response.Response({
                 'error': 'Only administrators can view statistics'
             }, status=403)
-        total_profiles = self.queryset.count()
-        qualified_profiles = self.queryset.filter(is_qualified=True).count()
-        pending_profiles = self.queryset.filter(vetting_status='NOT_STARTED').count()
-        
-        # By user type
-        aspirants = self.queryset.filter(user_type='ASPIRANT').count()
-        delegates = self.queryset.filter(user_type='DELEGATE').count()
-        ieck_members = self.queryset.filter(user_type='IECK').count()
-        
-        # By position (for aspirants)
-        position_stats = {}
-        for position_code, position_name in UserProfile._meta.get_field('council_position').choices:
-            count = self.queryset.filter(user_type='ASPIRANT', council_position=position_code).count()
-            if count > 0:
-                position_stats[position_name] = count
-        
-        return response.Response({
-            'total_profiles': total_profiles,
-            'qualified_profiles': qualified_profiles,
-            'pending_profiles': pending_profiles,
-            'by_user_type': {
-                'aspirants': aspirants,
-                'delegates': delegates,
-                'ieck_members': ieck_members
-            },
-            'by_position': position_stats
-        })
+
+        # Optional breakdown: ?by=faculty or ?by=department
+        dimension = request.query_params.get('by')
+        if dimension and dimension not in STATISTICS_DIMENSIONS:
+            return response.Response({
+                'error': f"by must be one of: {', '.join(STATISTICS_DIMENSIONS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return response.Response(profile_statistics(self.queryset, dimension))
     
     @action(detail=False, methods=['get'])
     def admin_all_profiles(self, request):
-        """Get all profiles for admin dashboard (Admin only)"""
+        """
+        Profiles for the admin dashboard (Admin only).
+
+        Sending ``cursor`` or ``page_size`` returns one keyset page with
+        ``next``/``previous`` links; otherwise every matching profile is
+        returned with their ``count``.
+        """
         if not request.user.is_staff:
             return response.Response({
                 'error': 'Only administrators can view all profiles'
             }, status=403)
         
         # Admin can see all profiles regardless of queryset filtering
-        all_profiles = UserProfile.objects.select_related('user', 'department', 'course', 'verified_by').all().order_by('-created_at')
-        serializer = UserProfileSerializer(all_profiles, many=True)
+        all_profiles = filter_admin_profiles(
+            self.optimize_queryset(UserProfile.objects.all()),
+            request.query_params
+        )
+        if not {'cursor', 'page_size'} & set(request.query_params):
+            profiles = list(all_profiles.order_by(*ProfileCursorPagination.ordering))
+            return response.Response({
+                'profiles': UserProfileListSerializer(profiles, many=True).data,
+                'count': len(profiles)
+            })
+
+        paginator = ProfileCursorPagination()
+        page = paginator.paginate_queryset(all_profiles, request, view=self)
+        serializer = UserProfileListSerializer(page, many=True)
         
         return response.Response({
             'profiles': serializer.data,
-            'count': all_profiles.count()
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link()
         })
 
+    @action(detail=False, methods=['get'])
+    def export_profiles(self, request):
+        """Stream all matching profiles as NDJSON (Admin only)"""
+        if not request.user.is_staff:
+            return response.Response({
+                'error': 'Only administrators can export profiles'
+            }, status=403)
+
+        profiles = filter_admin_profiles(
+            self.optimize_queryset(UserProfile.objects.all()),
+            request.query_params
+        ).order_by(*ProfileCursorPagination.ordering)
+
+        def rows():
+            for profile in profiles.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+                yield json.dumps(UserProfileListSerializer(profile).data, cls=DjangoJSONEncoder) + '\n'
+
+        stream = StreamingHttpResponse(rows(), content_type='application/x-ndjson')
+        stream['Content-Disposition'] = 'attachment; filename="profiles.ndjson"'
+        return stream
+
+
+@decorators.api_view(['GET'])
+@decorators.authentication_classes([])
+@decorators.permission_classes([permissions.AllowAny])
+def catalogue(request):
+    """Faculties, departments and courses in one cacheable response"""
+    entry = get_catalogue()
+    not_modified = get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified']
+    )
+    if not_modified is not None:
+        return not_modified
+
+    catalogue_response = HttpResponse(entry['body'], content_type='application/json')
+    catalogue_response['ETag'] = entry['etag']
+    catalogue_response['Last-Modified'] = http_date(entry['last_modified'])
+    # Clients may keep the response but must revalidate it on every visit
+    patch_cache_control(catalogue_response, public=True, no_cache=True)
+    return catalogue_response
+
+
+@decorators.api_view(['POST'])
+def cast_ballot(request):
+    """Record the current user's votes for one or more positions (requires a confirmed OTP)"""
+    try:
+        voter = UserProfile.objects.only('id', 'otp_verified_until').get(user=request.user)
+    except UserProfile.DoesNotExist:
+        return response.Response({
+            'error': 'Only registered students can vote'
+        }, status=403)
+    if not otp.is_verified(voter):
+        return response.Response({
+            'error': 'Confirm a verification code before voting'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    serializer = BallotSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    choices = {vote['position']: vote['candidate'] for vote in serializer.validated_data['votes']}
+
+    try:
+        votes = ballots.cast_ballot(
+            voter, choices,
+            ip_address=request.META.get('REMOTE_ADDR'),
+            user_agent=request.META.get('HTTP_USER_AGENT', '')
+        )
+    except ballots.AlreadyVoted as e:
+        return response.Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    except ballots.BallotError as e:
+        return response.Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return response.Response({
+        'receipts': [{'position': vote.position, 'receipt': vote.receipt} for vote in votes],
+        'voted_at': votes[0].voted_at
+    }, status=status.HTTP_201_CREATED)
+
+
+@decorators.api_view(['GET'])
+def election_results(request):
+    """Live standings per position from the tally counters (Admin only)"""
+    if not request.user.is_staff:
+        return response.Response({
+            'error': 'Only administrators can view results'
+        }, status=403)
+
+    return response.Response({'positions': tally.results()})
+
+
+@decorators.api_view(['GET'])
+def snapshots(request):
+    """
+    Downsampled dashboard totals over time for trend charts (Admin only).
+
+    Query params: ``since`` / ``until`` (ISO datetimes; default the last
+    7 days) and ``points`` (maximum rows returned).
+    """
+    if not request.user.is_staff:
+        return response.Response({
+            'error': 'Only administrators can view snapshots'
+        }, status=403)
+
+    bounds = {}
+    for param in ('since', 'until'):
+        value = request.query_params.get(param)
+        if value:
+            try:
+                # Well-formed but impossible dates (February 30th) raise instead of returning None
+                bounds[param] = parse_datetime(value)
+            except ValueError:
+                bounds[param] = None
+            if bounds[param] is None:
+                return response.Response({'error': f'{param} must be an ISO 8601 datetime'}, status=400)
+            if timezone.is_naive(bounds[param]):
+                bounds[param] = timezone.make_aware(bounds[param])
+    bounds.setdefault('since', timezone.now() - timedelta(days=7))
+
+    points = request.query_params.get('points', str(DEFAULT_POINTS))
+    if not points.isdigit() or not 1 <= int(points) <= MAX_POINTS:
+        return response.Response({'error': f'points must be between 1 and {MAX_POINTS}'}, status=400)
+
+    series, total = snapshot_series(points=int(points), **bounds)
+    return response.Response({'count': total, 'snapshots': series})
+
+
+class ReceiptLookupThrottle(AnonRateThrottle):
+    scope = 'receipt_lookup'
+
+
+def upload_session_payload(session):
+    return {**UploadSessionSerializer(session).data, 'chunk_size': uploads.CHUNK_SIZE}
+
+
+@decorators.api_view(['POST'])
+@decorators.permission_classes([permissions.IsAuthenticated])
+def upload_sessions(request):
+    """Open (or resume) a chunked upload of one of the current user's documents"""
+    profile = UserProfile.objects.only('id').filter(user=request.user).first()
+    if profile is None:
+        return response.Response({
+            'error': 'Only registered students can upload documents'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    serializer = UploadSessionSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    try:
+        session, created = uploads.open_session(profile, **serializer.validated_data)
+    except DjangoValidationError as e:
+        raise ValidationError(e.message_dict)
+    return response.Response(upload_session_payload(session),
+                             status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+@decorators.api_view(['GET', 'PUT', 'DELETE'])
+@decorators.permission_classes([permissions.IsAuthenticated])
+def upload_session(request, session_id):
+    """
+    Progress of an upload (GET), its next chunk (PUT) or abandon it (DELETE).
+
+    A chunk is the raw request body, sent with an ``Upload-Offset`` header
+    naming the byte it starts at and optionally ``X-Chunk-Sha256``. The body
+    is streamed to disk, never parsed.
+    """
+    session = UploadSession.objects.filter(id=session_id, profile__user=request.user).first()
+    if session is None:
+        return response.Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'DELETE':
+        uploads.discard_session(session)
+        return response.Response(status=status.HTTP_204_NO_CONTENT)
+
+    if request.method == 'PUT':
+        offset = request.headers.get('Upload-Offset', '')
+        length = request.META.get('CONTENT_LENGTH') or '0'
+        if not offset.isdigit() or not length.isdigit():
+            return response.Response({
+                'error': 'Upload-Offset and Content-Length headers are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            uploads.write_chunk(session, int(offset), request.stream, int(length),
+                                sha256=request.headers.get('X-Chunk-Sha256'))
+        except (uploads.OffsetMismatch, uploads.ChunkInProgress) as e:
+            return response.Response({'error': str(e), 'received': session.received}, status=status.HTTP_409_CONFLICT)
+        except uploads.UploadError as e:
+            return response.Response({'error': str(e), 'received': session.received}, status=status.HTTP_400_BAD_REQUEST)
+
+    upload_response = response.Response(upload_session_payload(session))
+    upload_response['Upload-Offset'] = str(session.received)
+    return upload_response
+
+
+@decorators.api_view(['GET'])
+@decorators.authentication_classes([])
+@decorators.permission_classes([permissions.AllowAny])
+@decorators.throttle_classes([ReceiptLookupThrottle])
+def verify_receipt(request, receipt):
+    """Confirm that a vote receipt was recorded, without revealing the choice"""
+    vote = lookup_receipt(receipt)
+    if vote is None:
+        return response.Response({
+            'valid': False,
+            'error': 'No vote was recorded with this receipt'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return response.Response({'valid': True, **vote})
+
+
+@require_safe
+def serve_document(request, token):
+    """
+    Send an uploaded document through a signed link.
+
+    The link was issued by a profile serializer to someone allowed to read
+    the profile, so it is checked for a valid signature only; range and
+    conditional requests are answered here or by the front server.
+    """
+    try:
+        name, filename = media.read_link(token)
+    except media.LinkError as e:
+        return JsonResponse({'error': str(e)}, status=403)
+
+    served = media.file_response(request, name, filename)
+    if served is None:
+        return JsonResponse({'error': 'Document not found'}, status=404)
+    return served
+
+
+@decorators.api_view(['POST'])
+def live_events_token(request):
+    """
+    Short-lived token for opening the live event stream (Admin only).
+
+    503 when the server cannot stream, so dashboards know to stay static
+    instead of retrying.
+    """
+    if not request.user.is_staff:
+        return response.Response({
+            'error': 'Only administrators can follow live events'
+        }, status=status.HTTP_403_FORBIDDEN)
+    if not settings.LIVE_EVENTS:
+        return response.Response({
+            'error': 'Live events are not enabled on this server'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    return response.Response({'token': issue_stream_token(request.user), 'expires_in': STREAM_TOKEN_SECONDS})
+
+
+async def live_events(request):
+    """
+    Server-sent event stream of registrations, verdicts and tally changes (Admin only).
+
+    Opened with ``?token=`` from ``live_events_token``. Only served through
+    core.asgi: under WSGI a stream would hold a sync worker for its whole
+    lifetime, so it is refused.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    user_id = read_stream_token(request.GET.get('token', ''))
+    if user_id is None:
+        return JsonResponse({'error': 'Stream token is missing, invalid or expired'}, status=401)
+    user = await User.objects.filter(pk=user_id, is_active=True).afirst()
+    if user is None or not user.is_staff:
+        return JsonResponse({'error': 'Only administrators can follow live events'}, status=403)
+
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Live events are only served over ASGI'}, status=503)
+
+    stream = StreamingHttpResponse(hub.subscribe(), content_type='text/event-stream')
+    stream['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    stream['X-Accel-Buffering'] = 'no'
+    return stream
+
 
 # Create your views here.
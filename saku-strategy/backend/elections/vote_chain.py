@@ -0,0 +1,164 @@
+"""
+Append-only hash chain over recorded votes
+
+Every vote's ``vote_hash`` covers the previous vote's hash, so altering,
+removing or reordering any vote breaks every later link. Appends happen in
+the ballot transaction under the ``VoteChain`` head row lock, so vote ids
+follow chain order.
+
+Verification streams the Vote table in id order and cuts it into segments.
+A segment only needs its anchor (the stored hash of the vote before it), so
+segments are checked independently across a process pool. Clean segment
+ends are saved as checkpoints that later runs can resume from.
+"""
+import hashlib
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Vote, VoteChain, VoteChainCheckpoint
+
+GENESIS_HASH = '0' * 64
+HEAD_ID = 1
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_SEGMENT_SIZE = 50000
+
+CHAIN_FIELDS = ('id', 'receipt', 'voter_id', 'position', 'candidate_id', 'vote_hash')
+
+
+def link_hash(previous_hash, receipt, voter_id, position, candidate_id) -> str:
+    """Hash of one vote, covering the hash of the vote before it"""
+    return hashlib.sha256(f"{previous_hash}|{receipt}|{voter_id}|{position}|{candidate_id}".encode()).hexdigest()
+
+
+def append(votes):
+    """
+    Chain unsaved votes onto the head, in list order.
+
+    Must run inside the ballot's transaction, before the votes are inserted.
+    The head is locked with an ``UPDATE`` rather than ``SELECT ... FOR
+    UPDATE`` so SQLite also takes its write lock up front.
+
+    Args:
+        votes: Unsaved Vote instances; their ``vote_hash`` is filled in
+    """
+    if not VoteChain.objects.filter(pk=HEAD_ID).update(length=F('length') + len(votes)):
+        VoteChain.objects.get_or_create(pk=HEAD_ID, defaults={'head_hash': GENESIS_HASH})
+        VoteChain.objects.filter(pk=HEAD_ID).update(length=F('length') + len(votes))
+
+    previous = VoteChain.objects.values_list('head_hash', flat=True).get(pk=HEAD_ID)
+    for vote in votes:
+        vote.vote_hash = previous = link_hash(previous, vote.receipt, vote.voter_id, vote.position, vote.candidate_id)
+    VoteChain.objects.filter(pk=HEAD_ID).update(head_hash=previous, updated_at=timezone.now())
+
+
+def verify_segment(anchor_hash, rows):
+    """
+    Check the links of one segment.
+
+    Args:
+        anchor_hash: Stored hash of the vote preceding the segment
+        rows: ``CHAIN_FIELDS`` tuples in id order
+
+    Returns:
+        int or None: Id of the first vote whose hash does not match
+    """
+    previous = anchor_hash
+    for vote_id, receipt, voter_id, position, candidate_id, stored in rows:
+        if link_hash(previous, receipt, voter_id, position, candidate_id) != stored:
+            return vote_id
+        previous = stored
+    return None
+
+
+def segments(anchor_hash, limit, start_after=None, segment_size=DEFAULT_SEGMENT_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream the first ``limit`` chained votes as ``(anchor_hash, rows)`` segments"""
+    votes = Vote.objects.order_by('id')
+    if start_after is not None:
+        votes = votes.filter(id__gt=start_after)
+
+    rows = []
+    for row in votes.values_list(*CHAIN_FIELDS)[:limit].iterator(chunk_size=chunk_size):
+        rows.append(row)
+        if len(rows) == segment_size:
+            yield anchor_hash, rows
+            anchor_hash, rows = rows[-1][-1], []
+    if rows:
+        yield anchor_hash, rows
+
+
+def verify_chain(workers=1, resume=False, segment_size=DEFAULT_SEGMENT_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Verify the vote chain up to the current head.
+
+    Votes cast while this runs are left for the next run.
+
+    Args:
+        workers: Processes checking segments in parallel (1 checks inline)
+        resume: Start after the latest checkpoint instead of the genesis
+        segment_size: Votes per independently checked segment
+        chunk_size: Rows fetched per database round trip
+
+    Returns:
+        dict: ``verified`` (votes checked), ``broken_at`` (first bad vote id
+        or None), ``head_ok``, ``resumed_from`` (vote id or None), ``seconds``
+    """
+    started = time.perf_counter()
+    head = VoteChain.objects.filter(pk=HEAD_ID).first() or VoteChain(head_hash=GENESIS_HASH, length=0)
+    result = {'verified': 0, 'broken_at': None, 'head_ok': False, 'resumed_from': None}
+
+    anchor, offset, start_after = GENESIS_HASH, 0, None
+    checkpoint = VoteChainCheckpoint.objects.last() if resume else None
+    if checkpoint is not None:
+        result['resumed_from'] = checkpoint.vote_id
+        if not Vote.objects.filter(id=checkpoint.vote_id, vote_hash=checkpoint.vote_hash).exists():
+            result['broken_at'] = checkpoint.vote_id
+            result['seconds'] = time.perf_counter() - started
+            return result
+        anchor, offset, start_after = checkpoint.vote_hash, checkpoint.length, checkpoint.vote_id
+
+    pending = segments(anchor, head.length - offset, start_after, segment_size, chunk_size)
+    anchors, last_hash = [], anchor
+
+    def record(rows, broken):
+        nonlocal offset, last_hash
+        result['verified'] += len(rows)
+        if broken is not None:
+            result['broken_at'] = broken
+            return False
+        offset += len(rows)
+        last_hash = rows[-1][-1]
+        anchors.append(VoteChainCheckpoint(vote_id=rows[-1][0], vote_hash=last_hash, length=offset))
+        return True
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            in_flight = deque()
+            for segment_anchor, rows in pending:
+                in_flight.append((rows, pool.submit(verify_segment, segment_anchor, rows)))
+                # Bound memory: keep at most two segments per worker in flight
+                if len(in_flight) >= workers * 2:
+                    rows, future = in_flight.popleft()
+                    if not record(rows, future.result()):
+                        break
+            else:
+                while in_flight:
+                    rows, future = in_flight.popleft()
+                    if not record(rows, future.result()):
+                        break
+            for _, future in in_flight:
+                future.cancel()
+    else:
+        for segment_anchor, rows in pending:
+            if not record(rows, verify_segment(segment_anchor, rows)):
+                break
+
+    VoteChainCheckpoint.objects.bulk_create(anchors, ignore_conflicts=True)
+    result['head_ok'] = result['broken_at'] is None and offset == head.length and last_hash == head.head_hash
+    result['seconds'] = time.perf_counter() - started
+    return result
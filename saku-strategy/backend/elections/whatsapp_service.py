@@ -20,31 +20,36 @@ class WhatsAppService:
         self.twilio_account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', '')
         self.twilio_auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', '')
         self.twilio_whatsapp_number = getattr(settings, 'TWILIO_WHATSAPP_NUMBER', '+14155238886')
-    
-    def send_qualification_notification(self, phone_number: str, full_name: str, position: str = None) -> bool:
-        """
-        Send WhatsApp notification to qualified candidate
-        
-        Args:
-            phone_number: Recipient's phone number (with country code)
-            full_name: Candidate's full name
-            position: Council position they're running for (if aspirant)
         
-        Returns:
-            bool: True if message sent successfully, False otherwise
-        """
-        if not self.api_url or not self.api_token:
-            print("WhatsApp API not configured. Skipping notification.")
-            return False
-        
-        # Format phone number (remove any non-digit characters except +)
+        # Provider requests never block longer than this (seconds)
+        self.timeout = getattr(settings, 'WHATSAPP_REQUEST_TIMEOUT', 10)
+        self._session = None
+    
+    @property
+    def session(self) -> requests.Session:
+        """Pooled HTTP session reused across provider requests"""
+        if self._session is None:
+            self._session = requests.Session()
+        return self._session
+    
+    @property
+    def is_configured(self) -> bool:
+        """Whether the WhatsApp Business API credentials are set"""
+        return bool(self.api_url and self.api_token)
+    
+    @staticmethod
+    def format_phone_number(phone_number: str) -> str:
+        """Normalize a phone number to international format (defaults to Kenya)"""
         formatted_number = ''.join(filter(lambda x: x.isdigit() or x == '+', phone_number))
         if not formatted_number.startswith('+'):
-            formatted_number = '+254' + formatted_number.lstrip('0')  # Default to Kenya
-        
-        # Create message content
+            formatted_number = '+254' + formatted_number.lstrip('0')
+        return formatted_number
+    
+    @staticmethod
+    def qualification_message(full_name: str, position: str = None) -> str:
+        """Message body sent to a qualified candidate"""
         if position:
-            message = f"""🎉 Congratulations {full_name}!
+            return f"""🎉 Congratulations {full_name}!
 
 You have been QUALIFIED to run for the position of {position} in the SAKU Council Elections!
 
@@ -53,8 +58,7 @@ Your application has been reviewed and approved. You can now proceed with your c
 Good luck! 🏆
 
 - SAKU Electoral Commission"""
-        else:
-            message = f"""🎉 Congratulations {full_name}!
+        return f"""🎉 Congratulations {full_name}!
 
 You have been QUALIFIED for the SAKU Elections!
 
@@ -63,6 +67,72 @@ Your application has been reviewed and approved. You can now proceed with your p
 Good luck! 🏆
 
 - SAKU Electoral Commission"""
+    
+    @staticmethod
+    def rejection_message(full_name: str, reason: str = None) -> str:
+        """Message body sent to a rejected candidate"""
+        message = f"""Dear {full_name},
+
+Thank you for your interest in participating in the SAKU Council Elections.
+
+Unfortunately, your application has not been approved at this time."""
+        
+        if reason:
+            message += f"\n\nReason: {reason}"
+        
+        message += """
+
+You may reapply in future elections if you meet the requirements.
+
+Best regards,
+SAKU Electoral Commission"""
+        return message
+    
+    @staticmethod
+    def admin_registration_message(reg_number: str, user_type: str, position: str = None) -> str:
+        """Message body sent to the admin for a new registration"""
+        position_display = {
+            'CHAIR': 'Chair',
+            'VICE_CHAIR': 'Vice Chair', 
+            'SECRETARY_GENERAL': 'Secretary General',
+            'FINANCE_SECRETARY': 'Finance Secretary',
+            'ACADEMIC_SECRETARY': 'Academic Secretary',
+            'SPORTS_SECRETARY': 'Sports Secretary',
+            'SPECIAL_INTERESTS_SECRETARY': 'Special Interests Secretary'
+        }.get(position, position) if position else user_type
+        
+        # Admin dashboard URL (configurable)
+        admin_url = getattr(settings, 'ADMIN_DASHBOARD_URL', 'http://localhost:5173/admin-dashboard-enhanced.html')
+        
+        return f'"{reg_number}" has registered for "{position_display}" in the SAKU council. Kindly verify them.\n\n{admin_url}'
+    
+    @staticmethod
+    def otp_message(code: str, minutes: int) -> str:
+        """Message body carrying a one-time verification code"""
+        return f"""Your SAKU voter verification code is {code}
+
+It expires in {minutes} minutes. Do not share this code with anyone.
+
+- SAKU Electoral Commission"""
+    
+    def send_qualification_notification(self, phone_number: str, full_name: str, position: str = None) -> bool:
+        """
+        Send WhatsApp notification to qualified candidate
+        
+        Args:
+            phone_number: Recipient's phone number (with country code)
+            full_name: Candidate's full name
+            position: Council position they're running for (if aspirant)
+        
+        Returns:
+            bool: True if message sent successfully, False otherwise
+        """
+        if not self.is_configured:
+            print("WhatsApp API not configured. Skipping notification.")
+            return False
+        
+        formatted_number = self.format_phone_number(phone_number)
+        message = self.qualification_message(full_name, position)
         
         # Send message via WhatsApp API
         return self._send_message(formatted_number, message)
@@ -78,7 +148,9 @@ Good luck! 🏆
                 'Body': message
             }
             
-            response = requests.post(url, data=data, auth=(self.twilio_account_sid, self.twilio_auth_token))
+            response = self.session.post(
+                url, data=data, auth=(self.twilio_account_sid, self.twilio_auth_token), timeout=self.timeout
+            )
             
             if response.status_code == 201:
                 print("✅ WhatsApp message sent via Twilio!")
@@ -144,32 +216,15 @@ Good luck! 🏆
         print("🚨 NEW SAKU REGISTRATION ALERT!")
         print("=" * 60)
         
-        # Create message content in your exact format
-        position_display = {
-            'CHAIR': 'Chair',
-            'VICE_CHAIR': 'Vice Chair', 
-            'SECRETARY_GENERAL': 'Secretary General',
-            'FINANCE_SECRETARY': 'Finance Secretary',
-            'ACADEMIC_SECRETARY': 'Academic Secretary',
-            'SPORTS_SECRETARY': 'Sports Secretary',
-            'SPECIAL_INTERESTS_SECRETARY': 'Special Interests Secretary'
-        }.get(position, position) if position else user_type
-        
-        # Admin dashboard URL (configurable)
-        admin_url = getattr(settings, 'ADMIN_DASHBOARD_URL', 'http://localhost:5173/admin-dashboard-enhanced.html')
-        
         # Your exact message format
-        message = f'"{reg_number}" has registered for "{position_display}" in the SAKU council. Kindly verify them.\n\n{admin_url}'
+        message = self.admin_registration_message(reg_number, user_type, position)
         
         print("=" * 60)
         print("📱 WhatsApp Message:")
         print(message)
         print("=" * 60)
         
-        # Format admin phone number
-        formatted_number = ''.join(filter(lambda x: x.isdigit() or x == '+', admin_phone))
-        if not formatted_number.startswith('+'):
-            formatted_number = '+254' + formatted_number.lstrip('0')
+        formatted_number = self.format_phone_number(admin_phone)
         
         # Use free WhatsApp link method
         return self._send_whatsapp_link(formatted_number, message)
@@ -186,31 +241,12 @@ Good luck! 🏆
         Returns:
             bool: True if message sent successfully, False otherwise
         """
-        if not self.api_url or not self.api_token:
+        if not self.is_configured:
             print("WhatsApp API not configured. Skipping notification.")
             return False
         
-        # Format phone number
-        formatted_number = ''.join(filter(lambda x: x.isdigit() or x == '+', phone_number))
-        if not formatted_number.startswith('+'):
-            formatted_number = '+254' + formatted_number.lstrip('0')
-        
-        # Create message content
-        message = f"""Dear {full_name},
-
-Thank you for your interest in participating in the SAKU Council Elections.
-
-Unfortunately, your application has not been approved at this time."""
-        
-        if reason:
-            message += f"\n\nReason: {reason}"
-        
-        message += """
-
-You may reapply in future elections if you meet the requirements.
-
-Best regards,
-SAKU Electoral Commission"""
+        formatted_number = self.format_phone_number(phone_number)
+        message = self.rejection_message(full_name, reason)
         
         return self._send_message(formatted_number, message)
     
@@ -241,7 +277,7 @@ SAKU Electoral Commission"""
             }
             
             url = f"{self.api_url}/{self.phone_number_id}/messages"
-            response = requests.post(url, headers=headers, json=data)
+            response = self.session.post(url, headers=headers, json=data, timeout=self.timeout)
             
             if response.status_code == 200:
                 print(f"WhatsApp message sent successfully to {phone_number}")
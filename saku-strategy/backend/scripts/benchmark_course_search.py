@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark course autocomplete latency
+
+Compares the previous ORM path (name__icontains + CourseSerializer) with
+the in-process course index behind /api/courses/search/. Runs against a
+throwaway test database filled with a synthetic catalogue.
+"""
+
+import itertools
+import os
+import sys
+import time
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+import django
+django.setup()
+
+from django.db import connection
+from elections.course_index import search_courses
+from elections.models import Faculty, Department, Course
+from elections.serializers import CourseSerializer
+
+LEVELS = ['Bachelor of Science in', 'Bachelor of Arts in', 'Diploma in', 'Certificate in', 'Master of Science in']
+SUBJECTS = ['Software Development', 'Information Technology', 'Data Science', 'Accounting', 'Economics',
+            'Film Technology', 'Journalism', 'Education', 'Criminology', 'Applied Computing',
+            'Business Administration', 'Statistics', 'Public Relations', 'Finance', 'Networking']
+QUERIES = ['so', 'soft', 'bachelor sci', 'dip', 'data', 'acc', 'ineer', 'film tech', 'mast', 'xyz']
+
+
+def seed(copies):
+    """Create ``copies`` variants of every level/subject combination"""
+    faculty = Faculty.objects.create(code='benchmark', name='Benchmark Faculty')
+    department = Department.objects.create(faculty=faculty, code='benchmark', name='Benchmark Department')
+    Course.objects.bulk_create([
+        Course(department=department, name=f'{level} {subject}' + (f' {n}' if n else ''), code=f'C{i}')
+        for i, (n, level, subject) in enumerate(itertools.product(range(copies), LEVELS, SUBJECTS))
+    ])
+
+
+def orm_search(query):
+    courses = Course.objects.select_related('department', 'department__faculty').filter(name__icontains=query)[:10]
+    return CourseSerializer(courses, many=True).data
+
+
+def time_per_query(search, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in QUERIES:
+            search(query)
+    return (time.perf_counter() - start) / (rounds * len(QUERIES))
+
+
+def main(copies=8, rounds=50):
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(copies)
+        search_courses('warm up')
+
+        print(f"Course search over {Course.objects.count()} courses ({rounds} rounds of {len(QUERIES)} queries)")
+        orm = time_per_query(orm_search, rounds)
+        index = time_per_query(search_courses, rounds)
+        print(f"  ORM icontains: {orm * 1e6:9.1f} us/query")
+        print(f"  Course index:  {index * 1e6:9.1f} us/query")
+        print(f"  Speedup: {orm / index:.1f}x")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main(copies=int(sys.argv[1]) if len(sys.argv) > 1 else 8)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark login throughput of the JWT login endpoint
+
+Compares the current single-authentication login with the previous flow,
+which authenticated a second time after the token pair was issued to
+look the user up. Runs against a throwaway test database.
+"""
+
+import os
+import sys
+import time
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+import django
+django.setup()
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.views import TokenObtainPairView
+from elections.auth_views import CustomTokenObtainPairView
+
+USERNAME = 'benchmark'
+PASSWORD = 'benchmark-pass-123'
+
+
+class DoubleAuthenticationLoginView(TokenObtainPairView):
+    """The previous login flow: issue tokens, then authenticate again"""
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        if response.status_code == 200:
+            authenticate(username=request.data.get('username'), password=request.data.get('password'))
+        return response
+
+
+def run(view, logins):
+    """Time ``logins`` successful logins; return (seconds, password hashes)"""
+    factory = APIRequestFactory()
+    hashes = 0
+    original = PBKDF2PasswordHasher.verify
+
+    def counting_verify(self, password, encoded):
+        nonlocal hashes
+        hashes += 1
+        return original(self, password, encoded)
+
+    PBKDF2PasswordHasher.verify = counting_verify
+    try:
+        start = time.perf_counter()
+        for _ in range(logins):
+            request = factory.post('/api/auth/login/', {'username': USERNAME, 'password': PASSWORD}, format='json')
+            response = view(request)
+            assert response.status_code == 200, response.data
+        return time.perf_counter() - start, hashes
+    finally:
+        PBKDF2PasswordHasher.verify = original
+
+
+def main(logins=20):
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        User.objects.create_user(username=USERNAME, password=PASSWORD)
+
+        for label, view in (('before (double authenticate)', DoubleAuthenticationLoginView.as_view()),
+                            ('after (single authenticate)', CustomTokenObtainPairView.as_view())):
+            elapsed, hashes = run(view, logins)
+            print(f"{label:30} {logins / elapsed:7.1f} logins/s  "
+                  f"{hashes / logins:.1f} password hashes/login")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main(logins=int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark profile serialization cost per 1,000 rows
+
+Compares the full nested UserProfileSerializer with the compact
+UserProfileListSerializer used by list endpoints. Rows are built in
+memory with their relations attached, so only serialization is timed.
+"""
+
+import os
+import sys
+import time
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from elections.models import Faculty, Department, Course, UserProfile
+from elections.serializers import UserProfileSerializer, UserProfileListSerializer, DOCUMENT_FIELDS
+
+
+def build_profiles(count):
+    """Build unsaved profiles with their related objects already attached"""
+    faculty = Faculty(id=1, code='technology', name='School of Technology')
+    department = Department(id=1, faculty=faculty, code='software_dev',
+                            name='Department of Software Development & Information Systems')
+    course = Course(id=1, department=department, name='Bachelor of Science in Software Development', code='BSD')
+    now = timezone.now()
+
+    profiles = []
+    for n in range(count):
+        user = User(id=n + 1, username=f'student{n}', email=f'student{n}@example.com',
+                    first_name='Student', last_name=str(n))
+        profile = UserProfile(
+            id=n + 1, user=user, user_type='ASPIRANT', full_name=f'Student {n}', gender='Female',
+            student_id=f'KCA/{n:05d}', faculty=faculty, department=department, course=course,
+            year_of_study=2, whatsapp_number='+254700000000', council_position='CHAIR',
+            email=user.email, phone_number='+254700000000', created_at=now, updated_at=now,
+        )
+        for field in DOCUMENT_FIELDS:
+            setattr(profile, field, f'documents/ASPIRANT/KCA{n:05d}/{field}.pdf')
+        profiles.append(profile)
+    return profiles
+
+
+def time_serializer(serializer_class, profiles, repeat):
+    """Best-of-``repeat`` wall time to serialize ``profiles``"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        serializer_class(profiles, many=True).data
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(rows=1000, repeat=5):
+    profiles = build_profiles(rows)
+    full = time_serializer(UserProfileSerializer, profiles, repeat)
+    compact = time_serializer(UserProfileListSerializer, profiles, repeat)
+
+    per_thousand = 1000 / rows
+    print(f"Serializing {rows} profiles (best of {repeat})")
+    print(f"  UserProfileSerializer:     {full * per_thousand * 1000:8.1f} ms / 1,000 rows")
+    print(f"  UserProfileListSerializer: {compact * per_thousand * 1000:8.1f} ms / 1,000 rows")
+    print(f"  Speedup: {full / compact:.1f}x")
+
+
+if __name__ == '__main__':
+    main(rows=int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
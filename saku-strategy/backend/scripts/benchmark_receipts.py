@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark public receipt verification
+
+Fills a throwaway test database with votes, then measures lookups/second
+for issued and made-up receipts through the Bloom filter front, next to
+plain unique-index lookups for the made-up ones.
+
+Usage: python scripts/benchmark_receipts.py [voters] [lookups]
+"""
+
+import os
+import random
+import sys
+import time
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from elections.ballots import generate_receipt
+from elections.models import Faculty, Department, Course, UserProfile, CouncilPosition, Vote
+from elections.receipts import lookup_receipt, receipt_filter
+
+
+def seed(voters):
+    """One vote per position for ``voters`` students, all for a single candidate"""
+    faculty = Faculty.objects.create(code='benchmark', name='Benchmark Faculty')
+    department = Department.objects.create(faculty=faculty, code='benchmark', name='Benchmark Department')
+    course = Course.objects.create(department=department, name='Benchmark Course')
+
+    users = User.objects.bulk_create([User(username=f'voter{n}') for n in range(voters + 1)])
+    profiles = UserProfile.objects.bulk_create([
+        UserProfile(user=user, full_name=user.username, gender='Female', student_id=user.username,
+                    faculty=faculty, department=department, course=course, year_of_study=2,
+                    whatsapp_number='+254700000000', email=f'{user.username}@example.com',
+                    phone_number='+254700000000')
+        for user in users
+    ])
+    candidate, voters = profiles[0], profiles[1:]
+    Vote.objects.bulk_create([
+        Vote(voter=voter, candidate=candidate, position=position, receipt=generate_receipt())
+        for voter in voters for position in CouncilPosition.values
+    ], batch_size=2000)
+
+
+def lookups_per_second(lookup, receipts):
+    start = time.perf_counter()
+    for receipt in receipts:
+        lookup(receipt)
+    return len(receipts) / (time.perf_counter() - start)
+
+
+def index_lookup(receipt):
+    return Vote.objects.filter(receipt=receipt).values('receipt', 'position', 'voted_at', 'vote_hash').first()
+
+
+def main(voters=3000, lookups=5000):
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(voters)
+        issued = list(Vote.objects.values_list('receipt', flat=True))
+        valid = random.choices(issued, k=lookups)
+        bogus = [generate_receipt() for _ in range(lookups)]
+
+        start = time.perf_counter()
+        receipt_filter.refresh()
+        print(f"Receipt lookups over {len(issued)} votes ({lookups} lookups each)")
+        print(f"  Bloom filter built in {(time.perf_counter() - start) * 1000:.0f} ms "
+              f"({len(receipt_filter.bloom.bits) // 1024} KiB, {receipt_filter.bloom.hashes} hashes)")
+        print(f"  valid receipts:               {lookups_per_second(lookup_receipt, valid):10.0f} lookups/s")
+        print(f"  made-up receipts, filter:     {lookups_per_second(lookup_receipt, bogus):10.0f} lookups/s")
+        print(f"  made-up receipts, index only: {lookups_per_second(index_lookup, bogus):10.0f} lookups/s")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main(
+        voters=int(sys.argv[1]) if len(sys.argv) > 1 else 3000,
+        lookups=int(sys.argv[2]) if len(sys.argv) > 2 else 5000,
+    )
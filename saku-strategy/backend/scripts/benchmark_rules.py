@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark eligibility rule evaluation
+
+Fills a throwaway test database with delegates and a handful of
+eligibility rules, then measures evaluations/second for the compiled rule
+set over a queryset, next to interpreting the ``Rule`` rows per delegate.
+
+Usage: python scripts/benchmark_rules.py [delegates]
+"""
+
+import os
+import sys
+import time
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+import django
+django.setup()
+
+from django.db import connection
+from elections.models import Faculty, Department, Course, Delegate, Rule
+from elections.rules import OPERATORS, build_rule_set, get_rule_set
+
+RULES = {
+    'eligibility.min_year': {'field': 'year_of_study', 'op': 'gte', 'value': 2},
+    'eligibility.max_year': {'field': 'year_of_study', 'op': 'lte', 'value': 4},
+    'eligibility.gender': {'field': 'gender', 'op': 'in', 'value': ['Male', 'Female']},
+    'eligibility.student_id': {'field': 'student_id', 'op': 'required'},
+    'eligibility.department': {'field': 'department__code', 'op': 'ne', 'value': 'closed'},
+}
+
+
+def seed(delegates):
+    faculty = Faculty.objects.create(code='benchmark', name='Benchmark Faculty')
+    department = Department.objects.create(faculty=faculty, code='benchmark', name='Benchmark Department')
+    course = Course.objects.create(department=department, name='Benchmark Course')
+    Delegate.objects.bulk_create([
+        Delegate(full_name=f'Delegate {n}', gender='Female' if n % 3 else 'Male', department=department,
+                 course=course, year_of_study=n % 5 + 1, student_id=f'BENCH/{n:06d}')
+        for n in range(delegates)
+    ], batch_size=2000)
+    Rule.objects.bulk_create([Rule(key=key, value=value) for key, value in RULES.items()])
+
+
+def interpreted():
+    """Load and interpret every rule for each delegate"""
+    results = {}
+    for delegate in Delegate.objects.select_related('department'):
+        failed = []
+        for rule in Rule.objects.all():
+            value = delegate
+            for name in rule.value['field'].split('__'):
+                value = getattr(value, name)
+            if not OPERATORS[rule.value['op']](value, rule.value.get('value')):
+                failed.append(rule.key)
+        results[delegate.pk] = failed
+    return results
+
+
+def compiled():
+    return dict(get_rule_set().evaluate_queryset(Delegate.objects.all()))
+
+
+def evaluations_per_second(evaluate, n):
+    start = time.perf_counter()
+    evaluate()
+    return n / (time.perf_counter() - start)
+
+
+def main(delegates=10000):
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(delegates)
+        start = time.perf_counter()
+        build_rule_set(0)
+        print(f"Eligibility over {delegates} delegates, {len(RULES)} rules")
+        print(f"  rules compiled in {(time.perf_counter() - start) * 1000:.1f} ms")
+        print(f"  interpreted per row: {evaluations_per_second(interpreted, delegates):10.0f} evaluations/s")
+        print(f"  compiled, batched:   {evaluations_per_second(compiled, delegates):10.0f} evaluations/s")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main(delegates=int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test for ballot casting
+
+Creates a throwaway database (a temporary SQLite file, or a test database
+on DATABASE_URL when set), registers voters and candidates, then casts a
+full ballot per voter from a pool of threads through the /api/ballots/
+view and reports sustained ballots/second and votes/second.
+
+Usage: python scripts/load_test_ballots.py [voters] [threads]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+import django
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from rest_framework.test import APIRequestFactory, force_authenticate
+from elections.models import Faculty, Department, Course, UserProfile, CouncilPosition, Vote
+from elections.views import cast_ballot
+
+
+def seed(voters, candidates_per_position=3):
+    """Create candidates for every position and ``voters`` voting students"""
+    faculty = Faculty.objects.create(code='load', name='Load Test Faculty')
+    department = Department.objects.create(faculty=faculty, code='load', name='Load Test Department')
+    course = Course.objects.create(department=department, name='Load Test Course')
+
+    def profiles(prefix, count, **extra):
+        users = User.objects.bulk_create([User(username=f'{prefix}{n}') for n in range(count)])
+        return UserProfile.objects.bulk_create([
+            UserProfile(user=user, full_name=user.username, gender='Female', student_id=user.username,
+                        faculty=faculty, department=department, course=course, year_of_study=2,
+                        whatsapp_number='+254700000000', email=f'{user.username}@example.com',
+                        phone_number='+254700000000', **extra)
+            for user in users
+        ])
+
+    candidates = {}
+    for position in CouncilPosition.values:
+        candidates[position] = [p.id for p in profiles(
+            f'{position.lower()}-', candidates_per_position,
+            user_type='ASPIRANT', council_position=position, is_qualified=True
+        )]
+    students = profiles('voter', voters, user_type='STUDENT')
+    return candidates, list(User.objects.filter(id__in=[s.user_id for s in students]))
+
+
+def main(voters=300, threads=8):
+    db = settings.DATABASES['default']
+    if db['ENGINE'].endswith('sqlite3'):
+        # A file database so every thread shares it (the default test database is in-memory)
+        db.setdefault('TEST', {})['NAME'] = os.path.join(tempfile.mkdtemp(), 'load_test.sqlite3')
+
+    old_name = db['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        candidates, users = seed(voters)
+        factory = APIRequestFactory()
+
+        def vote(i_user):
+            i, user = i_user
+            ballot = {'votes': [
+                {'position': position, 'candidate': ids[i % len(ids)]} for position, ids in candidates.items()
+            ]}
+            request = factory.post('/api/ballots/', ballot, format='json')
+            force_authenticate(request, user=user)
+            try:
+                return cast_ballot(request).status_code
+            finally:
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            statuses = list(pool.map(vote, enumerate(users)))
+        elapsed = time.perf_counter() - start
+
+        accepted = statuses.count(201)
+        votes = Vote.objects.count()
+        print(f"{connection.vendor}: {voters} ballots x {len(candidates)} positions, {threads} threads")
+        print(f"  accepted ballots: {accepted} (other statuses: {len(statuses) - accepted})")
+        print(f"  {accepted / elapsed:8.1f} ballots/s")
+        print(f"  {votes / elapsed:8.1f} votes/s")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main(
+        voters=int(sys.argv[1]) if len(sys.argv) > 1 else 300,
+        threads=int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+    )